@@ -13,6 +13,7 @@ setup(
         "console_scripts": ["yangson=yangson.__main__:main"]
         },
     install_requires = ["PyXB"],
+    python_requires = ">=3.7",
     tests_require = ["pytest"],
     keywords = ["yang", "data model", "configuration", "json"],
     classifiers = [
@@ -45,7 +46,7 @@ Installation
 
     python -m pip install yangson
 
-Note that *Yangson* requires Python 3.6 or higher.
+Note that *Yangson* requires Python 3.7 or higher.
 
 Links
 =====
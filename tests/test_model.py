@@ -1,14 +1,26 @@
+import io
 import json
 import pytest
+import threading
 from decimal import Decimal
 from yangson import DataModel
 from yangson.exceptions import (
-    InvalidFeatureExpression, UnknownPrefix, NonexistentInstance,
-    NonexistentSchemaNode, RawTypeError, SchemaError,
-    XPathTypeError, InvalidXPath, NotSupported)
-from yangson.instvalue import ArrayValue
+    InstanceValueError, InvalidFeatureExpression, UnknownPrefix,
+    NonexistentInstance,
+    NonexistentSchemaNode, RawMemberError, RawTypeError, SchemaError,
+    SemanticError,
+    UnexpectedInput,
+    XPathTypeError, InvalidXPath, NotSupported, YangsonException,
+    YangTypeError)
+from yangson.instance import _validation_run
+from yangson.instvalue import ArrayValue, LazyValue
+from yangson.jsonstream import JSONStreamReader
+from yangson.nodeset import NodeSet
+from yangson.parallel import ParallelValidator
+from yangson.profiler import ValidationProfiler
+from yangson.schpattern import Member
 from yangson.schemadata import SchemaContext, FeatureExprParser
-from yangson.enumerations import ContentType
+from yangson.enumerations import ContentType, ValidationScope
 from yangson.xpathparser import XPathParser
 
 tree = """+--rw (test:choiA)?
@@ -312,6 +324,10 @@ def test_instance(data_model, instance):
     with pytest.raises(NonexistentInstance):
         la1["contD"]
     assert la1.json_pointer() == "/test:contA/listA/1"
+    lae = la1["leafE"]
+    assert lae.json_pointer() == "/test:contA/listA/1/leafE"
+    assert lae.path == ("test:contA", "listA", 1, "leafE")
+    assert lae.path is lae.path and la1.path == lae.path[:-1]
     assert lt.value == ("CC-BY", "test")
     assert str(lt) == "test:CC-BY"
     assert tbln.namespace == "testb"
@@ -466,6 +482,72 @@ def test_xpath(data_model, instance):
     xptest("bit-is-set(., 'dos')", False, conta)
 
 
+def test_xpath_compilation(data_model, instance):
+    mid = data_model.schema_data.last_revision("test")
+    sctx = SchemaContext(data_model.schema_data, "test", mid)
+    conta = instance["test:contA"]
+    ex = XPathParser("leafB * (2 + 3) = 45", sctx).parse()
+    assert ex.evaluate(conta)
+    func = ex._functions["test"]
+    assert ex.evaluate(conta) and ex._functions["test"] is func
+    assert ex.left.right._constant() and not ex.left._constant()
+    ex = XPathParser("count(../leafB)", sctx).parse()
+    assert ex.evaluate(conta["leafB"]) == 1
+    assert ex.evaluate(conta["testb:leafR"]) == 0
+    assert set(ex._functions) == {"test", "testb"}
+    assert XPathParser("llistB or sum('x')", sctx).parse().evaluate(instance)
+    with pytest.raises(XPathTypeError):
+        XPathParser("llistB and sum('x')", sctx).parse().evaluate(instance)
+    ex = XPathParser("listA[leafF = 'false'][leafE = current()/listA[2]/leafE]",
+                     sctx).parse()
+    assert len(ex._key_predicates()) == 2
+    assert [n.index for n in ex.evaluate(conta)] == [1]
+    ex = XPathParser("/contA/listA[leafE = 'BEEF'][leafF = 'true']", sctx).parse()
+    assert len(ex.evaluate(instance)) == 0
+    ex = XPathParser("listA['ABBA' = leafE][leafF = 'false'][1]/leafE", sctx).parse()
+    assert ex.evaluate(conta) == "ABBA"
+    ex = XPathParser("count(/contA/listA[leafE = current()]) + count(/contA/*)",
+                     sctx).parse()
+    assert not ex._absolute() and ex.right.primary.expr._absolute()
+    with _validation_run() as ctx:
+        assert ex.evaluate(conta) == 10
+        assert ex.evaluate(conta["listA"][0]) == 10
+        assert len(ctx.xpath_values) == 3
+        mod = conta.put_member("leafB", 1).top()
+        assert ex.evaluate(mod["test:contA"]) == 10
+        assert len(ctx.xpath_values) == 6
+    ex = XPathParser("string-length()", sctx).parse()
+    assert not ex._absolute() and not ex._origin_only()
+    with _validation_run():
+        assert [ex.evaluate(en["leafE"]) for en in conta["listA"]] == [6, 4]
+    mem = Member("leafW", ContentType.all,
+                 XPathParser("/contA/leafB = 9", sctx).parse())
+    with _validation_run() as ctx:
+        assert all(mem._when_value(en) for en in conta["listA"])
+        assert len(ctx.xpath_values) == 3
+
+
+def test_nodeset(instance):
+    conta = instance["test:contA"]
+    lst = conta["listA"]
+    ns = NodeSet(lst)
+    assert [n.path for n in ns.union(NodeSet([lst[1], conta]))] == [
+        lst[0].path, lst[1].path, conta.path]
+    parents = ns.bind(lambda n: n._parent())
+    assert [n.path for n in parents] == [conta.path]
+    children = ns.bind(lambda n: n._children(("leafE", "test")), True)
+    assert [n.value for n in children] == ["C0FFEE", "ABBA"]
+    leafr = NodeSet([conta["testb:leafR"]])
+    assert children == leafr and children != leafr
+    assert not NodeSet(children[:1]) != leafr
+    assert NodeSet([conta["leafB"]]) < NodeSet([conta["testb:leafV"]])
+    assert not NodeSet([conta["leafB"]]) >= NodeSet([conta["testb:leafV"]])
+    with _validation_run() as ctx:
+        assert children == "ABBA"
+        assert NodeSet([conta["testb:leafV"]]) > NodeSet([conta["leafB"]])
+        assert len(ctx.canonical_strings) == 3
+
+
 def test_instance_paths(data_model, instance):
     rid1 = data_model.parse_resource_id("/test:contA/testb:leafN")
     rid2 = data_model.parse_resource_id("/test:contA/listA=C0FFEE,true/contD/contE")
@@ -496,6 +578,19 @@ def test_edits(data_model, instance):
     assert inst1.peek(laii)[1]["leafE"] == "B00F"
     modla = la.delete_item(1)
     assert len(modla.value) == 1
+    assert la[0].next().previous().up().value is la.value
+    assert [e["leafE"] for e in la[1].insert_before(
+        {"leafE": "B00F", "leafF": False}, raw=True).up().value] == [
+            "C0FFEE", "B00F", "ABBA"]
+    conta = instance["test:contA"]
+    lfb = conta["leafB"]
+    assert lfb.up().value is conta.value
+    assert "leafB" not in lfb.siblings and "listA" in lfb.siblings
+    modca = lfb.update(7).sibling("testb:leafN").up()
+    assert modca.value["leafB"] == 7 and conta.value["leafB"] == 9
+    assert modca.put_member("leafA", 5).up().value["leafA"] == 5
+    lfa = modca.put_member("leafA", 6)
+    assert lfa.parinst.value["leafA"] == 6 and lfa.up().value is lfa._object
     llb1 = instance["test:llistB"][1]
     modllb = llb1.update("2001:db8:0:2::1", raw=True).up()
     assert modllb.value == ArrayValue(["::1", "2001:db8:0:2::1"])
@@ -503,8 +598,531 @@ def test_edits(data_model, instance):
         llb1.update("2001::2::1", raw=True)
 
 
+def test_key_index(data_model, instance):
+    lsta = instance["test:contA"]["listA"]
+    assert lsta.value.key_index(lsta.schema_node._key_members) == {
+        ("C0FFEE", True): 0, ("ABBA", False): 1}
+    assert lsta.look_up(leafE="ABBA", leafF=False).index == 1
+    mod1 = lsta[0].put_member("leafE", "BEEF").up().up()
+    assert mod1.value._key_index is not None
+    assert mod1.look_up(leafE="BEEF", leafF=True).index == 0
+    with pytest.raises(NonexistentInstance):
+        mod1.look_up(leafE="C0FFEE", leafF=True)
+    mod2 = lsta[0].insert_after({"leafE": "FEED", "leafF": True}, raw=True).up()
+    assert mod2.look_up(leafE="ABBA", leafF=False).index == 2
+    assert mod2.look_up(leafE="FEED", leafF=True).index == 1
+    mod3 = mod2.delete_item(0)
+    assert mod3.look_up(leafE="FEED", leafF=True).index == 0
+    assert lsta.look_up(leafE="C0FFEE", leafF=True).index == 0
+    rid = data_model.parse_resource_id("/test:contA/listA=FEED,true/leafF")
+    assert mod3.top().peek(rid) is True
+
+
+def test_lazy_cooking(data_model):
+    raw = {"test:leafX": 53531,
+           "test:contA": {"leafB": 9, "listA": [
+               {"leafE": "C0FFEE", "leafF": True},
+               {"leafE": "ABBA", "leafW": 9, "leafF": False}]},
+           "test:contT": {"decimal64": "4.5", "enumeration": "Hearts"}}
+    linst = data_model.from_raw(raw, lazy=True)
+    assert isinstance(dict.__getitem__(linst.value, "test:contA"), LazyValue)
+    assert linst["test:contT"]["decimal64"].value == Decimal("4.50")
+    assert isinstance(dict.__getitem__(linst.value, "test:contA"), LazyValue)
+    assert linst.value == data_model.from_raw(raw).value
+    assert linst.raw_value() == raw
+    raw["test:contA"]["listA"][0]["leafF"] = "yes"
+    binst = data_model.from_raw(raw, lazy=True)
+    assert binst["test:leafX"].value == 53531
+    conta = binst["test:contA"]
+    with pytest.raises(RawTypeError):
+        conta["listA"]
+
+
+def test_logical_clock():
+    dm = DataModel.from_file("yang-modules/test/yang-library.json",
+                             ["yang-modules/test", "yang-modules/ietf"],
+                             logical_clock=True)
+    raw = {"test:contA": {"leafB": 9, "listA": [
+        {"leafE": "C0FFEE", "leafF": True},
+        {"leafE": "ABBA", "leafF": False}]}}
+    inst = dm.from_raw(raw)
+    rev = inst.timestamp
+    assert isinstance(rev, int)
+    assert inst.value["test:contA"]["listA"][1].timestamp == rev
+    la1 = inst["test:contA"]["listA"][1]
+    inst1 = la1.put_member("leafE", "ACDC").top()
+    assert isinstance(inst1.timestamp, int) and inst1.timestamp > rev
+    inst2 = la1.insert_after({"leafE": "ABC", "leafF": True}, raw=True).top()
+    assert inst2.timestamp > inst1.timestamp
+    assert inst2["test:contA"]["listA"][2].value.timestamp == inst2.timestamp
+    inst3 = inst2.add_defaults()
+    llb = inst3["test:contC"]["llistA"][1]
+    assert isinstance(llb.update(55).top().timestamp, int)
+    sess = inst.edit_session()
+    sess.put(dm.parse_resource_id("/test:contA/leafB"), 10)
+    assert sess.commit().timestamp > inst2.timestamp
+    assert dm.from_stream(io.StringIO(json.dumps(raw))).timestamp > rev
+
+
+def test_json_stream(data_model):
+    txt = ('{"a": [1, -2.5e3, true, null, "x\\"y\\u00e9"], "bb": {},\n'
+           ' "c": [[], {"d": 10}]}')
+    for n in (1, 2, 5, 1000):
+        reader = JSONStreamReader(io.StringIO(txt), n)
+        assert reader.read_value(next(reader)) == json.loads(txt)
+        reader.end()
+    reader = JSONStreamReader(io.StringIO('{"a": 1,\n "b" 2}'), 4)
+    with pytest.raises(UnexpectedInput) as e:
+        reader.read_value(next(reader))
+    assert str(e.value) == "line 2, column 5: expected ':'"
+    raw = {"test:leafX": 53531,
+           "test:contA": {"leafB": 9, "listA": [
+               {"leafE": "C0FFEE", "leafF": True},
+               {"leafE": "ABBA", "leafW": 9, "leafF": False}]},
+           "test:contT": {"decimal64": "4.5", "enumeration": "Hearts"}}
+    txt = json.dumps(raw)
+    sinst = data_model.from_stream(io.BytesIO(txt.encode()))
+    assert sinst.value == data_model.from_raw(raw).value
+    with pytest.raises(RawMemberError) as e:
+        data_model.from_stream(io.StringIO(txt.replace("leafW", "foo")))
+    assert e.value.path == "/test:contA/listA/2/foo"
+    with pytest.raises(RawTypeError):
+        data_model.from_stream(io.StringIO(txt.replace("true", '"yes"')))
+    with pytest.raises(UnexpectedInput):
+        data_model.from_stream(io.StringIO(txt + "}"))
+
+
+def test_json_output(instance):
+    assert json.loads("".join(instance.json_chunks())) == {
+        "test:llistB": ["::1", "127.0.0.1"],
+        "test:leafX": 53531,
+        "test:contA": {
+            "leafB": 9,
+            "listA": [{
+                "leafE": "C0FFEE", "leafF": True,
+                "contD": {"leafG": "foo1-bar",
+                          "contE": {"leafJ": [None], "leafP": 10}}},
+                {"leafE": "ABBA", "leafW": 9, "leafF": False}],
+            "testb:leafS":
+                '/test:contA/listA[leafE="C0FFEE"][leafF="true"]/contD/contE/leafP',
+            "testb:leafR": "C0FFEE",
+            "testb:leafT": "test:CC-BY",
+            "testb:leafV": 99,
+            "anydA": {"foo:bar": [1, 2, 3]},
+            "testb:leafN": "hi!"},
+        "test:contT": {
+            "bits": "dos cuatro", "decimal64": "4.5",
+            "enumeration": "Hearts"}}
+    lsta = instance["test:contA"]["listA"]
+    assert len(list(instance.json_chunks(10))) > 10
+    assert "".join(lsta[1].json_chunks()) == (
+        '{"leafE":"ABBA","leafW":9,"leafF":false}')
+    out = io.BytesIO()
+    lsta.write_json(out)
+    assert json.loads(out.getvalue()) == json.loads("".join(lsta.json_chunks()))
+
+
+def test_edit_session(data_model, instance):
+    rid = data_model.parse_resource_id
+    sess = instance.edit_session()
+    sess.put(rid("/test:contA/leafB"), 10)
+    sess.put(rid("/test:contA/listA=ABBA,false/leafW"), 10)
+    sess.delete(rid("/test:contA/testb:leafS"))
+    sess.insert(rid("/test:contA/listA"),
+                {"leafE": "FEED", "leafF": True}, index=1, raw=True)
+    assert sess.peek(rid("/test:contA/listA=FEED,true/leafF")) is True
+    with pytest.raises(NonexistentInstance):
+        sess.delete(rid("/test:contA/testb:leafS"))
+    with pytest.raises(NonexistentSchemaNode):
+        sess.put(rid("/test:contA/foo"), 1)
+    mod = sess.commit()
+    conta = mod["test:contA"]
+    assert conta["leafB"].value == 10
+    assert "testb:leafS" not in conta
+    assert [e["leafE"] for e in conta["listA"].value] == [
+        "C0FFEE", "FEED", "ABBA"]
+    assert conta["listA"][2]["leafW"].value == 10
+    assert conta.value.timestamp == mod.value.timestamp == mod.timestamp
+    assert mod.value["test:contT"] is instance.value["test:contT"]
+    assert instance["test:contA"]["leafB"].value == 9
+    assert len(instance["test:contA"]["listA"].value) == 2
+    assert sess.commit() is mod
+    mod.validate(ctype=ContentType.all)
+    sess.put(rid("/test:contA/listA=ABBA,false/leafE"), "BEEF")
+    assert sess.peek(rid("/test:contA/listA=BEEF,false/leafF")) is False
+    lsta = sess.commit()["test:contA"]["listA"]
+    assert lsta.look_up(leafE="BEEF", leafF=False).index == 2
+    with pytest.raises(NonexistentInstance):
+        lsta.look_up(leafE="ABBA", leafF=False)
+    sess.put(rid("/test:contA/listA=FEED,true/leafE"), "C0FFEE")
+    with pytest.raises(SemanticError):
+        sess.commit().validate(ctype=ContentType.all)
+
+
+def test_patch(data_model, instance):
+    ypatch = data_model.parse_yang_patch({"ietf-yang-patch:yang-patch": {
+        "patch-id": "p1",
+        "edit": [
+            {"edit-id": "e1", "operation": "create",
+             "target": "/listA=FEED,true",
+             "value": {"test:listA": [{"leafE": "FEED", "leafF": True}]}},
+            {"edit-id": "e2", "operation": "merge", "target": "/listA=ABBA,false",
+             "value": {"test:listA": [{"leafE": "ABBA", "leafF": False,
+                                       "leafW": 10}]}},
+            {"edit-id": "e3", "operation": "remove",
+             "target": "/testb:leafS"}]}}, "/test:contA")
+    mod, status = ypatch.apply(instance)
+    assert status == [("e1", None), ("e2", None), ("e3", None)]
+    conta = mod["test:contA"]
+    assert [e["leafE"] for e in conta["listA"].value] == [
+        "C0FFEE", "ABBA", "FEED"]
+    assert conta["listA"][1]["leafW"].value == 10
+    assert "testb:leafS" not in conta
+    assert len(instance["test:contA"]["listA"].value) == 2
+    mod2, status = ypatch.apply(mod)
+    assert mod2 is mod
+    assert status[-1][0] == "e1"
+    assert isinstance(status[-1][1], InstanceValueError)
+    ypatch = data_model.parse_yang_patch({"ietf-yang-patch:yang-patch": {
+        "patch-id": "p2",
+        "edit": [
+            {"edit-id": "e1", "operation": "insert",
+             "target": "/test:llistB=%3A%3A2",
+             "point": "/test:llistB=127.0.0.1", "where": "before",
+             "value": {"test:llistB": ["::2"]}},
+            {"edit-id": "e2", "operation": "move",
+             "target": "/test:llistB=127.0.0.1", "where": "first"}]}})
+    mod, status = ypatch.apply(instance)
+    assert status == [("e1", None), ("e2", None)]
+    assert mod.value["test:llistB"] == ArrayValue(["127.0.0.1", "::1", "::2"])
+
+    def failure(edit, target="/test:contA"):
+        edit["edit-id"] = "e1"
+        ypatch = data_model.parse_yang_patch({"ietf-yang-patch:yang-patch": {
+            "patch-id": "p3", "edit": [edit]}}, target)
+        mod, status = ypatch.apply(instance)
+        assert mod is instance
+        return status[0][1]
+    assert isinstance(failure(
+        {"operation": "create", "target": "/listA=DEAD,true",
+         "value": {"test:listA": [{"leafE": "C0FFEE", "leafF": True}]}}),
+        InstanceValueError)
+    assert isinstance(failure(
+        {"operation": "replace", "target": "/listA=ABBA,false",
+         "value": {"test:listA": [{"leafE": "C0FFEE", "leafF": True}]}}),
+        InstanceValueError)
+    assert isinstance(failure(
+        {"operation": "insert", "target": "/listA=FEED,true",
+         "value": {"test:listA": [{"leafE": "FEED", "leafF": True}]}}),
+        InstanceValueError)
+    assert isinstance(failure(
+        {"operation": "move", "target": "/listA=ABBA,false",
+         "where": "first"}), InstanceValueError)
+    assert str(failure(
+        {"operation": "replace", "target": "/leafB",
+         "value": {"test:leafB": "x"}})).startswith(
+             "[/ietf-yang-patch:yang-patch/edit/0/value/test:leafB]")
+    with pytest.raises(RawTypeError):
+        failure({"operation": "insert", "target": "/test:llistB=%3A%3A2",
+                 "point": "/test:contA/listA=ABBA,false", "where": "after",
+                 "value": {"test:llistB": ["::2"]}}, "/")
+    jpatch = data_model.parse_json_patch([
+        {"op": "test", "path": "/test:contA/leafB", "value": 9},
+        {"op": "add", "path": "/test:llistB/-", "value": "::2"},
+        {"op": "copy", "from": "/test:contA/listA/1",
+         "path": "/test:contA/listA/0"},
+        {"op": "replace", "path": "/test:contA/listA/0/leafE",
+         "value": "BEEF"},
+        {"op": "remove", "path": "/test:contA/testb:leafS"}])
+    mod3, status = jpatch.apply(instance)
+    assert [s[1] for s in status] == 5 * [None]
+    assert mod3.value["test:llistB"] == ArrayValue(["::1", "127.0.0.1", "::2"])
+    assert [e["leafE"] for e in mod3.value["test:contA"]["listA"]] == [
+        "BEEF", "C0FFEE", "ABBA"]
+    jpatch.edits[0].value = 8
+    assert jpatch.apply(instance)[0] is instance
+    jpatch = data_model.parse_json_patch([
+        {"op": "replace", "path": "/test:contA/listA/1/leafW", "value": 7},
+        {"op": "copy", "from": "/test:contA/listA/1",
+         "path": "/test:contA/listA/2"},
+        {"op": "replace", "path": "/test:contA/listA/2/leafE",
+         "value": "DEAD"},
+        {"op": "copy", "from": "/test:llistB/0", "path": "/test:llistB/-"},
+        {"op": "move", "from": "/test:contA/listA/0",
+         "path": "/test:contA/listA/-"}])
+    mod4 = jpatch.apply(instance)[0]
+    assert [(e["leafE"], e["leafW"]) for e in mod4.value["test:contA"]["listA"]
+            if "leafW" in e] == [("ABBA", 7), ("DEAD", 7)]
+    assert [e["leafE"] for e in mod4.value["test:contA"]["listA"]] == [
+        "ABBA", "DEAD", "C0FFEE"]
+    assert mod4.value["test:llistB"] == ArrayValue(["::1", "127.0.0.1", "::1"])
+    with pytest.raises(RawTypeError):
+        data_model.parse_json_patch([
+            {"op": "move", "from": "/test:contA",
+             "path": "/test:contA/testb:contB"}])
+    jpatch = data_model.parse_json_patch([
+        {"op": "add", "path": "/test:contA/leafB", "value": "x"}])
+    assert str(jpatch.apply(instance)[1][0][1]).startswith("[/0/value]")
+
+
 def test_validation(instance):
     assert instance.validate(ctype=ContentType.all) is None
     inst2 = instance.put_member("testb:leafQ", "ABBA").top()
     with pytest.raises(SchemaError):
         inst2.validate(ctype=ContentType.all)
+
+
+def test_validation_errors(instance):
+    assert instance.validation_errors(ctype=ContentType.all) == []
+    contt = instance["test:contT"]
+    bad = contt.update({"int8": -101, "bits": "tres", "decimal64": 4.5,
+                        "enumeration": "Mars"}, raw=True).top()
+    bad = bad.put_member("testb:leafQ", "ABBA")
+    bad = bad.top()["test:contA"].put_member("leafB", 10).top()
+    errs = bad.validation_errors(ctype=ContentType.all)
+    assert [(e.path, e.tag) for e in errs] == [
+        ("/", "member-not-allowed"),
+        ("/test:contA/listA/1/leafW", "instance-required"),
+        ("/test:contT/int8", "invalid-type"),
+        ("/test:contT/bits", "invalid-type"),
+        ("/test:contT/enumeration", "invalid-type"),
+        ("/testb:leafQ", "invalid-type")]
+    with pytest.raises(SchemaError) as exc:
+        bad.validate(ctype=ContentType.all)
+    assert str(exc.value) == str(errs[0])
+    assert [str(e) for e in bad.validation_errors(
+        ctype=ContentType.all, limit=2)] == [str(e) for e in errs[:2]]
+    assert bad.validation_errors(ctype=ContentType.all, limit=0) == []
+    assert len(bad.validation_errors(ValidationScope.syntax,
+                                     ContentType.all)) == 5
+
+
+def test_compiled_validation(data_model, instance):
+    ct = data_model.get_data_node("/test:contT")
+    vals = [0, -1, 100, 2**64, Decimal("3.14"), "", "hello world", "xx",
+            True, (None,), ("dos",), ("tres",), "Hearts", "Mars", b"xyz"]
+    for c in ct.data_children():
+        check = c.type._compile()
+        for v in vals:
+            try:
+                assert check(v) == (v in c.type)
+            except TypeError:
+                with pytest.raises(TypeError):
+                    v in c.type
+    sn = instance.schema_node
+    val = sn._validator(ValidationScope.all, ContentType.all)
+    assert sn._validator(ValidationScope.all, ContentType.all) is val
+    assert val[0] is None
+    assert ct._validator(ValidationScope.syntax, ContentType.all)[0]
+    contt = instance["test:contT"]
+    for m, v in [("int8", -101), ("decimal64", 4), ("enumeration", "Mars"),
+                 ("bits", ("tres",)), ("string", "xx xabcdefg")]:
+        bad = contt.put_member(m, v).top()
+        with pytest.raises(YangTypeError) as exc:
+            bad.validate(ctype=ContentType.all)
+        assert exc.value.path == "/test:contT/" + m
+        with pytest.raises(YangTypeError) as exc2:
+            sn._validate(bad, ValidationScope.all, ContentType.all)
+        assert str(exc.value) == str(exc2.value)
+
+
+def test_revalidate(instance):
+    assert instance.revalidate(instance, ctype=ContentType.all) is None
+    inst2 = instance["test:leafX"].update(53532).top()
+    assert inst2.revalidate(instance, ctype=ContentType.all) is None
+    inst3 = instance["test:contA"].put_member("leafB", 10).top()
+    with pytest.raises(SemanticError) as exc:
+        inst3.revalidate(instance, ctype=ContentType.all)
+    assert exc.value.tag == "instance-required"
+    inst4 = instance["test:contA"]["listA"][0].update(
+        {"leafE": "BEEF", "leafF": True}, raw=True).top()
+    with pytest.raises(SemanticError):
+        inst4.revalidate(instance, ctype=ContentType.all)
+    inst5 = inst4["test:contA"].put_member(
+        "testb:leafR", "BEEF", raw=True).top()
+    with pytest.raises(SemanticError):
+        inst5.revalidate(inst4, ctype=ContentType.all)
+    inst6 = inst5["test:contA"].put_member(
+        "testb:leafS", "/test:contA/leafB", raw=True).top()
+    assert inst6.revalidate(inst5, ctype=ContentType.all) is None
+    inst7 = instance.put_member("testb:leafQ", "ABBA").top()
+    with pytest.raises(SchemaError):
+        inst7.revalidate(instance, ctype=ContentType.all)
+
+
+def test_parallel_validation(data_model, instance):
+    lsn = data_model.get_data_node("/test:contA/listA")
+    big = instance["test:contA"].put_member("listA", [
+        {"leafE": f"{i:04X}", "leafF": True} for i in range(50)],
+        raw=True).top()
+    bad = big["test:contA"]["listA"][42].update(
+        {"leafE": "XYZ", "leafF": True}, raw=True).top()
+    with ParallelValidator(data_model, max_workers=2, min_entries=10,
+                           chunk_size=8) as pv:
+        assert pv._local_entries(lsn, ValidationScope.syntax)
+        assert not pv._local_entries(lsn, ValidationScope.all)
+        for scope in ValidationScope:
+            assert pv.validate(instance, scope, ContentType.all) is None
+        assert pv.validate(big, ValidationScope.syntax,
+                           ContentType.all) is None
+        with pytest.raises(YangTypeError) as exc:
+            pv.validate(bad, ValidationScope.syntax, ContentType.all)
+        assert exc.value.path == "/test:contA/listA/42/leafE"
+        bad2 = bad["test:contT"].update({"int8": -101}, raw=True).top()
+        with pytest.raises(YangTypeError) as exc:
+            pv.validate(bad2, ValidationScope.syntax, ContentType.all)
+        assert exc.value.path == "/test:contA/listA/42/leafE"
+        with pytest.raises(SchemaError):
+            pv.validate(bad.put_member("testb:leafQ", "ABBA").top(),
+                        ValidationScope.syntax, ContentType.all)
+
+
+def test_leafref_index(instance):
+    leafw = instance["test:contA"]["listA"][1]["leafW"]
+    assert [n.json_pointer() for n in leafw._deref()] == ["/test:contA/leafB"]
+    leafr = instance["test:contA"]["testb:leafR"]
+    assert leafr.schema_node.type._anchor_ups == 1
+    with _validation_run() as ctx:
+        assert [n.json_pointer() for n in leafw._deref()] == [
+            "/test:contA/leafB"]
+        assert [n.json_pointer() for n in leafr._deref()] == [
+            "/test:contA/listA/0/leafE"]
+        assert len(ctx.leafref_index) == 2
+        with _validation_run() as ctx2:
+            assert ctx2 is ctx
+    bad = leafr.update("ABBA", raw=True).top()["test:contA"]["listA"][1]
+    bad = bad.update({"leafE": "BEEF", "leafF": False}, raw=True).top()
+    with pytest.raises(SemanticError) as exc:
+        bad.validate(ctype=ContentType.all)
+    assert exc.value.path == "/test:contA/testb:leafR"
+
+
+def test_unique(data_model, instance):
+    lsn = data_model.get_data_node("/test:contA/listA")
+    uex, = lsn._unique_extractors()
+    lsta = instance["test:contA"]["listA"]
+    assert [uex(en) for en in lsta.value] == [("foo1-bar",), (None,)]
+    assert lsn._compile_list_props()(lsta.value)
+    bad = lsta[1].put_member(
+        "contD", {"leafG": "foo1-bar"}, raw=True).up().up()
+    assert not lsn._compile_list_props()(bad.value)
+    with pytest.raises(SemanticError) as exc:
+        bad.top().validate(ctype=ContentType.all)
+    assert exc.value.tag == "data-not-unique"
+    assert [e.tag for e in bad.top().validation_errors(
+        ctype=ContentType.all)] == ["data-not-unique"]
+
+
+def test_pattern_automaton(data_model, instance):
+    conta = instance["test:contA"]
+    aut = conta.schema_node._pattern_automaton(ContentType.all)
+    assert aut is conta.schema_node._pattern_automaton(ContentType.all)
+    st = aut.start(aut.guards(conta))
+    assert st.mandatory_members() == [
+        "testb:leafV", "anydA", "listA", "leafB"]
+    for m in conta:
+        assert st.step(m) is st.step(m)
+        st = st.step(m)
+    assert st.nullable
+    assert st.step("bogus") is None
+    cone = conta["listA"][0]["contD"]["contE"]
+    aut = cone.schema_node._pattern_automaton(ContentType.all)
+    assert aut.guards(cone) == (True,)
+    assert aut.start((True,)).step("leafP")
+    assert aut.start((False,)).step("leafP") is None
+    assert [str(e) for e in conta.schema_node._schema_pattern_errors(
+        conta.delete_item("leafB"), ContentType.all)] == [
+            "[/test:contA] missing-data: expected 'leafB'"]
+
+
+def test_validation_context(data_model, instance):
+    typ = data_model.get_data_node("/test:contA/leafB").type
+    info = (typ.error_tag, typ.error_message)
+    cone = instance["test:contA"]["listA"][0]["contD"]["contE"]
+    bad = [cone.put_member("leafP", 300, raw=True).top(),
+           cone.put_member("leafU", False, raw=True).top()]
+    with _validation_run() as ctx:
+        assert "x" not in typ
+        assert typ.error_tag == "invalid-type"
+        assert ctx.type_errors[typ][0] == "invalid-type"
+    assert (typ.error_tag, typ.error_message) == info
+    expected = [[str(e) for e in b.validation_errors(ctype=ContentType.all)]
+                for b in bad]
+    assert expected == [
+        ["[/test:contA/listA/0/contD/contE/leafP] invalid-type: "
+         "expected uint8"],
+        ["[/test:contA/listA/0/contD/contE] member-not-allowed: leafP"]]
+    data_model.clear_val_counters()
+    results = []
+
+    def run(b):
+        for i in range(20):
+            results.append([str(e) for e in
+                            b.validation_errors(ctype=ContentType.all)])
+    threads = [threading.Thread(target=run, args=(bad[i % 2],))
+               for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == sorted(40 * expected)
+    assert data_model.get_data_node("/test:contA").val_count == 80
+
+
+def test_validation_profiler(instance):
+    bad = instance["test:contA"].put_member("leafB", "x").top()
+    errs = [str(e) for e in bad.validation_errors(ctype=ContentType.all)]
+    with ValidationProfiler() as prof:
+        instance.validate(ctype=ContentType.all)
+        assert [str(e) for e in bad.validation_errors(
+            ctype=ContentType.all)] == errs
+        with pytest.raises(YangTypeError):
+            bad.validate(ctype=ContentType.all)
+    instance.validate(ctype=ContentType.all)
+    nodes = json.loads(prof.to_json())["nodes"]
+    assert nodes["/test:contA"]["count"] == 3
+    assert nodes["/test:contA"]["checks"]["must not(leafA <= leafB)"][
+        "count"] == 3
+    assert nodes["/test:contA/listA/leafW"]["checks"]["reference"][
+        "count"] == 2
+    stacks = [l.rpartition(" ")[0]
+              for l in prof.collapsed_stacks().splitlines()]
+    assert ("/;test:contA;listA;contD;contE;schema;"
+            "when ../leafU != 'false'") in stacks
+    path, check, cnt, tm = prof.hot_checks(1)[0]
+    assert tm == max([c["time"] for n in nodes.values()
+                      for c in n["checks"].values()])
+    prof.clear()
+    assert prof.collapsed_stacks() == ""
+
+
+def test_validate_raw(data_model):
+    raw = {"test:contA": {
+        "leafB": 9, "testb:leafV": 99, "testb:leafN": "hi!",
+        "anydA": {"foo:bar": [1, 2, 3]},
+        "listA": [
+            {"leafE": "C0FFEE", "leafF": True,
+             "contD": {"leafG": "foo1-bar",
+                       "contE": {"leafJ": [None], "leafP": 10}}},
+            {"leafE": "ABBA", "leafW": 9, "leafF": False}]},
+           "test:contT": {"decimal64": 4.5, "enumeration": "Hearts"}}
+    assert data_model.validate_raw(raw, ContentType.all) is None
+    cone = raw["test:contA"]["listA"][0]["contD"]["contE"]
+    for edit in [("leafU", False), ("leafP", 256), ("leafJ", "x"),
+                 ("bogus", 1), ("@leafJ", {"foo:bar": 1})]:
+        bad = json.loads(json.dumps(raw))
+        bcone = bad["test:contA"]["listA"][0]["contD"]["contE"]
+        bcone[edit[0]] = edit[1]
+        with pytest.raises(YangsonException) as exc:
+            data_model.from_raw(bad).validate(
+                ValidationScope.syntax, ContentType.all)
+        with pytest.raises(type(exc.value)) as exc2:
+            data_model.validate_raw(bad, ContentType.all)
+        assert str(exc2.value) == str(exc.value)
+    del cone["leafP"]
+    cone["leafU"] = False
+    assert data_model.validate_raw(raw, ContentType.all) is None
+    del raw["test:contA"]["leafB"]
+    with pytest.raises(SchemaError) as exc:
+        data_model.validate_raw(raw, ContentType.all)
+    assert exc.value.path == "/test:contA"
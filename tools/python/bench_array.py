@@ -0,0 +1,72 @@
+"""
+This script measures the time needed for accessing, updating and zipping
+entries of large YANG lists. For comparison, the same operations are also
+timed with the original zipper that copied the whole array into two linked
+lists on every entry access.
+
+The script is supposed to be run from the top directory of the Yangson
+repository. An optional argument is a comma-separated list of list sizes.
+"""
+
+import sys
+import time
+
+from yangson import DataModel
+from yangson.instance import ArrayEntry, LinkedList
+
+sizes = ([int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1
+         else [10000, 100000, 1000000])
+"""Numbers of list entries to be tested."""
+probes = 100
+"""Number of entries accessed in each measurement."""
+
+dm = DataModel.from_file("yang-modules/test/yang-library.json",
+                         ["yang-modules/test", "yang-modules/ietf"])
+
+
+def linked_entry(inst, i):
+    """Return array entry the way the original zipper did."""
+    val = inst.value
+    return ArrayEntry(i, LinkedList.from_list(val[:i], reverse=True),
+                      LinkedList.from_list(val[i + 1:]), val[i], inst,
+                      inst.schema_node, val.timestamp)
+
+
+def timeit(func, lsta, n):
+    """Return average duration of `func` in microseconds."""
+    step = max(n // probes, 1)
+    start = time.perf_counter()
+    for i in range(0, n, step):
+        func(lsta, i)
+    return (time.perf_counter() - start) / len(range(0, n, step)) * 1e6
+
+
+def access(lsta, i):
+    lsta[i]
+
+
+def update_up(lsta, i):
+    lsta[i].update({"leafE": "ABBA", "leafF": False}, raw=True).up()
+
+
+def linked_access(lsta, i):
+    linked_entry(lsta, i)
+
+
+def linked_update_up(lsta, i):
+    linked_entry(lsta, i).update({"leafE": "ABBA", "leafF": False},
+                                 raw=True).up()
+
+
+print(f"{'entries':>9} {'operation':<12} {'linked [us]':>13} "
+      f"{'slices [us]':>13} {'speedup':>9}")
+for n in sizes:
+    raw = {"test:contA": {"leafB": 9, "testb:leafV": 1, "listA": [
+        {"leafE": format(i, "X"), "leafF": True} for i in range(n)]}}
+    lsta = dm.from_raw(raw)["test:contA"]["listA"]
+    for name, old, new in (("access", linked_access, access),
+                           ("update+up", linked_update_up, update_up)):
+        told = timeit(old, lsta, n)
+        tnew = timeit(new, lsta, n)
+        print(f"{n:>9} {name:<12} {told:>13.1f} {tnew:>13.1f} "
+              f"{told / tnew:>8.0f}x")
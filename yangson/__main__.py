@@ -27,8 +27,8 @@ from yangson import DataModel
 from yangson.enumerations import ContentType, ValidationScope
 from yangson.exceptions import (
     BadYangLibraryData, FeaturePrerequisiteError, MultipleImplementedRevisions,
-    ModuleNotFound, ModuleNotRegistered, RawMemberError, RawTypeError,
-    SchemaError, SemanticError, YangTypeError)
+    ModuleNotFound, ModuleNotRegistered, ParserException, RawMemberError,
+    RawTypeError, SchemaError, SemanticError, YangTypeError)
 
 
 def main(ylib: str = None, path: str = None,
@@ -138,13 +138,10 @@ def main(ylib: str = None, path: str = None,
         return 0
     try:
         with open(validate, encoding="utf-8") as infile:
-            itxt = json.load(infile)
-    except (FileNotFoundError, PermissionError,
-            json.decoder.JSONDecodeError) as e:
+            i = dm.from_stream(infile)
+    except (FileNotFoundError, PermissionError, ParserException) as e:
         print("Instance data:", str(e), file=sys.stderr)
         return 1
-    try:
-        i = dm.from_raw(itxt)
     except RawMemberError as e:
         print("Illegal object member:", str(e), file=sys.stderr)
         return 3
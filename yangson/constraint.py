@@ -76,6 +76,14 @@ class Intervals(Constraint):
                 return True
         return False
 
+    def _compile(self) -> Callable[[Number], bool]:
+        """Return a function that tests whether a number is in the receiver."""
+        bounds = tuple([(r[0], r[-1]) for r in self.intervals])
+        if len(bounds) == 1:
+            lo, hi = bounds[0]
+            return lambda value: lo <= value <= hi
+        return lambda value: any(lo <= value <= hi for lo, hi in bounds)
+
     def __str__(self) -> str:
         """Return string representation of the receiver."""
         return " | ".join([f"{r[0]!s}..{r[-1]!s}" if len(r) > 1 else str(r[0])
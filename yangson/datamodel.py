@@ -24,11 +24,14 @@ This module implements the following class:
 
 import hashlib
 import json
-from typing import Optional, Tuple
-from .enumerations import ContentType
+from typing import IO, List, Optional, Tuple
+from .enumerations import ContentType, ValidationScope
 from .exceptions import BadYangLibraryData
+from .jsonstream import JSONStreamReader
 from .instance import (InstanceRoute, InstanceIdParser, ResourceIdParser,
-                       RootNode)
+                       RootNode, _validation_run)
+from .instvalue import Timestamp, next_timestamp
+from .patch import JSONPatch, YangPatch
 from .schemadata import SchemaData, SchemaContext
 from .schemanode import DataNode, SchemaTreeNode, RawObject, SchemaNode
 from .typealiases import DataPath, SchemaPath
@@ -39,13 +42,16 @@ class DataModel:
 
     @classmethod
     def from_file(cls, name: str, mod_path: Tuple[str] = (".",),
-                  description: str = None) -> "DataModel":
+                  description: str = None,
+                  logical_clock: bool = False) -> "DataModel":
         """Initialize the data model from a file with YANG library data.
 
         Args:
             name: Name of a file with YANG library data.
             mod_path: Tuple of directories where to look for YANG modules.
             description:  Optional description of the data model.
+            logical_clock: Flag to be set if data trees should use
+                revision numbers instead of date and time as timestamps.
 
         Returns:
             The data model instance.
@@ -55,16 +61,18 @@ class DataModel:
         """
         with open(name, encoding="utf-8") as infile:
             yltxt = infile.read()
-        return cls(yltxt, mod_path, description)
+        return cls(yltxt, mod_path, description, logical_clock)
 
     def __init__(self, yltxt: str, mod_path: Tuple[str] = (".",),
-                 description: str = None):
+                 description: str = None, logical_clock: bool = False):
         """Initialize the class instance.
 
         Args:
             yltxt: JSON text with YANG library data.
             mod_path: Tuple of directories where to look for YANG modules.
             description: Optional description of the data model.
+            logical_clock: Flag to be set if data trees should use
+                revision numbers instead of date and time as timestamps.
 
         Raises:
             BadYangLibraryData: If YANG library data is invalid.
@@ -75,6 +83,7 @@ class DataModel:
             ModuleNotFound: If a YANG module wasn't found in any of the
                 directories specified in `mod_path`.
         """
+        self.logical_clock = logical_clock
         self.schema = SchemaTreeNode()
         self.schema._ctype = ContentType.all
         try:
@@ -97,17 +106,82 @@ class DataModel:
         fnames = sorted(["@".join(m) for m in self.schema_data.modules])
         return hashlib.sha1("".join(fnames).encode("ascii")).hexdigest()
 
-    def from_raw(self, robj: RawObject) -> RootNode:
+    def from_raw(self, robj: RawObject, lazy: bool = False) -> RootNode:
         """Create an instance node from a raw data tree.
 
         Args:
             robj: Dictionary representing a raw data tree.
+            lazy: Flag to be set if structured values should be cooked
+                only when they are first accessed.
 
         Returns:
             Root instance node.
         """
-        cooked = self.schema.from_raw(robj)
-        return RootNode(cooked, self.schema, cooked.timestamp)
+        ts = self._new_timestamp()
+        cooked = (self.schema.lazy_from_raw(robj, "", ts) if lazy
+                  else self.schema.from_raw(robj, "", ts))
+        return RootNode(cooked, self.schema, ts)
+
+    def validate_raw(self, robj: RawObject,
+                     ctype: ContentType = ContentType.config) -> None:
+        """Validate a raw data tree in the syntax scope.
+
+        The result and the exceptions are the same as for
+        ``self.from_raw(robj).validate(ValidationScope.syntax, ctype)``,
+        but valid data trees are validated without cooking them. Only
+        if a member guarded by a **when** expression is present, the data
+        tree is cooked lazily as far as necessary for evaluating it.
+
+        Args:
+            robj: Dictionary representing a raw data tree.
+            ctype: Content type of the data tree.
+
+        Raises:
+            RawMemberError: If a member inside `robj` is not defined in the
+                schema.
+            RawTypeError: If a scalar value inside `robj` is of incorrect
+                type.
+            SchemaError: If the data tree doesn't conform to the schema.
+            YangTypeError: If a scalar value is of incorrect type.
+        """
+        with _validation_run() as ctx:
+            check = self.schema._raw_validator(ctype)
+            if check is not None:
+                saved = (ctx.raw_data, ctx.raw_root)
+                ctx.raw_data, ctx.raw_root = robj, None
+                try:
+                    if check(robj, None, None):
+                        return
+                except Exception:
+                    pass            # reported by the validation below
+                finally:
+                    ctx.raw_data, ctx.raw_root = saved
+            self.from_raw(robj).validate(ValidationScope.syntax, ctype)
+
+    def from_stream(self, stream: IO) -> RootNode:
+        """Create an instance node from a stream with JSON text.
+
+        The data tree is cooked while the JSON text is being parsed, so
+        that no raw data tree is created.
+
+        Args:
+            stream: Text or binary (UTF-8) stream with JSON data.
+
+        Returns:
+            Root instance node.
+
+        Raises:
+            EndOfInput: If the JSON text is incomplete.
+            UnexpectedInput: If the JSON text is invalid.
+            RawMemberError: If an object member is not defined in the
+                schema.
+            RawTypeError: If a value is of incorrect type.
+        """
+        reader = JSONStreamReader(stream)
+        ts = self._new_timestamp()
+        cooked = self.schema.from_events(reader, next(reader), "", ts)
+        reader.end()
+        return RootNode(cooked, self.schema, ts)
 
     def get_schema_node(self, path: SchemaPath) -> Optional[SchemaNode]:
         """Return the schema node addressed by a schema path.
@@ -166,6 +240,32 @@ class DataModel:
     def parse_resource_id(self, text: str) -> InstanceRoute:
         return ResourceIdParser(text, self.schema).parse()
 
+    def parse_yang_patch(self, rpatch: RawObject,
+                         target: str = "/") -> YangPatch:
+        """Parse a YANG Patch document.
+
+        Args:
+            rpatch: Raw YANG Patch document.
+            target: Resource identifier of the patch target.
+
+        Raises:
+            The same exceptions as the :class:`~.patch.YangPatch`
+            constructor.
+        """
+        return YangPatch(rpatch, self.schema, target)
+
+    def parse_json_patch(self, rpatch: List[RawObject]) -> JSONPatch:
+        """Parse a JSON Patch document.
+
+        Args:
+            rpatch: Raw JSON Patch document.
+
+        Raises:
+            The same exceptions as the :class:`~.patch.JSONPatch`
+            constructor.
+        """
+        return JSONPatch(rpatch, self.schema)
+
     def schema_digest(self) -> str:
         """Generate schema digest (to be used primarily by clients).
 
@@ -190,3 +290,7 @@ class DataModel:
                 self.schema._augment_stmt(aug, sctx)
         self.schema._post_process()
         self.schema._make_schema_patterns()
+
+    def _new_timestamp(self) -> Timestamp:
+        """Return timestamp for a newly created data tree."""
+        return next_timestamp(0 if self.logical_clock else None)
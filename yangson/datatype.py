@@ -47,15 +47,18 @@ This module implements the following classes:
 import base64
 import decimal
 import numbers
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from .constraint import Intervals, Pattern
+from .enumerations import Axis
 from .exceptions import (
     InvalidArgument, ParserException, ModuleNotRegistered, UnknownPrefix)
 from .schemadata import SchemaContext
-from .instance import InstanceNode, InstanceIdParser, InstanceRoute
+from .instance import (InstanceNode, InstanceIdParser, InstanceRoute,
+                       _validation_context)
 from .statement import Statement
 from .typealiases import QualName, RawScalar, ScalarValue, YangIdentifier
+from .xpathast import Expr, LocationPath, Root, Step
 from .xpathparser import XPathParser
 
 
@@ -69,8 +72,17 @@ class DataType:
         self.sctx = sctx
         self.default = None
         self.name = name
-        self.error_tag = None
-        self.error_message = None
+        self._error_info = (None, None)  # type: Tuple[Optional[str], Optional[str]]
+
+    @property
+    def error_tag(self) -> Optional[str]:
+        """Error tag of the most recent failed validation."""
+        return self._last_error()[0]
+
+    @property
+    def error_message(self) -> Optional[str]:
+        """Error message of the most recent failed validation."""
+        return self._last_error()[1]
 
     def __contains__(self, val: ScalarValue) -> bool:
         """Return ``True`` if the receiver type contains `val`.
@@ -80,6 +92,15 @@ class DataType:
         """
         return True
 
+    def _compile(self) -> Callable[[ScalarValue], bool]:
+        """Return a function that tests whether a value is in the receiver.
+
+        Unlike :meth:`__contains__`, the returned function need not set
+        `error_tag` and `error_message` properties, so it is intended for
+        the fast path of validation.
+        """
+        return self.__contains__
+
     def __str__(self):
         """Return YANG name of the receiver type."""
         base = self.yang_type()
@@ -132,9 +153,25 @@ class DataType:
         return self.__class__.__name__[:-4].lower()
 
     def _set_error_info(self, error_tag: str = None, error_message: str = None):
-        self.error_tag = error_tag if error_tag else "invalid-type"
-        self.error_message = (error_message if error_message else
-                              "expected " + str(self))
+        """Record error tag and message of a failed validation.
+
+        During a validation run, they are recorded in the context of that
+        run rather than in the receiver.
+        """
+        info = (error_tag if error_tag else "invalid-type",
+                error_message if error_message else "expected " + str(self))
+        ctx = _validation_context.get()
+        if ctx is None:
+            self._error_info = info
+        else:
+            ctx.type_errors[self] = info
+
+    def _last_error(self) -> Tuple[Optional[str], Optional[str]]:
+        """Return error tag and message of the most recent failure."""
+        ctx = _validation_context.get()
+        if ctx is None:
+            return self._error_info
+        return ctx.type_errors.get(self, (None, None))
 
     @classmethod
     def _resolve_type(cls, stmt: Statement, sctx: SchemaContext) -> "DataType":
@@ -211,6 +248,9 @@ class EmptyType(DataType):
         self._set_error_info()
         return False
 
+    def _compile(self) -> Callable[[Tuple[None]], bool]:
+        return lambda val: val == (None,)
+
     def parse_value(self, text: str) -> Optional[Tuple[None]]:
         if text == "":
             return (None,)
@@ -245,6 +285,9 @@ class BitsType(DataType):
                 return False
         return True
 
+    def _compile(self) -> Callable[[Tuple[str]], bool]:
+        return frozenset(self.bit).issuperset
+
     def to_raw(self, val: Tuple[str]) -> str:
         return self.canonical_string(val)
 
@@ -314,6 +357,9 @@ class BooleanType(DataType):
         self._set_error_info()
         return False
 
+    def _compile(self) -> Callable[[bool], bool]:
+        return lambda val: isinstance(val, bool)
+
     def from_raw(self, raw: RawScalar) -> Optional[bool]:
         """Override superclass method."""
         if isinstance(raw, bool):
@@ -393,6 +439,23 @@ class StringType(LinearType):
                 return False
         return True
 
+    def _compile(self) -> Callable[[str], bool]:
+        length = self.length._compile() if self.length else None
+        patterns = [(p.regex.match, p.invert_match) for p in self.patterns]
+        if length is None and not patterns:
+            return lambda val: isinstance(val, str)
+
+        def check(val: str) -> bool:
+            if not isinstance(val, str):
+                return False
+            if length and not length(len(val)):
+                return False
+            for match, invert in patterns:
+                if (match(val) is not None) == invert:
+                    return False
+            return True
+        return check
+
     def _type_digest(self, config: bool) -> Dict[str, Any]:
         res = super()._type_digest(config)
         pats = [p.pattern for p in self.patterns if not p.invert_match]
@@ -420,6 +483,12 @@ class BinaryType(LinearType):
             return False
         return super().__contains__(val)
 
+    def _compile(self) -> Callable[[bytes], bool]:
+        if self.length is None:
+            return lambda val: isinstance(val, bytes)
+        length = self.length._compile()
+        return lambda val: isinstance(val, bytes) and length(len(val))
+
     def to_raw(self, val: bytes) -> str:
         return self.canonical_string(val)
 
@@ -445,6 +514,9 @@ class EnumerationType(DataType):
         self._set_error_info()
         return False
 
+    def _compile(self) -> Callable[[str], bool]:
+        return frozenset(self.enum).__contains__
+
     def _handle_properties(self, stmt: Statement, sctx: SchemaContext) -> None:
         """Handle **enum** statements."""
         nextval = 0
@@ -499,11 +571,48 @@ class LeafrefType(LinkType):
         super().__init__(sctx, name)
         self.path = None
         self.ref_type = None
+        self._anchor_ups = None  # type: Optional[int]
 
     def _handle_properties(self, stmt: Statement, sctx: SchemaContext) -> None:
         super()._handle_properties(stmt, sctx)
         self.path = XPathParser(
             stmt.find1("path", required=True).argument, sctx).parse()
+        self._anchor_ups = self._path_anchor(self.path)
+
+    @staticmethod
+    def _path_anchor(path: Expr) -> Optional[int]:
+        """Find out where the targets of a leafref path are selected from.
+
+        If the path doesn't contain predicates, its targets depend only
+        on the anchor node, which is either the root or an ancestor of
+        the leafref instance.
+
+        Returns:
+            Number of parent steps leading to the anchor, -1 for the
+            root, or ``None`` if the targets may depend on the leafref
+            instance.
+        """
+        steps = []
+        while isinstance(path, LocationPath):
+            steps.append(path.right)
+            path = path.left
+        steps.append(path)
+        steps.reverse()
+        if isinstance(steps[0], Root):
+            i = 1
+            res = -1
+        else:
+            i = 0
+            while (i < len(steps) and isinstance(steps[i], Step) and
+                   steps[i].axis == Axis.parent and steps[i].qname is None and
+                   not steps[i].predicates):
+                i += 1
+            res = i
+        for st in steps[i:]:
+            if not (isinstance(st, Step) and st.axis == Axis.child and
+                    not st.predicates):
+                return None
+        return res
 
     def canonical_string(self, val: ScalarValue) -> Optional[str]:
         return self.ref_type.canonical_string(val)
@@ -511,6 +620,9 @@ class LeafrefType(LinkType):
     def __contains__(self, val: ScalarValue) -> bool:
         return val in self.ref_type
 
+    def _compile(self) -> Callable[[ScalarValue], bool]:
+        return self.ref_type._compile()
+
     def from_raw(self, raw: RawScalar) -> Optional[ScalarValue]:
         return self.ref_type.from_raw(raw)
 
@@ -518,8 +630,38 @@ class LeafrefType(LinkType):
         return self.ref_type.to_raw(val)
 
     def _deref(self, node: InstanceNode) -> List[InstanceNode]:
-        ns = self.path.evaluate(node)
-        return [n for n in ns if str(n) == str(node)]
+        ctx = _validation_context.get()
+        if ctx is None or self._anchor_ups is None:
+            ns = self.path.evaluate(node)
+            return [n for n in ns if str(n) == str(node)]
+        return self._target_index(node, ctx.leafref_index).get(str(node), [])
+
+    def _target_index(self, node: InstanceNode,
+                      cache: Dict[tuple, Dict[str, List[InstanceNode]]]
+                      ) -> Dict[str, List[InstanceNode]]:
+        """Return targets of the receiver's path indexed by their values.
+
+        The index is shared by all leafref instances with the same path
+        and anchor node, and it is stored in `cache`.
+
+        Args:
+            node: Leafref instance.
+            cache: Dictionary of target indices.
+        """
+        if self._anchor_ups < 0:
+            anchor = node.top()
+        else:
+            anchor = node
+            for i in range(self._anchor_ups):
+                anchor = anchor._parent()[0]
+        key = (self.path, node.namespace, anchor.path)
+        res = cache.get(key)
+        if res is None:
+            res = {}
+            for n in self.path.evaluate(node):
+                res.setdefault(str(n), []).append(n)
+            cache[key] = res
+        return res
 
     def _type_digest(self, config: bool) -> Dict[str, Any]:
         res = super()._type_digest(config)
@@ -573,6 +715,14 @@ class IdentityrefType(DataType):
                 return False
         return True
 
+    def _compile(self) -> Callable[[QualName], bool]:
+        if not self.bases:
+            return lambda val: True
+        sd = self.sctx.schema_data
+        return frozenset(
+            [i for i in sd.identity_adjs
+             if all(sd.is_derived_from(i, b) for b in self.bases)]).__contains__
+
     def to_raw(self, val: QualName) -> str:
         return self.canonical_string(val)
 
@@ -621,6 +771,12 @@ class NumericType(DataType):
         self._set_error_info(self.range.error_tag, self.range.error_message)
         return False
 
+    def _compile(self) -> Callable[[Union[int, decimal.Decimal]], bool]:
+        if self.range:
+            return self.range._compile()
+        lo, hi = self._range
+        return lambda val: lo <= val <= hi
+
     def _handle_restrictions(self, stmt: Statement, sctx: SchemaContext) -> None:
         rstmt = stmt.find1("range")
         if rstmt:
@@ -680,6 +836,10 @@ class Decimal64Type(NumericType):
             return False
         return super().__contains__(val)
 
+    def _compile(self) -> Callable[[decimal.Decimal], bool]:
+        in_range = super()._compile()
+        return lambda val: isinstance(val, decimal.Decimal) and in_range(val)
+
     def _type_digest(self, config: bool) -> Dict[str, Any]:
         res = super()._type_digest(config)
         res["fraction_digits"] = self.fraction_digits
@@ -695,6 +855,10 @@ class IntegralType(NumericType):
             return False
         return super().__contains__(val)
 
+    def _compile(self) -> Callable[[int], bool]:
+        in_range = super()._compile()
+        return lambda val: isinstance(val, int) and in_range(val)
+
     def parse_value(self, text: str) -> Optional[int]:
         """Override superclass method."""
         try:
@@ -816,6 +980,19 @@ class UnionType(DataType):
                 continue
         return False
 
+    def _compile(self) -> Callable[[Any], bool]:
+        checks = [t._compile() for t in self.types]
+
+        def check(val: Any) -> bool:
+            for ch in checks:
+                try:
+                    if ch(val):
+                        return True
+                except TypeError:
+                    continue
+            return False
+        return check
+
     def _handle_properties(self, stmt: Statement, sctx: SchemaContext) -> None:
         self.types = [self._resolve_type(ts, sctx)
                       for ts in stmt.find_all("type")]
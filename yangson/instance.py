@@ -20,35 +20,104 @@
 This module implements the following classes:
 
 * LinkedList: Persistent linked list of instance values.
+* ArraySlice: Persistent linked list backed by a part of an array.
 * InstanceNode: Abstract class for instance nodes.
 * RootNode: Root of the data tree.
 * ObjectMember: Instance node that is an object member.
 * ArrayEntry: Instance node that is an array entry.
+* EditSession: Batch of edits applied to a data tree.
 * InstanceRoute: Route into an instance value.
 * ResourceIdParser: Parser for RESTCONF resource identifiers.
 * InstanceIdParser: Parser for instance identifiers.
 """
 
-from datetime import datetime
+import io
 import json
-from typing import Dict, List, Optional, Tuple, Union
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (IO, Callable, Dict, Iterator, List, Optional, Tuple,
+                    Union)
 from urllib.parse import unquote
 from .enumerations import ContentType, ValidationScope
 from .exceptions import (BadSchemaNodeType, EndOfInput, InstanceException,
                          InstanceValueError, InvalidKeyValue,
                          NonexistentInstance, NonDataNode,
-                         NonexistentSchemaNode, UnexpectedInput)
+                         NonexistentSchemaNode, UnexpectedInput,
+                         ValidationError)
 from .instvalue import (ArrayValue, InstanceKey, ObjectValue, Value,
-                        ScalarValue, StructuredValue)
+                        ScalarValue, StructuredValue, Timestamp,
+                        later_timestamp, next_timestamp)
 from .parser import Parser
+from .profiler import _active_profiler
 from .typealiases import (InstanceName, JSONPointer, QualName, RawValue,
                           SchemaRoute, _Singleton, YangIdentifier)
 
 __all__ = ["InstanceNode", "RootNode", "ObjectMember", "ArrayEntry",
-           "InstanceIdParser", "ResourceIdParser", "InstanceRoute",
+           "EditSession", "InstanceIdParser", "ResourceIdParser",
+           "InstanceRoute",
            "InstanceException", "InstanceValueError", "NonexistentInstance"]
 
 
+class _ValidationContext:
+    """State shared by all checks of a single validation run."""
+
+    def __init__(self):
+        """Initialize the class instance."""
+        self.leafref_index = {}  # type: Dict[tuple, Dict[str, List[InstanceNode]]]
+        """Leafref targets indexed by their string values."""
+        self.when_values = {}  # type: Dict["Conditional", bool]
+        """Values of "when" expressions in schema patterns."""
+        self.type_errors = {}  # type: Dict["DataType", Tuple[str, str]]
+        """Error tag and message of the most recent failure of each type."""
+        self.val_counts = Counter()  # type: Counter
+        """Validation counts of schema nodes."""
+        self.raw_data = None  # type: Optional[RawValue]
+        """Raw data tree validated without cooking."""
+        self.raw_root = None  # type: Optional[RootNode]
+        """Lazily cooked data tree of `raw_data`, if it was needed."""
+        self.canonical_strings = {}  # type: Dict[tuple, str]
+        """Canonical strings of scalar values compared in XPath."""
+        self.xpath_values = {}  # type: Dict[tuple, Tuple[Value, "XPathValue"]]
+        """Values of absolute XPath expressions with their root values."""
+        self.xpath_root = None  # type: Optional[InstanceNode]
+        """Root node of the data tree in which a dummy instance is used."""
+
+    def _update_counters(self) -> None:
+        """Add the receiver's validation counts to schema nodes."""
+        with _counter_lock:
+            for sn, cnt in self.val_counts.items():
+                sn.val_count += cnt
+
+
+_counter_lock = threading.Lock()
+"""Lock protecting validation counters of schema nodes."""
+
+
+_validation_context = ContextVar("_validation_context", default=None)
+"""Context of the validation run in progress."""
+
+
+@contextmanager
+def _validation_run() -> Iterator[_ValidationContext]:
+    """Return the context of the validation run in progress.
+
+    A new run is started if none is in progress.
+    """
+    ctx = _validation_context.get()
+    if ctx is not None:
+        yield ctx
+        return
+    ctx = _ValidationContext()
+    token = _validation_context.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _validation_context.reset(token)
+        ctx._update_counters()
+
+
 class LinkedList:
     """Persistent linked list of instance values."""
 
@@ -119,23 +188,94 @@ class EmptyList(LinkedList, metaclass=_Singleton):
         raise IndexError
 
 
+class ArraySlice(LinkedList):
+    """Persistent linked list backed by a part of an array.
+
+    The receiver contains entries of `array` from `start` up to (but
+    not including) `stop`, or in the opposite order if `reverse` is
+    set. The array is shared, not copied, so that the receiver can be
+    created, popped and consed in constant time.
+    """
+
+    def __init__(self, array: ArrayValue, start: int, stop: int,
+                 reverse: bool = False):
+        """Initialize the class instance."""
+        self.array = array
+        """Underlying array."""
+        self.start = start
+        """Index of the first array entry in the receiver."""
+        self.stop = stop
+        """Index following the last array entry in the receiver."""
+        self.reverse = reverse
+        """Flag indicating that the entries are in reverse order."""
+
+    @property
+    def head(self) -> Value:
+        """Head of the linked list."""
+        return self.array[self.stop - 1 if self.reverse else self.start]
+
+    @property
+    def tail(self) -> LinkedList:
+        """Tail of the linked list."""
+        return self.pop()[1]
+
+    def __bool__(self):
+        """Return receiver's boolean value."""
+        return self.start < self.stop
+
+    def __iter__(self):
+        """Iterate over receiver's entries."""
+        if self.reverse:
+            return reversed(self.array[self.start:self.stop])
+        return iter(self.array[self.start:self.stop])
+
+    def cons(self, val: Value) -> LinkedList:
+        """Override the superclass method.
+
+        If `val` is the array entry adjacent to the receiver, the result
+        is again backed by the array.
+        """
+        if self.reverse:
+            if self.stop < len(self.array) and self.array[self.stop] is val:
+                return ArraySlice(self.array, self.start, self.stop + 1, True)
+        elif self.start > 0 and self.array[self.start - 1] is val:
+            return ArraySlice(self.array, self.start - 1, self.stop)
+        return LinkedList(val, self)
+
+    def pop(self) -> Tuple[Value, LinkedList]:
+        """Override the superclass method."""
+        if self.start >= self.stop:
+            raise IndexError
+        if self.reverse:
+            return (self.array[self.stop - 1],
+                    ArraySlice(self.array, self.start, self.stop - 1, True))
+        return (self.array[self.start],
+                ArraySlice(self.array, self.start + 1, self.stop))
+
+
+_missing = object()
+"""Marker of a missing object member."""
+
+
 class InstanceNode:
     """YANG data node instance implemented as a zipper structure."""
     _key: InstanceKey
 
     def __init__(self, key: InstanceKey, value: Value,
                  parinst: Optional["InstanceNode"],
-                 schema_node: "DataNode", timestamp: datetime):
+                 schema_node: "DataNode", timestamp: Timestamp):
         """Initialize the class instance."""
         self._key = key
         self.parinst = parinst         # type: Optional["InstanceNode"]
         """Parent instance node, or ``None`` for the root node."""
         self.schema_node = schema_node  # type: DataNode
         """Data node corresponding to the instance node."""
-        self.timestamp = timestamp     # type: datetime
+        self.timestamp = timestamp     # type: Timestamp
         """Time of the receiver's last modification."""
         self.value = value             # type: Value
         """Value of the receiver."""
+        self._path = None if parinst else ()
+        self._jptr = None if parinst else ""
 
     @property
     def name(self) -> InstanceName:
@@ -149,13 +289,22 @@ class InstanceNode:
 
     @property
     def path(self) -> Tuple[InstanceKey]:
-        """Return the list of keys on the path from root to the receiver."""
-        res = []
-        inst: InstanceNode = self
-        while inst.parinst:
-            res.insert(0, inst._key)
-            inst = inst.parinst
-        return tuple(res)
+        """Return the list of keys on the path from root to the receiver.
+
+        The path is cached in the receiver and its ancestors, so that
+        it is computed only once for every instance node.
+        """
+        if self._path is None:
+            todo = []
+            inst: InstanceNode = self
+            while inst._path is None:
+                todo.append(inst)
+                inst = inst.parinst
+            res = inst._path
+            for inst in reversed(todo):
+                res += (inst._key,)
+                inst._path = res
+        return self._path
 
     def __str__(self) -> str:
         """Return string representation of the receiver's value."""
@@ -165,7 +314,17 @@ class InstanceNode:
 
     def json_pointer(self) -> JSONPointer:
         """Return JSON Pointer [RFC6901]_ of the receiver."""
-        return "/" + "/".join(str(c) for c in self.path)
+        if self._jptr is None:
+            todo = []
+            inst: InstanceNode = self
+            while inst._jptr is None:
+                todo.append(inst)
+                inst = inst.parinst
+            res = inst._jptr
+            for inst in reversed(todo):
+                res += "/" + str(inst._key)
+                inst._jptr = res
+        return self._jptr or "/"
 
     def __getitem__(self, key: InstanceKey) -> "InstanceNode":
         """Return member or entry with the given key.
@@ -230,9 +389,12 @@ class InstanceNode:
         if not isinstance(self.value, ObjectValue):
             raise InstanceValueError(self.json_pointer(), "member of non-object")
         csn = self._member_schema_node(name)
-        newval = self.value.copy()
-        newval[name] = csn.from_raw(value, self.json_pointer()) if raw else value
-        return self._copy(newval)._member(name)
+        ts = next_timestamp(self.timestamp)
+        newval = csn.from_raw(value, self.json_pointer(), ts) if raw else value
+        obj = self.value.copy()
+        obj[name] = newval
+        return ObjectMember(name, obj, newval, self._copy(obj), csn,
+                            obj.timestamp)
 
     def delete_item(self, key: InstanceKey) -> "InstanceNode":
         """Delete an item (member or entry) from receiver's value.
@@ -260,7 +422,7 @@ class InstanceNode:
         Raises:
             NonexistentInstance: If there is no parent.
         """
-        ts = max(self.timestamp, self.parinst.timestamp)
+        ts = later_timestamp(self.timestamp, self.parinst.timestamp)
         return self.parinst._copy(self._zip(), ts)
 
     def top(self) -> "InstanceNode":
@@ -282,7 +444,8 @@ class InstanceNode:
             Copy of the receiver with the updated value.
         """
         newval = self.schema_node.from_raw(
-            value, self.json_pointer()) if raw else value
+            value, self.json_pointer(),
+            next_timestamp(self.timestamp)) if raw else value
         return self._copy(newval)
 
     def goto(self, iroute: "InstanceRoute") -> "InstanceNode":
@@ -333,7 +496,36 @@ class InstanceNode:
             SemanticError: If the value violates a semantic constraint.
             YangTypeError: If the value is a scalar of incorrect type.
         """
-        self.schema_node._validate(self, scope, ctype)
+        with _validation_run():
+            prof = _active_profiler.get()
+            if prof is None:
+                self.schema_node._validator(scope, ctype)[1](self)
+                return
+            with prof._node(self.schema_node):
+                self.schema_node._validate(self, scope, ctype)
+
+    def validation_errors(self, scope: ValidationScope = ValidationScope.all,
+                          ctype: ContentType = ContentType.config,
+                          limit: int = None) -> List[ValidationError]:
+        """Validate the receiver's value and return all errors found.
+
+        Unlike :meth:`validate`, validation continues after an error.
+
+        Args:
+            scope: Scope of the validation (syntax, semantics or all).
+            ctype: Receiver's content type.
+            limit: Maximum number of errors to collect (``None`` means
+                no limit). If it is less than 1, no validation is
+                performed and the result is empty.
+
+        Returns:
+            List of validation errors (instances of :exc:`SchemaError`,
+            :exc:`SemanticError` and :exc:`YangTypeError`) in the order
+            in which they were found, empty if the value is valid.
+        """
+        with _validation_run():
+            return self.schema_node._validation_errors(
+                self, scope, ctype, limit)
 
     def add_defaults(self, ctype: ContentType = None) -> "InstanceNode":
         """Return the receiver with defaults added recursively to its value.
@@ -372,15 +564,58 @@ class InstanceNode:
             return [en.raw_value() for en in self]
         return self.schema_node.type.to_raw(self.value)
 
+    def json_chunks(self, chunk_size: int = 65536) -> Iterator[str]:
+        """Generate JSON text of receiver's value in chunks.
+
+        The text is generated directly from the cooked value, without
+        creating a raw value or instance nodes for the descendants.
+
+        Args:
+            chunk_size: Minimum length of a chunk (except the last one).
+
+        Raises:
+            NonexistentSchemaNode: If the value contains a member that
+                is not defined in the schema.
+        """
+        buf = []
+        size = 0
+        for part in self._json_parts():
+            buf.append(part)
+            size += len(part)
+            if size >= chunk_size:
+                yield "".join(buf)
+                buf = []
+                size = 0
+        if buf:
+            yield "".join(buf)
+
+    def write_json(self, stream: IO, chunk_size: int = 65536) -> None:
+        """Write JSON text of receiver's value to a stream.
+
+        Args:
+            stream: Text stream, or binary stream (UTF-8 is used).
+            chunk_size: Minimum length of a chunk written at once.
+
+        Raises:
+            NonexistentSchemaNode: If the value contains a member that
+                is not defined in the schema.
+        """
+        binary = isinstance(stream, (io.RawIOBase, io.BufferedIOBase))
+        for chunk in self.json_chunks(chunk_size):
+            stream.write(chunk.encode() if binary else chunk)
+
+    def _json_parts(self) -> Iterator[str]:
+        """Generate parts of JSON text of receiver's value."""
+        return self.schema_node._json_parts(self.value)
+
     def _member_names(self) -> List[InstanceName]:
         if isinstance(self.value, ObjectValue):
             return [m for m in self.value if not m.startswith("@")]
 
     def _member(self, name: InstanceName) -> "ObjectMember":
-        sibs = self.value.copy()
         try:
             return ObjectMember(
-                name, sibs, sibs.pop(name), self,
+                name, self.value, self.value[name], self,
                 self._member_schema_node(name), self.value.timestamp)
         except KeyError:
             raise NonexistentInstance(self.json_pointer(),
@@ -390,8 +625,8 @@ class InstanceNode:
         val = self.value
         try:
             i = len(val) + index if index < 0 else index
-            return ArrayEntry(i, LinkedList.from_list(val[:i], reverse=True),
-                              LinkedList.from_list(val[i + 1:]),
+            return ArrayEntry(i, ArraySlice(val, 0, i, True),
+                              ArraySlice(val, i + 1, len(val)),
                               val[index], self, self.schema_node,
                               val.timestamp)
         except (IndexError, TypeError):
@@ -449,6 +684,52 @@ class InstanceNode:
             res.extend(wd._member(mn)._node_set())
         return res
 
+    def _keyed_children(
+            self, qname: QualName, keys: List[QualName],
+            strings: Callable[[int], Optional[List[str]]]
+    ) -> Optional[Tuple[int, List["InstanceNode"]]]:
+        """XPath - return receiver's list entries selected by key values.
+
+        The entries are looked up in the key index of the list.
+
+        Args:
+            qname: Qualified name of the list.
+            keys: Qualified names of children compared with values.
+            strings: Function returning the string values of the
+                `i`-th child in `keys`, or ``None`` if they are unknown.
+
+        Returns:
+            The number of leading items of `keys` that are list keys and
+            the list of selected entries, or ``None`` if the key index
+            cannot be used.
+        """
+        sn = self.schema_node
+        if not isinstance(sn, InternalNode):
+            return None
+        cn = sn.get_data_child(*qname)
+        if not isinstance(cn, ListNode):
+            return None
+        n = len(cn.keys)
+        if not 0 < n <= len(keys):
+            return None
+        iname = cn.iname()
+        try:
+            val = self.value[iname]
+        except (KeyError, TypeError):
+            return None
+        if not isinstance(val, ArrayValue):
+            return None
+        if not val:
+            return (n, [])
+        strs = [strings(i) for i in range(n)]
+        if None in strs:
+            return None
+        pos = cn._entry_positions(val, keys[:n], strs)
+        if pos is None:
+            return None
+        mem = self._member(iname)
+        return (n, [mem._entry(i) for i in pos])
+
     def _descendants(self, qname: Union[QualName, bool] = None,
                      with_self: bool = False) -> List["InstanceNode"]:
         """XPath - return the list of receiver's descendants."""
@@ -484,7 +765,7 @@ class RootNode(InstanceNode):
     """This class represents the root of the instance tree."""
 
     def __init__(self, value: Value, schema_node: "DataNode",
-                 timestamp: datetime):
+                 timestamp: Timestamp):
         super().__init__("/", value, None, schema_node, timestamp)
 
     def up(self) -> None:
@@ -495,7 +776,35 @@ class RootNode(InstanceNode):
         """
         raise NonexistentInstance(self.json_pointer(), "up of top")
 
-    def _copy(self, newval: Value, newts: datetime = None) -> InstanceNode:
+    def edit_session(self) -> "EditSession":
+        """Return an edit session for the receiver's data tree."""
+        return EditSession(self)
+
+    def revalidate(self, previous: "RootNode",
+                   scope: ValidationScope = ValidationScope.all,
+                   ctype: ContentType = ContentType.config) -> None:
+        """Validate the receiver incrementally.
+
+        Only the subtrees that differ from `previous` (as determined by
+        identity of their values) are validated, together with
+        constraints elsewhere in the data tree that may depend on them.
+
+        Args:
+            previous: Root node of a previous version of the data tree
+                that is known to be valid.
+            scope: Scope of the validation (syntax, semantics or all).
+            ctype: Receiver's content type.
+
+        Raises:
+            SchemaError: If the value doesn't conform to the schema.
+            SemanticError: If the value violates a semantic constraint.
+            YangTypeError: If the value is a scalar of incorrect type.
+        """
+        with _validation_run():
+            self.schema_node._revalidate_tree(
+                self, previous.value, scope, ctype)
+
+    def _copy(self, newval: Value, newts: Timestamp = None) -> InstanceNode:
         return RootNode(
             newval, self.schema_node, newts if newts else newval.timestamp)
 
@@ -515,10 +824,24 @@ class ObjectMember(InstanceNode):
 
     def __init__(self, key: InstanceName, siblings: Dict[InstanceName, Value],
                  value: Value, parinst: Optional[InstanceNode],
-                 schema_node: "DataNode", timestamp: datetime):
+                 schema_node: "DataNode", timestamp: Timestamp):
+        """Initialize the class instance.
+
+        Args:
+            siblings: Object containing the sibling members. It may
+                be the whole parent object: an entry for the receiver's
+                own name is ignored.
+        """
         super().__init__(key, value, parinst, schema_node, timestamp)
-        self.siblings = siblings  # type: Dict[InstanceName, Value]
+        self._object = siblings  # type: Dict[InstanceName, Value]
+        """Object with sibling members, shared with the parent."""
+
+    @property
+    def siblings(self) -> Dict[InstanceName, Value]:
         """Sibling members within the parent object."""
+        res = self._object.copy()
+        res.pop(self.name, None)
+        return res
 
     @property
     def qual_name(self) -> QualName:
@@ -539,10 +862,13 @@ class ObjectMember(InstanceNode):
         """
         ssn = self.parinst._member_schema_node(name)
         try:
-            sibs = self.siblings.copy()
-            newval = sibs.pop(name)
-            sibs[self.name] = self.value
-            return ObjectMember(name, sibs, newval, self.parinst,
+            if name == self.name:
+                raise KeyError
+            obj = self._object
+            newval = obj[name]
+            if obj.get(self.name, _missing) is not self.value:
+                obj = self._zip()
+            return ObjectMember(name, obj, newval, self.parinst,
                                 ssn, self.timestamp)
         except KeyError:
             raise NonexistentInstance(self.json_pointer(),
@@ -558,38 +884,38 @@ class ObjectMember(InstanceNode):
             InstanceValueError: If the receiver's value is not a YANG list.
             NonexistentInstance: If no entry with matching keys exists.
         """
-        if not isinstance(self.schema_node, ListNode):
+        if not (isinstance(self.schema_node, ListNode) and
+                isinstance(self.value, ArrayValue)):
             raise InstanceValueError(self.json_pointer(), "lookup on non-list")
         try:
-            for i in range(len(self.value)):
-                en = self.value[i]
-                flag = True
-                for k in keys:
-                    if en[k] != keys[k]:
-                        flag = False
-                        break
-                if flag:
-                    return self._entry(i)
-            raise NonexistentInstance(self.json_pointer(), "entry lookup failed")
-        except KeyError:
-            raise NonexistentInstance(self.json_pointer(), "entry lookup failed") from None
+            i = self.schema_node._entry_position(self.value, keys)
         except TypeError:
             raise InstanceValueError(self.json_pointer(), "lookup on non-list") from None
+        if i is None:
+            raise NonexistentInstance(self.json_pointer(), "entry lookup failed")
+        return self._entry(i)
 
     def _zip(self) -> ObjectValue:
         """Zip the receiver into an object and return it."""
-        res = ObjectValue(self.siblings.copy(), self.timestamp)
+        obj = self._object
+        if (obj.get(self.name, _missing) is self.value and
+                isinstance(obj, ObjectValue) and
+                type(obj.timestamp) is type(self.timestamp) and
+                obj.timestamp >= self.timestamp):
+            return obj
+        res = (obj.__class__ if isinstance(obj, ObjectValue)
+               else ObjectValue)(obj, self.timestamp)
         res[self.name] = self.value
         return res
 
-    def _copy(self, newval: Value, newts: datetime = None) -> "ObjectMember":
+    def _copy(self, newval: Value, newts: Timestamp = None) -> "ObjectMember":
         if newts:
             ts = newts
         elif isinstance(newval, StructuredValue):
             ts = newval.timestamp
         else:
-            ts = datetime.now()
-        return ObjectMember(self.name, self.siblings, newval, self.parinst,
+            ts = next_timestamp(self.timestamp)
+        return ObjectMember(self.name, self._object, newval, self.parinst,
                             self.schema_node, ts)
 
     def _ancestors_or_self(
@@ -609,7 +935,7 @@ class ArrayEntry(InstanceNode):
 
     def __init__(self, key: int, before: LinkedList, after: LinkedList,
                  value: Value, parinst: Optional[InstanceNode],
-                 schema_node: "DataNode", timestamp: datetime = None):
+                 schema_node: "DataNode", timestamp: Timestamp = None):
         super().__init__(key, value, parinst, schema_node, timestamp)
         self.before = before  # type: LinkedList
         """Preceding entries of the parent array."""
@@ -637,7 +963,8 @@ class ArrayEntry(InstanceNode):
 
         This method overrides the superclass method.
         """
-        return super().update(self._cook_value(value, raw), False)
+        return super().update(
+            self._cook_value(value, raw, next_timestamp(self.timestamp)), False)
 
     def previous(self) -> "ArrayEntry":
         """Return an instance node corresponding to the previous entry.
@@ -679,9 +1006,10 @@ class ArrayEntry(InstanceNode):
         Returns:
             An instance node of the new inserted entry.
         """
+        ts = next_timestamp(self.timestamp)
         return ArrayEntry(self.index, self.before, self.after.cons(self.value),
-                          self._cook_value(value, raw), self.parinst,
-                          self.schema_node, datetime.now())
+                          self._cook_value(value, raw, ts), self.parinst,
+                          self.schema_node, ts)
 
     def insert_after(self, value: Union[RawValue, Value],
                      raw: bool = False) -> "ArrayEntry":
@@ -694,32 +1022,54 @@ class ArrayEntry(InstanceNode):
         Returns:
             An instance node of the newly inserted entry.
         """
+        ts = next_timestamp(self.timestamp)
         return ArrayEntry(self.index, self.before.cons(self.value), self.after,
-                          self._cook_value(value, raw), self.parinst,
-                          self.schema_node, datetime.now())
+                          self._cook_value(value, raw, ts), self.parinst,
+                          self.schema_node, ts)
 
-    def _cook_value(self, value: Union[RawValue, Value], raw: bool) -> Value:
+    def _cook_value(self, value: Union[RawValue, Value], raw: bool,
+                    ts: Timestamp) -> Value:
         return super(SequenceNode, self.schema_node).from_raw(
-            value, self.json_pointer()) if raw else value
+            value, self.json_pointer(), ts) if raw else value
 
     def _zip(self) -> ArrayValue:
         """Zip the receiver into an array and return it."""
-        res = list(self.before)
+        bef = self.before
+        aft = self.after
+        if (isinstance(bef, ArraySlice) and isinstance(aft, ArraySlice) and
+                bef.array is aft.array and bef.start == 0 and
+                aft.stop == len(aft.array) and bef.stop <= aft.start):
+            arr = bef.array
+            pos = bef.stop
+            if (aft.start == pos + 1 and arr[pos] is self.value and
+                    type(arr.timestamp) is type(self.timestamp) and
+                    arr.timestamp >= self.timestamp):
+                return arr
+            res = ArrayValue(arr, self.timestamp)
+            list.__setitem__(res, slice(pos, aft.start), (self.value,))
+            if aft.start <= pos + 1:
+                res._adopt_key_index(arr, pos, aft.start == pos)
+            return res
+        res = list(bef)
         res.reverse()
         res.append(self.value)
-        res.extend(list(self.after))
+        res.extend(list(aft))
         return ArrayValue(res, self.timestamp)
 
-    def _copy(self, newval: Value, newts: datetime = None) -> "ArrayEntry":
+    def _copy(self, newval: Value, newts: Timestamp = None) -> "ArrayEntry":
         if newts:
             ts = newts
         elif isinstance(newval, StructuredValue):
             ts = newval.timestamp
         else:
-            ts = datetime.now()
+            ts = next_timestamp(self.timestamp)
         return ArrayEntry(self.index, self.before, self.after, newval,
                           self.parinst, self.schema_node, ts)
 
+    def _json_parts(self) -> Iterator[str]:
+        """Override the superclass method."""
+        return self.schema_node._entry_json_parts(self.value)
+
     def _ancestors_or_self(
             self, qname: Union[QualName, bool] = None) -> List[InstanceNode]:
         """XPath - return the list of receiver's ancestors including itself."""
@@ -760,6 +1110,220 @@ class ArrayEntry(InstanceNode):
         return [self.up().up()]
 
 
+class EditSession:
+    """Batch of edits applied to a data tree.
+
+    Edits are addressed by instance routes from the root. Structured
+    values on the route of an edit are copied when they are first
+    modified in the session, and subsequent edits with a common prefix
+    modify these copies in place. No zipper nodes are created, and the
+    new data tree is made available as a whole by :meth:`commit`.
+
+    Every edit sees the results of the previous edits in the same
+    session.
+    """
+
+    def __init__(self, root: RootNode):
+        """Initialize the class instance.
+
+        Args:
+            root: Root node of the data tree to be edited.
+        """
+        self.root = root  # type: RootNode
+        """Root node of the last committed data tree."""
+        self._value = root.value  # type: Value
+        self._fresh = {}  # type: Dict[int, StructuredValue]
+        self._released = []  # type: List[StructuredValue]
+
+    def peek(self, iroute: "InstanceRoute") -> Optional[Value]:
+        """Return a value in the edited data tree, or ``None``.
+
+        Args:
+            iroute: Instance route from the root.
+        """
+        val = self._value
+        sn = self.root.schema_node
+        for sel in iroute:
+            val, sn = sel.peek_step(val, sn)
+            if val is None:
+                return None
+        return val
+
+    def put(self, iroute: "InstanceRoute", value: Union[RawValue, Value],
+            raw: bool = False) -> None:
+        """Set the value of an instance, creating it if it's a member.
+
+        Args:
+            iroute: Instance route of the target instance.
+            value: New value of the instance.
+            raw: Flag to be set if `value` is raw.
+
+        Raises:
+            NonexistentInstance: If the target instance is an entry that
+                doesn't exist, or an ancestor instance doesn't exist.
+            NonexistentSchemaNode: If a member on `iroute` is not
+                permitted by the schema.
+            InstanceValueError: If `iroute` is incompatible with the data.
+        """
+        ts = next_timestamp(self.root.timestamp)
+        if not raw:
+            self._release(value)
+        if not iroute:
+            self._value = (self.root.schema_node.from_raw(value, "/", ts)
+                           if raw else value)
+            return
+        val, key, sn, path = self._target(iroute)
+        if isinstance(val, ArrayValue):
+            if key is None:
+                raise NonexistentInstance(self._jptr(path),
+                                          f"entry {iroute[-1]!s}")
+            if raw:
+                value = sn.entry_from_raw(value, self._jptr(path + [key]), ts)
+        elif raw:
+            value = sn.from_raw(value, self._jptr(path + [key]), ts)
+        val[key] = value
+
+    def insert(self, iroute: "InstanceRoute", value: Union[RawValue, Value],
+               index: int = None, raw: bool = False) -> None:
+        """Insert a new entry into a list or leaf-list.
+
+        Args:
+            iroute: Instance route of the list or leaf-list (which is
+                created if it doesn't exist).
+            value: Value of the new entry.
+            index: Position of the new entry (default: the end).
+            raw: Flag to be set if `value` is raw.
+
+        Raises:
+            InstanceValueError: If the target is not a list or leaf-list.
+            The same exceptions as :meth:`put`.
+        """
+        if not raw:
+            self._release(value)
+        val, key, sn, path = self._target(iroute)
+        if not isinstance(sn, SequenceNode) or isinstance(val, ArrayValue):
+            raise InstanceValueError(self._jptr(path + [key]),
+                                     "insert into non-sequence")
+        ary = val.get(key)
+        ts = next_timestamp(self.root.timestamp)
+        if ary is None:
+            ary = val[key] = self._own(ArrayValue(ts=ts))
+        elif not self._is_fresh(ary):
+            ary = val[key] = self._own(ary)
+        pos = len(ary) if index is None else index
+        if raw:
+            value = sn.entry_from_raw(value, self._jptr(path + [key, pos]),
+                                      ts)
+        ary.insert(pos, value)
+
+    def delete(self, iroute: "InstanceRoute") -> None:
+        """Delete an instance (object member or array entry).
+
+        Args:
+            iroute: Instance route of the instance to delete.
+
+        Raises:
+            NonexistentInstance: If the instance doesn't exist.
+            The same exceptions as :meth:`put`.
+        """
+        if not iroute:
+            raise InstanceValueError("/", "deleting root")
+        val, key, sn, path = self._target(iroute)
+        try:
+            del val[key]
+        except (KeyError, IndexError, TypeError):
+            raise NonexistentInstance(self._jptr(path),
+                                      f"item {iroute[-1]!s}") from None
+
+    def commit(self) -> RootNode:
+        """Return the root node of the edited data tree.
+
+        All structured values changed in the session receive the same
+        timestamp. The session may then continue with further edits.
+        """
+        if self._value is self.root.value:
+            return self.root
+        ts = next_timestamp(self.root.timestamp)
+        for val in list(self._fresh.values()) + self._released:
+            val.timestamp = ts
+        self._fresh = {}
+        self._released = []
+        self.root = RootNode(self._value, self.root.schema_node, ts)
+        return self.root
+
+    def _is_fresh(self, val: Value) -> bool:
+        """Return ``True`` if `val` is a session-private copy."""
+        return self._fresh.get(id(val)) is val
+
+    def _release(self, val: Value) -> None:
+        """Stop modifying session-private copies within `val` in place.
+
+        This is needed when `val` is added to the data tree, because it
+        may be a value obtained from :meth:`peek` that is then shared by
+        two instances.
+        """
+        if self._is_fresh(val):
+            del self._fresh[id(val)]
+            self._released.append(val)
+            for v in (val.values() if isinstance(val, ObjectValue) else val):
+                self._release(v)
+
+    def _own(self, val: StructuredValue) -> StructuredValue:
+        """Return a session-private copy of `val`."""
+        res = val.copy()
+        self._fresh[id(res)] = res
+        return res
+
+    @staticmethod
+    def _jptr(path: List[InstanceKey]) -> JSONPointer:
+        """Return JSON pointer corresponding to a list of instance keys."""
+        return "/" + "/".join([str(k) for k in path])
+
+    def _target(self, iroute: "InstanceRoute") -> Tuple[
+            StructuredValue, Optional[InstanceKey], "DataNode",
+            List[InstanceKey]]:
+        """Prepare the parent of an instance for modification.
+
+        Returns:
+            A tuple consisting of
+                - parent value (a session-private copy),
+                - key of the instance in the parent (``None`` for a
+                  non-existent entry),
+                - schema node of the instance, and
+                - list of instance keys leading to the parent.
+        """
+        if not self._is_fresh(self._value):
+            self._value = self._own(self._value)
+        val = self._value
+        ary = None
+        sn = self.root.schema_node
+        path = []
+        last = len(iroute) - 1
+        for i, sel in enumerate(iroute):
+            if isinstance(sel, MemberName) != isinstance(val, ObjectValue):
+                raise InstanceValueError(
+                    self._jptr(path), ("member of non-object" if
+                           isinstance(sel, MemberName) else "non-array entry"))
+            psn = sn
+            key, sn = sel._key_step(val, sn)
+            if i == last:
+                if ary is not None and key in psn._key_members:
+                    ary._key_index = None
+                return (val, key, sn, path)
+            try:
+                child = val[key]
+            except (KeyError, IndexError, TypeError):
+                raise NonexistentInstance(
+                    self._jptr(path), f"item {sel!s}") from None
+            path.append(key)
+            if not isinstance(child, StructuredValue):
+                raise InstanceValueError(self._jptr(path), "scalar value")
+            if not self._is_fresh(child):
+                child = val[key] = self._own(child)
+            ary = val if isinstance(val, ArrayValue) else None
+            val = child
+
+
 class InstanceRoute(list):
     """This class represents a route into an instance value."""
 
@@ -818,6 +1382,15 @@ class MemberName:
         """
         return inst[self.iname()]
 
+    def _key_step(self, val: ObjectValue,
+                  sn: "DataNode") -> Tuple[InstanceName, "DataNode"]:
+        """Return member name addressed by the receiver + its schema node."""
+        cn = sn.get_data_child(self.name, self.namespace)
+        if cn is None:
+            raise NonexistentSchemaNode(sn.qual_name, self.name,
+                                        self.namespace)
+        return (cn.iname(), cn)
+
 
 class ActionName(MemberName):
     """Name of an action (can appear in RESTCONF resource IDs)."""
@@ -832,6 +1405,10 @@ class ActionName(MemberName):
         """Raise an exception because there is no action instance."""
         raise NonDataNode(inst.json_pointer(), "action " + self.iname())
 
+    def _key_step(self, val: ObjectValue, sn: "DataNode") -> None:
+        """Raise an exception because there is no action instance."""
+        raise NonDataNode(sn.data_path(), "action " + self.iname())
+
 
 class EntryIndex:
     """Numeric selectors for a list or leaf-list entry."""
@@ -872,6 +1449,11 @@ class EntryIndex:
         """
         return inst[self.index]
 
+    def _key_step(self, val: ArrayValue,
+                  sn: "DataNode") -> Tuple[Optional[int], "DataNode"]:
+        """Return index of the entry addressed by the receiver + schema node."""
+        return (self.index if 0 <= self.index < len(val) else None, sn)
+
 
 class EntryValue:
     """Value-based selectors of an array entry."""
@@ -924,6 +1506,14 @@ class EntryValue:
             raise NonexistentInstance(inst.json_pointer(),
                                       f"entry '{self.value!s}'") from None
 
+    def _key_step(self, val: ArrayValue,
+                  sn: "DataNode") -> Tuple[Optional[int], "DataNode"]:
+        """Return index of the entry addressed by the receiver + schema node."""
+        try:
+            return (val.index(self.parse_value(sn)), sn)
+        except ValueError:
+            return (None, sn)
+
 
 class EntryKeys:
     """Key-based selectors for a list entry."""
@@ -974,18 +1564,11 @@ class EntryKeys:
             sn:  Current schema node.
         """
         keys = self.parse_keys(sn)
-        for en in val:
-            flag = True
-            try:
-                for k in keys:
-                    if en[k] != keys[k]:
-                        flag = False
-                        break
-            except KeyError:
-                continue
-            if flag:
-                return (en, sn)
-        return (None, sn)
+        try:
+            i = sn._entry_position(val, keys)
+        except (AttributeError, TypeError):
+            return (None, sn)
+        return (None if i is None else val[i], sn)
 
     def goto_step(self, inst: InstanceNode) -> InstanceNode:
         """Return member instance of `inst` addressed by the receiver.
@@ -995,6 +1578,11 @@ class EntryKeys:
         """
         return inst.look_up(**self.parse_keys(inst.schema_node))
 
+    def _key_step(self, val: ArrayValue,
+                  sn: "DataNode") -> Tuple[Optional[int], "DataNode"]:
+        """Return index of the entry addressed by the receiver + schema node."""
+        return (sn._entry_position(val, self.parse_keys(sn)), sn)
+
 
 class ResourceIdParser(Parser):
     """Parser for RESTCONF resource identifiers."""
@@ -22,10 +22,19 @@ This module implements the following classes:
 * StructuredValue: Abstract class for structured values of instance nodes.
 * ArrayValue: Cooked array value of an instance node.
 * ObjectValue: Cooked object value of an instance node.
+* LazyObjectValue: Object value whose members are cooked on first access.
+* LazyValue: Member value that is cooked on first access.
+* KeyIndex: Index of list entries keyed by values of list keys.
+
+This module also implements the following functions:
+
+* next_timestamp: Return timestamp of a subsequent modification.
+* later_timestamp: Return the later of two timestamps.
 """
 
 from datetime import datetime
-from typing import Dict, List, Union
+from itertools import count
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from .typealiases import InstanceName, PrefName, ScalarValue
 
 # Type aliases
@@ -41,11 +50,44 @@ InstanceKey = Union[InstanceName, int]
 MetadataObject = Dict[PrefName, ScalarValue]
 """Metadata object [RFC 7952]_."""
 
+EntryKey = Tuple[ScalarValue, ...]
+"""Tuple of key values of a list entry."""
+
+Timestamp = Union[datetime, int]
+"""Time of a modification: date and time, or logical revision number."""
+
+_revisions = count(1)
+"""Process-wide source of revision numbers."""
+
+
+def next_timestamp(ts: Optional[Timestamp] = None) -> Timestamp:
+    """Return timestamp of a modification that follows another one.
+
+    Args:
+        ts: Timestamp of the previous modification. If it is a revision
+            number, the result is the next revision number (obtained from
+            a process-wide counter), otherwise it is the current date and
+            time.
+    """
+    return next(_revisions) if isinstance(ts, int) else datetime.now()
+
+
+def later_timestamp(ts1: Timestamp, ts2: Timestamp) -> Timestamp:
+    """Return the later of two timestamps.
+
+    If one of the timestamps is a revision number and the other is
+    date and time, they cannot be compared, and a timestamp following
+    `ts2` is returned.
+    """
+    if type(ts1) is not type(ts2):
+        return next_timestamp(ts2)
+    return ts1 if ts1 > ts2 else ts2
+
 
 class StructuredValue:
     """Abstract class for array and object values."""
 
-    def __init__(self, ts: datetime):
+    def __init__(self, ts: Timestamp):
         """Initialize class instance.
 
         Args:
@@ -55,11 +97,11 @@ class StructuredValue:
 
     def copy(self) -> "StructuredValue":
         """Return a shallow copy of the receiver."""
-        return self.__class__(super().copy(), datetime.now())
+        return self.__class__(super().copy(), next_timestamp(self.timestamp))
 
     def __setitem__(self, key: InstanceKey, value: Value) -> None:
         super().__setitem__(key, value)
-        self.timestamp = datetime.now()
+        self.timestamp = next_timestamp(self.timestamp)
 
     def __eq__(self, val: "StructuredValue") -> bool:
         """Return ``True`` if the receiver equal to `val`.
@@ -77,24 +119,301 @@ class StructuredValue:
 class ArrayValue(StructuredValue, list):
     """This class represents cooked array values."""
 
-    def __init__(self, val: List[EntryValue] = [], ts: datetime = None):
+    def __init__(self, val: List[EntryValue] = [], ts: Timestamp = None):
         StructuredValue.__init__(self, ts)
         list.__init__(self, val)
+        self._key_index = None  # type: Optional[KeyIndex]
+        self._own_index = False
+
+    def __reduce__(self) -> Tuple:
+        """Support pickling; the key index is not preserved."""
+        return (self.__class__, (list(self), self.timestamp))
+
+    def copy(self) -> "ArrayValue":
+        """Return a shallow copy of the receiver.
+
+        The key index, if present, is shared with the copy.
+        """
+        res = super().copy()
+        res._share_index(self._key_index)
+        self._own_index = False
+        return res
+
+    def key_index(self, key_members: Tuple[InstanceName, ...]) -> "KeyIndex":
+        """Return the index of receiver's entries.
+
+        The index is built when it is first needed and then kept with
+        the receiver.
+
+        Args:
+            key_members: Instance names of the list keys.
+        """
+        key_members = tuple(key_members)
+        ki = self._key_index
+        if ki is None or ki.key_members != key_members:
+            ki = self._key_index = KeyIndex(key_members, self)
+            self._own_index = True
+        return ki
+
+    def __setitem__(self, key: int, value: EntryValue) -> None:
+        if self._key_index is not None:
+            if isinstance(key, int):
+                pos = key if key >= 0 else len(self) + key
+                self._writable_index().replace(pos, self[key], value)
+            else:
+                self._key_index = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: int) -> None:
+        ki = self._key_index
+        if ki is not None:
+            self._key_index = (ki.shifted(key if key >= 0 else len(self) + key,
+                                          -1) if isinstance(key, int) else None)
+            self._own_index = True
+        super().__delitem__(key)
+
+    def append(self, value: EntryValue) -> None:
+        if self._key_index is not None:
+            self._writable_index().add(len(self), value)
+        super().append(value)
+
+    def insert(self, index: int, value: EntryValue) -> None:
+        ki = self._key_index
+        if ki is not None:
+            pos = min(max(index if index >= 0 else len(self) + index, 0),
+                      len(self))
+            self._key_index = ki.shifted(pos, 1)
+            self._key_index.add(pos, value)
+            self._own_index = True
+        super().insert(index, value)
+
+    def extend(self, values: List[EntryValue]) -> None:
+        self._key_index = None
+        super().extend(values)
+
+    def pop(self, index: int = -1) -> EntryValue:
+        self._key_index = None
+        return super().pop(index)
+
+    def remove(self, value: EntryValue) -> None:
+        self._key_index = None
+        super().remove(value)
+
+    def reverse(self) -> None:
+        self._key_index = None
+        super().reverse()
+
+    def sort(self, *args, **kwargs) -> None:
+        self._key_index = None
+        super().sort(*args, **kwargs)
 
     def __hash__(self) -> int:
         """Return hash value for the receiver."""
         return tuple([x.__hash__() for x in self]).__hash__()
 
+    def _share_index(self, ki: Optional["KeyIndex"]) -> None:
+        """Use key index `ki` that is also used by another array."""
+        self._key_index = ki
+        self._own_index = False
+
+    def _writable_index(self) -> "KeyIndex":
+        """Return receiver's key index that can be modified in place."""
+        if not self._own_index:
+            self._key_index = self._key_index.copy()
+            self._own_index = True
+        return self._key_index
+
+    def _adopt_key_index(self, orig: "ArrayValue", pos: int,
+                         inserted: bool) -> None:
+        """Derive receiver's key index from that of another array.
+
+        The receiver is supposed to differ from `orig` only in one entry
+        at position `pos`, which is either replaced or newly inserted.
+
+        Args:
+            orig: Original array.
+            pos: Position of the changed entry.
+            inserted: Flag indicating that the entry was inserted.
+        """
+        ki = orig._key_index
+        if ki is None:
+            return
+        if inserted:
+            self._key_index = ki.shifted(pos, 1)
+            self._key_index.add(pos, self[pos])
+            self._own_index = True
+        elif ki.entry_key(self[pos]) == ki.entry_key(orig[pos]):
+            self._share_index(ki)
+            orig._own_index = False
+        else:
+            self._key_index = ki.copy()
+            self._own_index = True
+            self._key_index.replace(pos, orig[pos], self[pos])
+
 
 class ObjectValue(StructuredValue, dict):
     """This class represents cooked object values."""
 
     def __init__(self, val: Dict[InstanceName, Value] = {},
-                 ts: datetime = None):
+                 ts: Timestamp = None):
         StructuredValue.__init__(self, ts)
         dict.__init__(self, val)
 
+    def __reduce__(self) -> Tuple:
+        """Support pickling; lazy members are cooked first."""
+        return (ObjectValue, (dict(self.items()), self.timestamp))
+
     def __hash__(self) -> int:
         """Return hash value for the receiver."""
         sks = sorted(self.keys())
         return tuple([(k, self[k].__hash__()) for k in sks]).__hash__()
+
+
+class LazyObjectValue(ObjectValue):
+    """Object value whose members may be cooked on first access.
+
+    Members that haven't been accessed yet are stored as instances of
+    :class:`LazyValue`. Accessing such a member cooks its value, and the
+    result replaces the placeholder.
+    """
+
+    def __eq__(self, val: StructuredValue) -> bool:
+        """Return ``True`` if the receiver is equal to `val`.
+
+        Lazy and fully cooked object values are considered equal if their
+        contents are equal.
+        """
+        return isinstance(val, ObjectValue) and hash(self) == hash(val)
+
+    __hash__ = ObjectValue.__hash__
+
+    def __getitem__(self, key: InstanceName) -> Value:
+        val = super().__getitem__(key)
+        if isinstance(val, LazyValue):
+            val = val.force()
+            dict.__setitem__(self, key, val)
+        return val
+
+    def get(self, key: InstanceName, default: Value = None) -> Value:
+        return self[key] if key in self else default
+
+    def pop(self, key: InstanceName, *args: Value) -> Value:
+        if key in self:
+            val = self[key]
+            del self[key]
+            return val
+        return super().pop(key, *args)
+
+    def popitem(self) -> Tuple[InstanceName, Value]:
+        key, val = super().popitem()
+        return (key, val.force() if isinstance(val, LazyValue) else val)
+
+    def setdefault(self, key: InstanceName, default: Value = None) -> Value:
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def values(self) -> List[Value]:
+        return [self[k] for k in self]
+
+    def items(self) -> List[Tuple[InstanceName, Value]]:
+        return [(k, self[k]) for k in self]
+
+
+class LazyValue:
+    """Placeholder for a value that is cooked on first access.
+
+    The cooked value is cached, so it is shared by all copies of the
+    object value containing the placeholder.
+    """
+
+    def __init__(self, cook: Callable[[], Value]):
+        """Initialize the class instance.
+
+        Args:
+            cook: Function without arguments returning the cooked value.
+        """
+        self._cook = cook
+        self._value = None
+
+    def force(self) -> Value:
+        """Return the cooked value."""
+        if self._cook is not None:
+            self._value = self._cook()
+            self._cook = None
+        return self._value
+
+
+class KeyIndex(dict):
+    """Index of list entries keyed by tuples of their key values.
+
+    The index maps entry keys to positions of the entries in the array.
+    If keys aren't unique, the first entry with a given key is indexed.
+    """
+
+    def __init__(self, key_members: Tuple[InstanceName, ...],
+                 entries: List[EntryValue] = []):
+        """Initialize the class instance.
+
+        Args:
+            key_members: Instance names of the list keys.
+            entries: Entries to be indexed.
+        """
+        super().__init__()
+        self.key_members = tuple(key_members)
+        for i in range(len(entries) - 1, -1, -1):
+            k = self.entry_key(entries[i])
+            if k is not None:
+                self[k] = i
+
+    def copy(self) -> "KeyIndex":
+        """Return a shallow copy of the receiver."""
+        res = self.__class__(self.key_members)
+        res.update(self)
+        return res
+
+    def entry_key(self, entry: EntryValue) -> Optional[EntryKey]:
+        """Return the tuple of key values of a list entry.
+
+        ``None`` is returned if some of the keys are missing in `entry`.
+
+        Args:
+            entry: List entry.
+        """
+        try:
+            return tuple([entry[k] for k in self.key_members])
+        except (KeyError, TypeError):
+            return None
+
+    def add(self, pos: int, entry: EntryValue) -> None:
+        """Add entry at position `pos` to the receiver in place."""
+        k = self.entry_key(entry)
+        if k is not None and self.get(k, pos) >= pos:
+            self[k] = pos
+
+    def replace(self, pos: int, old: EntryValue, new: EntryValue) -> None:
+        """Replace entry at position `pos` in the receiver in place."""
+        ok = self.entry_key(old)
+        nk = self.entry_key(new)
+        if ok == nk:
+            return
+        if ok is not None and self.get(ok) == pos:
+            del self[ok]
+        self.add(pos, new)
+
+    def shifted(self, pos: int, delta: int) -> "KeyIndex":
+        """Return a copy of the receiver with positions shifted.
+
+        Args:
+            pos: Position of an inserted (`delta` = 1) or removed
+                (`delta` = -1) entry.
+            delta: Shift of positions following `pos`.
+        """
+        res = self.__class__(self.key_members)
+        for k, p in self.items():
+            if p < pos:
+                res[k] = p
+            elif p > pos or delta > 0:
+                res[k] = p + delta
+        return res
@@ -0,0 +1,265 @@
+# Copyright © 2016-2019 CZ.NIC, z. s. p. o.
+#
+# This file is part of Yangson.
+#
+# Yangson is free software: you can redistribute it and/or modify it under the
+# terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# Yangson is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with Yangson.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Incremental processing of JSON text.
+
+This module implements the following class:
+
+* JSONStreamReader: Event-based reader of JSON text.
+"""
+
+import codecs
+import json
+import re
+from typing import IO, Iterator, Optional, Tuple
+from .exceptions import EndOfInput, UnexpectedInput
+from .typealiases import RawScalar, RawValue
+
+# Type aliases
+JSONEvent = Tuple[str, Optional[RawScalar]]
+"""Parsing event: its kind and scalar value or object member name."""
+
+
+class JSONStreamReader:
+    """Event-based reader of JSON text.
+
+    The input stream is read in chunks, and the reader generates events
+    of the following kinds: ``start_map``, ``end_map``, ``start_array``,
+    ``end_array``, ``key`` (object member name) and ``value`` (scalar
+    value). The JSON text must contain exactly one value.
+    """
+
+    token_re = re.compile(
+        r'[ \t\n\r]*(?:([{}\[\]:,"])|'
+        r'(-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?)|'
+        r'(true|false|null))')
+    """Regular expression for a JSON token with leading whitespace."""
+
+    ws_re = re.compile(r"[ \t\n\r]*")
+    """Regular expression for whitespace."""
+
+    num_tail_re = re.compile(r"[0-9.eE+-]*")
+    """Regular expression for a possibly incomplete end of a number."""
+
+    literals = {"true": True, "false": False, "null": None}
+    """Values of JSON literals."""
+
+    def __init__(self, stream: IO, chunk_size: int = 65536):
+        """Initialize the class instance.
+
+        Args:
+            stream: Text or binary (UTF-8) input stream.
+            chunk_size: Number of characters or bytes to read at once.
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.input = ""
+        """Currently buffered part of the input text."""
+        self.offset = 0
+        """Current position in the buffered input text."""
+        self._decoder = None
+        self._eof = False
+        self._line = 0
+        self._column = 0
+        self._start = 0
+        self._events = self._generate()
+
+    def __str__(self) -> str:
+        """Return string representation of the receiver's state."""
+        (line, col) = self.line_column()
+        return f"line {line}, column {col}"
+
+    def __iter__(self) -> Iterator[JSONEvent]:
+        return self
+
+    def __next__(self) -> JSONEvent:
+        return next(self._events)
+
+    def line_column(self) -> Tuple[int, int]:
+        """Return line and column coordinates of the current position."""
+        ln = self.input.count("\n", 0, self.offset)
+        if ln == 0:
+            return (self._line + 1, self._column + self.offset)
+        return (self._line + ln + 1,
+                self.offset - self.input.rfind("\n", 0, self.offset) - 1)
+
+    def read_value(self, event: JSONEvent) -> RawValue:
+        """Read a complete raw value.
+
+        Args:
+            event: First event of the value (that has already been read).
+        """
+        kind, val = event
+        if kind == "start_map":
+            res = {}
+            for ev in self:
+                if ev[0] == "end_map":
+                    return res
+                res[ev[1]] = self.read_value(next(self))
+        if kind == "start_array":
+            res = []
+            for ev in self:
+                if ev[0] == "end_array":
+                    return res
+                res.append(self.read_value(ev))
+        return val
+
+    def end(self) -> None:
+        """Check that the input contains nothing after the JSON value.
+
+        Raises:
+            UnexpectedInput: If there are extra data.
+        """
+        next(self._events, None)
+
+    def _fill(self) -> bool:
+        """Read the next chunk of input, return ``False`` at end of input."""
+        if self._eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        while isinstance(chunk, bytes):
+            if self._decoder is None:
+                self._decoder = codecs.getincrementaldecoder("utf-8")()
+            text = self._decoder.decode(chunk, not chunk)
+            chunk = (text if text or not chunk
+                     else self.stream.read(self.chunk_size))
+        if not chunk:
+            self._eof = True
+            return False
+        done = self.input[:self.offset]
+        ln = done.count("\n")
+        if ln:
+            self._line += ln
+            self._column = len(done) - done.rfind("\n") - 1
+        else:
+            self._column += len(done)
+        self.input = self.input[self.offset:] + chunk
+        self.offset = 0
+        return True
+
+    def _token(self) -> Tuple[str, Optional[RawScalar]]:
+        """Return the next token (kind and value).
+
+        The kind is either a structural character, ``s`` (string),
+        ``v`` (other scalar), or empty string (end of input).
+        """
+        while True:
+            mo = self.token_re.match(self.input, self.offset)
+            if mo:
+                if mo.group(1) or not (
+                        mo.end() == len(self.input) or mo.group(2) and
+                        self.num_tail_re.fullmatch(self.input, mo.end())):
+                    break
+                if not self._fill():
+                    break
+            else:
+                ws = self.ws_re.match(self.input, self.offset).end()
+                if ws < len(self.input) and len(self.input) - ws >= 5:
+                    self.offset = ws
+                    raise UnexpectedInput(self, "JSON value")
+                if not self._fill():
+                    self.offset = ws
+                    if ws < len(self.input):
+                        raise UnexpectedInput(self, "JSON value")
+                    return ("", None)
+        self._start = self.offset = (mo.start(1) if mo.group(1) else
+                                     mo.start(2) if mo.group(2) else
+                                     mo.start(5))
+        if not mo.group(1):
+            self.offset = mo.end()
+        char = mo.group(1)
+        if char == '"':
+            return ("s", self._string())
+        if char:
+            self.offset += 1
+            return (char, None)
+        if mo.group(2):
+            num = mo.group(2)
+            return ("v", float(num) if mo.group(3) or mo.group(4)
+                    else int(num))
+        return ("v", self.literals[mo.group(5)])
+
+    def _string(self) -> str:
+        """Parse a string starting at the current position."""
+        while True:
+            try:
+                val, end = json.decoder.scanstring(self.input,
+                                                   self.offset + 1)
+                self.offset = end
+                return val
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise UnexpectedInput(self, "valid string") from None
+
+    def _unexpected(self, expected: str) -> UnexpectedInput:
+        """Return exception for an unexpected token that was just read."""
+        self.offset = self._start
+        return UnexpectedInput(self, expected)
+
+    def _key(self, tok: Tuple[str, Optional[RawScalar]]) -> JSONEvent:
+        """Return the event for an object member name."""
+        if tok[0] != "s":
+            raise self._unexpected("member name")
+        if self._token()[0] != ":":
+            raise self._unexpected("':'")
+        return ("key", tok[1])
+
+    def _generate(self) -> Iterator[JSONEvent]:
+        """Generate parsing events."""
+        stack = []
+        tok = self._token()
+        while True:
+            kind = tok[0]
+            if kind == "{":
+                yield ("start_map", None)
+                tok = self._token()
+                if tok[0] != "}":
+                    stack.append("}")
+                    yield self._key(tok)
+                    tok = self._token()
+                    continue
+                yield ("end_map", None)
+            elif kind == "[":
+                yield ("start_array", None)
+                tok = self._token()
+                if tok[0] != "]":
+                    stack.append("]")
+                    continue
+                yield ("end_array", None)
+            elif kind in ("s", "v"):
+                yield ("value", tok[1])
+            elif kind == "":
+                raise EndOfInput(self)
+            else:
+                raise self._unexpected("JSON value")
+            while stack:
+                tok = self._token()
+                if tok[0] == stack[-1]:
+                    stack.pop()
+                    yield ("end_map" if tok[0] == "}" else "end_array", None)
+                    continue
+                if tok[0] != ",":
+                    raise self._unexpected(f"',' or '{stack[-1]}'")
+                tok = self._token()
+                if stack[-1] == "}":
+                    yield self._key(tok)
+                    tok = self._token()
+                break
+            else:
+                if self._token()[0]:
+                    raise self._unexpected("end of input")
+                return
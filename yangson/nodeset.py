@@ -17,9 +17,10 @@
 
 """XPath node-set"""
 
-from typing import Callable, Union
+from typing import Callable, Dict, Iterable, List, Optional, Union
 from numbers import Number
-from .instance import InstanceNode
+from .instance import InstanceNode, _validation_context
+from .instvalue import StructuredValue
 
 # Type aliases
 
@@ -27,29 +28,80 @@ NodeExpr = Callable[[InstanceNode], "NodeSet"]
 XPathValue = Union["NodeSet", str, float, bool]
 
 
-def comparison(meth):
-    def wrap(self, arg):
-        if isinstance(arg, NodeSet):
-            for n in arg:
-                if n.is_internal():
-                    continue
-                if meth(self, str(n)):
-                    return True
-            return False
-        return meth(self, arg)
-    return wrap
+def _canonical_string(node: InstanceNode,
+                      cache: Optional[Dict[tuple, str]]) -> str:
+    """Return the string value of `node`, using `cache` for scalars."""
+    val = node.value
+    if cache is None or isinstance(val, StructuredValue):
+        return str(node)
+    key = (node.schema_node.type, val.__class__, val)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    except TypeError:           # unhashable value
+        return str(node)
+    res = cache[key] = str(node)
+    return res
+
+
+def _numbers(vals: Iterable) -> List[float]:
+    """Return the values from `vals` that can be converted to numbers.
+
+    NaN values are left out because no comparison with them is true.
+    """
+    res = []
+    for v in vals:
+        try:
+            num = float(v)
+        except (ValueError, TypeError):
+            continue
+        if num == num:
+            res.append(num)
+    return res
 
 
 class NodeSet(list):
 
-    def union(self, ns: "NodeSet") -> "NodeSet":
-        paths = set([n.path for n in self])
-        return self.__class__(self + [n for n in ns if n.path not in paths])
+    @classmethod
+    def merge(cls, parts: Iterable[List[InstanceNode]]) -> "NodeSet":
+        """Return a node-set containing the nodes of all `parts`.
+
+        Nodes are identified by their paths, and each of them is
+        included only once, in the order of its first occurrence.
+        Membership of a node is tested in constant time, so the
+        node-set is built in linear time.
+
+        Args:
+            parts: Lists of instance nodes.
+        """
+        res = cls()
+        seen = set()
+        for part in parts:
+            for n in part:
+                path = n.path
+                if path not in seen:
+                    seen.add(path)
+                    res.append(n)
+        return res
 
-    def bind(self, trans: NodeExpr) -> "NodeSet":
-        res = self.__class__([])
+    def union(self, ns: "NodeSet") -> "NodeSet":
+        return self.merge((self, ns))
+
+    def bind(self, trans: NodeExpr, distinct: bool = False) -> "NodeSet":
+        """Return the union of `trans` results for all receiver's nodes.
+
+        Args:
+            trans: Function returning a list of nodes for a node.
+            distinct: Flag indicating that `trans` never returns the same
+                node for different nodes, so that no duplicates have to
+                be removed.
+        """
+        if not distinct and len(self) > 1:
+            return self.merge([trans(n) for n in self])
+        res = self.__class__()
         for n in self:
-            res = res.union(trans(n))
+            res.extend(trans(n))
         return res
 
     def __float__(self) -> float:
@@ -58,88 +110,79 @@ class NodeSet(list):
     def __str__(self) -> str:
         return str(self[0]) if self else ""
 
-    @comparison
+    def _strings(self) -> List[str]:
+        """Return string values of the receiver's terminal nodes.
+
+        During validation, canonical strings of scalar values are cached
+        for the whole validation run.
+        """
+        ctx = _validation_context.get()
+        cache = None if ctx is None else ctx.canonical_strings
+        return [_canonical_string(n, cache) for n in self
+                if not n.is_internal()]
+
     def __eq__(self, val: XPathValue) -> bool:
+        if isinstance(val, NodeSet):
+            strings = set(self._strings())
+            return any([s in strings for s in val._strings()])
+        if isinstance(val, str):
+            return val in self._strings()
         for n in self:
             if n.is_internal():
                 continue
-            if isinstance(val, str):
-                if str(n) == val:
-                    return True
-            elif isinstance(n.value, Number):
+            if isinstance(n.value, Number):
                 if float(n.value) == val:
                     return True
             elif n.value == val:
                 return True
         return False
 
-    @comparison
     def __ne__(self, val: XPathValue) -> bool:
+        if isinstance(val, NodeSet):
+            lstr = set(self._strings())
+            rstr = set(val._strings())
+            return bool(lstr and rstr and
+                        (len(lstr) > 1 or len(rstr) > 1 or lstr != rstr))
+        if isinstance(val, str):
+            return any([s != val for s in self._strings()])
         for n in self:
             if n.is_internal():
                 continue
-            if isinstance(val, str):
-                if str(n) != val:
-                    return True
-            elif isinstance(n.value, Number):
+            if isinstance(n.value, Number):
                 if float(n.value) != val:
                     return True
             elif n.value != val:
                 return True
         return False
 
-    @comparison
-    def __gt__(self, val: XPathValue) -> bool:
-        try:
-            val = float(val)
-        except (ValueError, TypeError):
+    def _compare(self, val: XPathValue, less: bool, equal: bool) -> bool:
+        """Compare the receiver's nodes with `val` numerically.
+
+        The result is ``True`` if the comparison is true for at least one
+        node. Both sides are converted to numbers only once, and only the
+        extreme values are compared.
+        """
+        lnums = _numbers([n.value for n in self])
+        if isinstance(val, NodeSet):
+            rnums = _numbers(val._strings())
+        else:
+            rnums = _numbers([val])
+        if not (lnums and rnums):
             return False
-        for n in self:
-            try:
-                if float(n.value) > val:
-                    return True
-            except (ValueError, TypeError):
-                continue
-        return False
+        if less:
+            lo, hi = min(lnums), max(rnums)
+        else:
+            lo, hi = min(rnums), max(lnums)
+        return lo <= hi if equal else lo < hi
+
+    def __gt__(self, val: XPathValue) -> bool:
+        return self._compare(val, False, False)
 
-    @comparison
     def __lt__(self, val: XPathValue) -> bool:
-        try:
-            val = float(val)
-        except (ValueError, TypeError):
-            return False
-        for n in self:
-            try:
-                if float(n.value) < val:
-                    return True
-            except (ValueError, TypeError):
-                continue
-        return False
+        return self._compare(val, True, False)
 
-    @comparison
     def __ge__(self, val: XPathValue) -> bool:
-        try:
-            val = float(val)
-        except (ValueError, TypeError):
-            return False
-        for n in self:
-            try:
-                if float(n.value) >= val:
-                    return True
-            except (ValueError, TypeError):
-                continue
-        return False
+        return self._compare(val, False, True)
 
-    @comparison
     def __le__(self, val: XPathValue) -> bool:
-        try:
-            val = float(val)
-        except (ValueError, TypeError):
-            return False
-        for n in self:
-            try:
-                if float(n.value) <= val:
-                    return True
-            except (ValueError, TypeError):
-                continue
-        return False
+        return self._compare(val, True, True)
@@ -0,0 +1,237 @@
+# Copyright © 2016-2019 CZ.NIC, z. s. p. o.
+#
+# This file is part of Yangson.
+#
+# Yangson is free software: you can redistribute it and/or modify it under the
+# terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# Yangson is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with Yangson.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Parallel validation of data trees with large lists.
+
+This module implements the following class:
+
+* ParallelValidator: Validator distributing list entries to a process pool.
+"""
+
+import json
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from .datamodel import DataModel
+from .enumerations import ContentType, ValidationScope
+from .exceptions import ValidationError
+from .instance import (ArrayEntry, InstanceNode, ObjectMember, RootNode,
+                       _validation_run)
+from .instvalue import ArrayValue, EntryValue, ObjectValue
+from .schemanode import (DataNode, InternalNode, SchemaNode, SequenceNode,
+                         TerminalNode)
+from .typealiases import DataPath
+
+__all__ = ["ParallelValidator"]
+
+_worker_model = None  # type: Optional[DataModel]
+"""Data model used by a worker process."""
+
+
+def _init_worker(yltxt: str, mod_path: Tuple[str, ...]) -> None:
+    """Build the data model in a worker process."""
+    global _worker_model
+    _worker_model = DataModel(yltxt, mod_path)
+
+
+def _validate_entries(path: DataPath, entries: List[EntryValue],
+                      scope: ValidationScope,
+                      ctype: ContentType) -> Optional[int]:
+    """Validate list entries in a worker process.
+
+    Args:
+        path: Data path of the list or leaf-list node.
+        entries: Entries to be validated.
+        scope: Scope of the validation.
+        ctype: Content type of the entries.
+
+    Returns:
+        Index of the first invalid entry, or ``None`` if all entries
+        are valid.
+    """
+    sn = _worker_model.get_data_node(path)
+    val = ArrayValue(entries)
+    root = RootNode(ObjectValue({}), _worker_model.schema, val.timestamp)
+    arr = ObjectMember(sn.iname(), {}, val, root, sn, val.timestamp)
+    check = sn._validator(scope, ctype)[1]
+    with _validation_run():
+        for i in range(len(val)):
+            try:
+                check(arr._entry(i))
+            except ValidationError:
+                return i
+    return None
+
+
+class ParallelValidator:
+    """Validator distributing entries of large lists to a process pool."""
+
+    def __init__(self, dm: DataModel, max_workers: int = None,
+                 min_entries: int = 10000, chunk_size: int = 2000):
+        """Initialize the class instance.
+
+        The YANG library and module search path of `dm` are sent to
+        every worker process once, when it is started, and the worker
+        builds its own copy of the schema from them.
+
+        Args:
+            dm: Data model of the data trees to be validated.
+            max_workers: Maximum number of worker processes (default:
+                number of processors).
+            min_entries: Minimum number of entries of a list or
+                leaf-list instance whose entries are validated by the
+                workers.
+            chunk_size: Number of entries sent to a worker at once.
+        """
+        self.min_entries = min_entries
+        self.chunk_size = chunk_size
+        self._hosts = {}  # type: Dict[Tuple[SchemaNode, int], bool]
+        self._local = {}  # type: Dict[Tuple[SequenceNode, int], bool]
+        self._executor = ProcessPoolExecutor(
+            max_workers, initializer=_init_worker,
+            initargs=(json.dumps(dm.yang_library),
+                      tuple([os.path.abspath(d) for d in
+                             dm.schema_data.module_search_path])))
+
+    def __enter__(self) -> "ParallelValidator":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """Shut down the worker processes."""
+        self._executor.shutdown()
+
+    def validate(self, inst: InstanceNode,
+                 scope: ValidationScope = ValidationScope.all,
+                 ctype: ContentType = ContentType.config) -> None:
+        """Validate an instance node.
+
+        The result and the exception raised for an invalid instance
+        are the same as for :meth:`.InstanceNode.validate`: constraints
+        are checked in the same order, and entries validated by the
+        workers are checked before the constraints that follow them.
+
+        Args:
+            inst: Instance node to be validated.
+            scope: Scope of the validation (syntax, semantics or all).
+            ctype: Receiver's content type.
+
+        Raises:
+            SchemaError: If the receiver's value doesn't conform to the schema.
+            SemanticError: If the receiver's value violates a semantic
+                constraint.
+            YangTypeError: If the receiver's value is a scalar of incorrect type.
+        """
+        pending = []  # type: List[Tuple[Future, InstanceNode, int]]
+        error = None
+        with _validation_run():
+            try:
+                self._walk(inst, scope, ctype, pending)
+            except ValidationError as e:
+                error = e
+            try:
+                for fut, arr, start in pending:
+                    i = fut.result()
+                    if i is not None:
+                        arr.schema_node._validator(scope, ctype)[1](
+                            arr._entry(start + i))
+            finally:
+                for fut, arr, start in pending:
+                    fut.cancel()
+        if error:
+            raise error
+
+    def _walk(self, inst: InstanceNode, scope: ValidationScope,
+              ctype: ContentType,
+              pending: List[Tuple[Future, InstanceNode, int]]) -> None:
+        """Validate `inst`, sending entries of large lists to workers."""
+        sn = inst.schema_node
+        val = inst.value
+        if not self._hosts_local_list(sn, scope):
+            sn._validator(scope, ctype)[1](inst)
+        elif isinstance(sn, SequenceNode) and not isinstance(inst, ArrayEntry):
+            if not isinstance(val, ArrayValue):
+                sn._validate(inst, scope, ctype)
+                return
+            if scope.value & ValidationScope.semantics.value:
+                sn._check_list_props(inst)
+                sn._check_cardinality(inst)
+            if (len(val) >= self.min_entries and
+                    self._local_entries(sn, scope)):
+                path = sn.data_path()
+                for start in range(0, len(val), self.chunk_size):
+                    pending.append((self._executor.submit(
+                        _validate_entries, path,
+                        val[start:start + self.chunk_size], scope, ctype),
+                        inst, start))
+            else:
+                for en in inst:
+                    self._walk(en, scope, ctype, pending)
+        elif isinstance(sn, TerminalNode) or not isinstance(val, ObjectValue):
+            sn._validator(scope, ctype)[1](inst)
+        else:
+            if scope.value & ValidationScope.syntax.value:
+                sn._check_schema_pattern(inst, ctype)
+            for m in inst:
+                self._walk(inst._member(m), scope, ctype, pending)
+            if (isinstance(sn, DataNode) and
+                    scope.value & ValidationScope.semantics.value):
+                sn._check_must(inst)
+            sn._count_validation()
+
+    def _hosts_local_list(self, sn: SchemaNode,
+                          scope: ValidationScope) -> bool:
+        """Return ``True`` if the subtree of `sn` contains a list or
+        leaf-list node whose entries can be validated by the workers.
+        """
+        key = (sn, scope.value)
+        res = self._hosts.get(key)
+        if res is None:
+            res = (isinstance(sn, SequenceNode) and
+                   self._local_entries(sn, scope) or
+                   isinstance(sn, InternalNode) and
+                   any([self._hosts_local_list(c, scope)
+                        for c in sn.data_children()]))
+            self._hosts[key] = res
+        return res
+
+    def _local_entries(self, sn: SequenceNode,
+                       scope: ValidationScope) -> bool:
+        """Return ``True`` if constraints on entries of `sn` within `scope`
+        depend only on data inside the entry.
+
+        Uniqueness of keys, "unique" and cardinality constraints are
+        checked in the parent process, so they are not taken into account.
+        """
+        key = (sn, scope.value)
+        if key in self._local:
+            return self._local[key]
+        res = True
+        todo = [sn]
+        while todo and res:
+            n = todo.pop()
+            for kind, deps in n._own_constraint_dependencies(sn):
+                if deps and scope.value & (
+                        ValidationScope.syntax.value if kind == "pattern"
+                        else ValidationScope.semantics.value):
+                    res = False
+            if isinstance(n, InternalNode):
+                todo.extend(n.data_children())
+        self._local[key] = res
+        return res
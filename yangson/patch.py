@@ -0,0 +1,502 @@
+# Copyright © 2016-2019 CZ.NIC, z. s. p. o.
+#
+# This file is part of Yangson.
+#
+# Yangson is free software: you can redistribute it and/or modify it under the
+# terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# Yangson is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with Yangson.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Patch documents applied to data trees.
+
+This module implements the following classes:
+
+* PatchEdit: Single edit of a patch document.
+* Patch: Abstract class for patch documents.
+* YangPatch: YANG Patch document [RFC8072]_.
+* JSONPatch: JSON Patch document [RFC6902]_.
+"""
+
+from typing import List, Optional, Tuple
+from .exceptions import (InstanceValueError, NonexistentInstance,
+                         NonexistentSchemaNode, RawMemberError, RawTypeError,
+                         YangsonException)
+from .instance import (EditSession, EntryIndex, EntryKeys, EntryValue,
+                       InstanceRoute, MemberName, ResourceIdParser, RootNode)
+from .instvalue import ArrayValue, ObjectValue, Value
+from .schemanode import (DataNode, InternalNode, LeafListNode, ListNode,
+                         SequenceNode)
+from .typealiases import JSONPointer, RawObject, RawValue
+
+__all__ = ["PatchEdit", "Patch", "YangPatch", "JSONPatch", "EditStatus"]
+
+EditStatus = Tuple[str, Optional[YangsonException]]
+"""Edit identifier and exception raised by the edit (``None`` if OK)."""
+
+
+class PatchEdit:
+    """Single edit of a patch document."""
+
+    def __init__(self, edit_id: str, operation: str,
+                 target: InstanceRoute, schema_node: DataNode,
+                 value: RawValue = None):
+        """Initialize the class instance.
+
+        Args:
+            edit_id: Identifier of the edit.
+            operation: Edit operation.
+            target: Route to the target instance.
+            schema_node: Schema node of the target instance.
+            value: Raw value used by the operation.
+        """
+        self.edit_id = edit_id
+        self.operation = operation
+        self.target = target
+        self.schema_node = schema_node
+        self.value = value
+        self.point = None  # type: Optional[InstanceRoute]
+        """Route to the reference entry or source instance."""
+        self.where = "last"
+        """Position of inserted or moved entry."""
+        self.append = False
+        """Flag indicating that an entry is to be appended to `target`."""
+        self.jptr = ""
+        """JSON pointer of `value` in the patch document."""
+
+    def __str__(self) -> str:
+        """Return a string representation of the receiver."""
+        return f"{self.edit_id}: {self.operation} {self.target!s}"
+
+    def is_entry(self) -> bool:
+        """Return ``True`` if the receiver's target is an array entry."""
+        return bool(self.target) and not isinstance(self.target[-1],
+                                                    MemberName)
+
+    def cooked_value(self) -> Value:
+        """Return the receiver's value cooked by its schema node."""
+        if self.is_entry() or self.append:
+            return self.schema_node.entry_from_raw(self.value, self.jptr)
+        return self.schema_node.from_raw(self.value, self.jptr)
+
+
+class Patch:
+    """Abstract class for patch documents.
+
+    The edits are applied in a single :class:`~.instance.EditSession`
+    so that structured values shared by multiple edits are copied only
+    once. If any edit fails, no edit takes effect.
+    """
+
+    def __init__(self, schema: InternalNode):
+        """Initialize the class instance.
+
+        Args:
+            schema: Schema node corresponding to the root of data trees.
+        """
+        self.schema_node = schema
+        self.edits = []  # type: List[PatchEdit]
+
+    def apply(self, root: RootNode) -> Tuple[RootNode, List[EditStatus]]:
+        """Apply the receiver's edits to a data tree.
+
+        Args:
+            root: Root node of the data tree.
+
+        Returns:
+            A tuple consisting of the root node of the patched data tree
+            and a list with a status of every applied edit. If an edit
+            fails, the list ends with its status and the original
+            `root` is returned.
+        """
+        sess = root.edit_session()
+        status = []
+        for edit in self.edits:
+            try:
+                getattr(self, "_op_" + edit.operation)(edit, sess)
+            except YangsonException as e:
+                status.append((edit.edit_id, e))
+                return (root, status)
+            status.append((edit.edit_id, None))
+        return (sess.commit(), status)
+
+    @staticmethod
+    def _member(rval: RawObject, key: str, jptr: JSONPointer) -> RawValue:
+        """Return a mandatory member of an object in the patch document."""
+        try:
+            return rval[key]
+        except KeyError:
+            raise RawTypeError(jptr, f"member '{key}'") from None
+        except TypeError:
+            raise RawTypeError(jptr, "object") from None
+
+    @staticmethod
+    def _route_schema_node(iroute: InstanceRoute,
+                           sn: InternalNode) -> DataNode:
+        """Return schema node of the instance addressed by `iroute`."""
+        for sel in iroute:
+            if isinstance(sel, MemberName):
+                sn = sn.get_data_child(sel.name, sel.namespace)
+        return sn
+
+    @staticmethod
+    def _exists(edit: PatchEdit, sess: EditSession) -> bool:
+        """Return ``True`` if the target instance of `edit` exists."""
+        return sess.peek(edit.target) is not None
+
+    def _position(self, edit: PatchEdit,
+                  sess: EditSession) -> Optional[int]:
+        """Return the position of a new entry (``None`` means the end)."""
+        if edit.where == "first":
+            return 0
+        if edit.where == "last":
+            return None
+        ary = sess.peek(edit.target[:-1])
+        pos = (None if ary is None else
+               edit.point[-1]._key_step(ary, edit.schema_node)[0])
+        if pos is None:
+            raise NonexistentInstance(str(edit.point), "point entry")
+        return pos + 1 if edit.where == "after" else pos
+
+    def _merge_values(self, old: Value, new: Value, sn: DataNode) -> Value:
+        """Return the result of merging cooked value `new` into `old`."""
+        if isinstance(new, ObjectValue) and isinstance(old, ObjectValue):
+            res = old.copy()
+            for m in new:
+                ov = old.get(m)
+                if ov is None:
+                    res[m] = new[m]
+                    continue
+                p, s, loc = m.partition(":")
+                cn = sn.get_data_child(*((loc, p) if s else (p, None)))
+                res[m] = self._merge_values(ov, new[m], cn)
+            return res
+        if (isinstance(new, ArrayValue) and isinstance(old, ArrayValue) and
+                isinstance(sn, ListNode) and sn.keys):
+            res = old.copy()
+            for en in new:
+                ki = res.key_index(sn._key_members)
+                pos = ki.get(ki.entry_key(en))
+                if pos is None:
+                    res.append(en)
+                else:
+                    res[pos] = self._merge_values(res[pos], en, sn)
+            return res
+        if isinstance(new, ArrayValue) and isinstance(sn, LeafListNode):
+            res = old.copy()
+            for en in new:
+                if en not in res:
+                    res.append(en)
+            return res
+        return new
+
+
+class YangPatch(Patch):
+    """YANG Patch document [RFC8072]_."""
+
+    operations = frozenset(("create", "delete", "insert", "merge", "move",
+                            "replace", "remove"))
+    """Supported edit operations."""
+
+    _jptr = "/ietf-yang-patch:yang-patch"
+
+    def __init__(self, rpatch: RawObject, schema: InternalNode,
+                 target: str = "/"):
+        """Initialize the class instance.
+
+        Args:
+            rpatch: Raw YANG Patch document.
+            schema: Schema node corresponding to the root of data trees.
+            target: Resource identifier of the patch target (all edit
+                targets are relative to it).
+
+        Raises:
+            RawTypeError: If the patch document is malformed.
+            RawMemberError: If an edit value doesn't match its target.
+            NonexistentSchemaNode: If an edit target or point is not
+                permitted by the schema.
+            InvalidArgument: If an edit target or point cannot be parsed.
+        """
+        super().__init__(schema)
+        body = self._member(rpatch, "ietf-yang-patch:yang-patch", "")
+        self.patch_id = self._member(body, "patch-id", self._jptr)
+        """Identifier of the patch."""
+        base = ResourceIdParser(target, schema).parse()
+        bsn = self._route_schema_node(base, schema)
+        redits = body.get("edit", [])
+        if not isinstance(redits, list):
+            raise RawTypeError(self._jptr + "/edit", "array")
+        for i in range(len(redits)):
+            self.edits.append(self._edit(
+                redits[i], f"{self._jptr}/edit/{i}", base, bsn))
+
+    def _edit(self, redit: RawObject, jptr: JSONPointer,
+              base: InstanceRoute, bsn: InternalNode) -> PatchEdit:
+        """Parse a single edit of the patch."""
+        eid = self._member(redit, "edit-id", jptr)
+        op = self._member(redit, "operation", jptr)
+        if op not in self.operations:
+            raise RawTypeError(jptr + "/operation", "edit operation")
+        rtarget = self._member(redit, "target", jptr)
+        tgt = InstanceRoute(base + ResourceIdParser(rtarget, bsn).parse())
+        sn = self._route_schema_node(tgt, self.schema_node)
+        res = PatchEdit(eid, op, tgt, sn)
+        if op in ("create", "insert", "merge", "replace"):
+            res.value = self._edit_value(redit, jptr, res)
+        if op in ("insert", "move"):
+            if not res.is_entry():
+                raise RawTypeError(jptr + "/target", "list entry")
+            res.where = redit.get("where", "last")
+            if res.where not in ("before", "after", "first", "last"):
+                raise RawTypeError(jptr + "/where", "insert position")
+            if res.where in ("before", "after"):
+                rpoint = self._member(redit, "point", jptr)
+                res.point = InstanceRoute(
+                    base + ResourceIdParser(rpoint, bsn).parse())
+                if (not res.point or isinstance(res.point[-1], MemberName) or
+                        res.point[:-1] != tgt[:-1]):
+                    raise RawTypeError(jptr + "/point",
+                                       "entry of the target's list")
+        return res
+
+    def _edit_value(self, redit: RawObject, jptr: JSONPointer,
+                    edit: PatchEdit) -> RawValue:
+        """Extract the raw value of the target instance from an edit."""
+        rval = self._member(redit, "value", jptr)
+        edit.jptr = jptr + "/value"
+        if not edit.target:
+            return rval
+        if not isinstance(rval, dict) or len(rval) != 1:
+            raise RawTypeError(edit.jptr, "object with one member")
+        name, val = next(iter(rval.items()))
+        edit.jptr += "/" + name
+        if name.partition(":")[2] != edit.schema_node.name:
+            raise RawMemberError(edit.jptr)
+        if not edit.is_entry():
+            return val
+        if not isinstance(val, list) or len(val) != 1:
+            raise RawTypeError(edit.jptr, "array with one entry")
+        edit.jptr += "/0"
+        return val[0]
+
+    def _check_root(self, edit: PatchEdit) -> None:
+        """Raise an exception if the target of `edit` is the root."""
+        if not edit.target:
+            raise InstanceValueError("/", f"{edit.operation} of root")
+
+    def _check_user_ordered(self, edit: PatchEdit) -> None:
+        """Raise an exception if the target of `edit` cannot be reordered."""
+        if not edit.schema_node.user_ordered:
+            raise InstanceValueError(
+                str(edit.target), f"{edit.operation} in list that is "
+                "not ordered-by user")
+
+    def _cooked_value(self, edit: PatchEdit) -> Value:
+        """Return the cooked value of `edit`.
+
+        Raises:
+            InstanceValueError: If the value is a list or leaf-list entry
+                that doesn't match the keys or value in the target.
+        """
+        res = edit.cooked_value()
+        sel = edit.target[-1] if edit.target else None
+        if isinstance(sel, EntryKeys):
+            keys = sel.parse_keys(edit.schema_node)
+            if any([res.get(k) != keys[k] for k in keys]):
+                raise InstanceValueError(str(edit.target),
+                                         "keys differ from the target")
+        elif isinstance(sel, EntryValue):
+            if res != sel.parse_value(edit.schema_node):
+                raise InstanceValueError(str(edit.target),
+                                         "value differs from the target")
+        return res
+
+    def _op_create(self, edit: PatchEdit, sess: EditSession) -> None:
+        self._check_root(edit)
+        if self._exists(edit, sess):
+            raise InstanceValueError(str(edit.target), "data exists")
+        self._store(edit, sess, self._cooked_value(edit))
+
+    def _op_delete(self, edit: PatchEdit, sess: EditSession) -> None:
+        self._check_root(edit)
+        sess.delete(edit.target)
+
+    def _op_insert(self, edit: PatchEdit, sess: EditSession) -> None:
+        self._check_user_ordered(edit)
+        if self._exists(edit, sess):
+            raise InstanceValueError(str(edit.target), "data exists")
+        sess.insert(edit.target[:-1], self._cooked_value(edit),
+                    self._position(edit, sess))
+
+    def _op_merge(self, edit: PatchEdit, sess: EditSession) -> None:
+        old = sess.peek(edit.target)
+        if old is None:
+            self._store(edit, sess, self._cooked_value(edit))
+        else:
+            sess.put(edit.target, self._merge_values(
+                old, self._cooked_value(edit), edit.schema_node))
+
+    def _op_move(self, edit: PatchEdit, sess: EditSession) -> None:
+        self._check_user_ordered(edit)
+        value = sess.peek(edit.target)
+        if value is None:
+            raise NonexistentInstance(str(edit.target), "move target")
+        sess.delete(edit.target)
+        sess.insert(edit.target[:-1], value, self._position(edit, sess))
+
+    def _op_remove(self, edit: PatchEdit, sess: EditSession) -> None:
+        self._check_root(edit)
+        if self._exists(edit, sess):
+            sess.delete(edit.target)
+
+    def _op_replace(self, edit: PatchEdit, sess: EditSession) -> None:
+        self._store(edit, sess, self._cooked_value(edit))
+
+    def _store(self, edit: PatchEdit, sess: EditSession,
+               value: Value) -> None:
+        """Put a cooked value to the target of `edit`, creating it."""
+        if edit.is_entry() and not self._exists(edit, sess):
+            sess.insert(edit.target[:-1], value)
+        else:
+            sess.put(edit.target, value)
+
+
+class JSONPatch(Patch):
+    """JSON Patch document [RFC6902]_.
+
+    Paths in the patch are JSON pointers into the JSON encoding of data
+    trees [RFC7951]_.
+    """
+
+    operations = frozenset(("add", "copy", "move", "remove", "replace",
+                            "test"))
+    """Supported operations."""
+
+    def __init__(self, rpatch: List[RawObject], schema: InternalNode):
+        """Initialize the class instance.
+
+        Args:
+            rpatch: Raw JSON Patch document.
+            schema: Schema node corresponding to the root of data trees.
+
+        Raises:
+            RawTypeError: If the patch document is malformed.
+            NonexistentSchemaNode: If a path is not permitted by the
+                schema.
+        """
+        super().__init__(schema)
+        if not isinstance(rpatch, list):
+            raise RawTypeError("", "array")
+        for i in range(len(rpatch)):
+            self.edits.append(self._edit(rpatch[i], f"/{i}", str(i)))
+
+    def _edit(self, rop: RawObject, jptr: JSONPointer,
+              edit_id: str) -> PatchEdit:
+        """Parse a single operation of the patch."""
+        op = self._member(rop, "op", jptr)
+        if op not in self.operations:
+            raise RawTypeError(jptr + "/op", "patch operation")
+        path = self._member(rop, "path", jptr)
+        tgt, sn, app = self._pointer_route(path, jptr + "/path",
+                                           op in ("add", "copy", "move"))
+        res = PatchEdit(edit_id, op, tgt, sn)
+        res.append = app
+        if op in ("add", "replace", "test"):
+            res.value = self._member(rop, "value", jptr)
+            res.jptr = jptr + "/value"
+        elif op in ("copy", "move"):
+            src = self._member(rop, "from", jptr)
+            res.point = self._pointer_route(src, jptr + "/from")[0]
+            if op == "move" and path.startswith(src + "/"):
+                raise RawTypeError(jptr + "/from",
+                                   "location outside the subtree of path")
+        return res
+
+    def _pointer_route(self, ptr: JSONPointer, jptr: JSONPointer,
+                       append: bool = False) -> Tuple[
+                           InstanceRoute, DataNode, bool]:
+        """Translate a JSON pointer to an instance route.
+
+        Returns:
+            A tuple consisting of the instance route, schema node of the
+            target instance, and a flag that is ``True`` if the pointer
+            ends with ``-`` (a new array entry).
+        """
+        res = InstanceRoute()
+        sn = self.schema_node
+        if ptr == "":
+            return (res, sn, False)
+        if not isinstance(ptr, str) or not ptr.startswith("/"):
+            raise RawTypeError(jptr, "JSON pointer")
+        toks = [t.replace("~1", "/").replace("~0", "~")
+                for t in ptr[1:].split("/")]
+        inarray = False
+        for i in range(len(toks)):
+            tok = toks[i]
+            if inarray:
+                if tok == "-" and append and i == len(toks) - 1:
+                    return (res, sn, True)
+                if not tok.isdigit():
+                    raise RawTypeError(jptr, "array index")
+                res.append(EntryIndex(int(tok)))
+                inarray = False
+                continue
+            p, s, loc = tok.partition(":")
+            name, ns = (loc, p) if s else (p, None)
+            cn = (sn.get_data_child(name, ns)
+                  if isinstance(sn, InternalNode) else None)
+            if cn is None:
+                raise NonexistentSchemaNode(sn.qual_name, name, ns)
+            res.append(MemberName(name, ns))
+            inarray = isinstance(cn, SequenceNode)
+            sn = cn
+        return (res, sn, False)
+
+    def _add_value(self, edit: PatchEdit, sess: EditSession,
+                   value: Value) -> None:
+        """Add a cooked value to the target of `edit`."""
+        if edit.append:
+            sess.insert(edit.target, value)
+        elif edit.is_entry():
+            ind = edit.target[-1].index
+            ary = sess.peek(edit.target[:-1])
+            if ary is None or ind > len(ary):
+                raise NonexistentInstance(str(edit.target), "array index")
+            sess.insert(edit.target[:-1], value, ind)
+        else:
+            sess.put(edit.target, value)
+
+    def _op_add(self, edit: PatchEdit, sess: EditSession) -> None:
+        self._add_value(edit, sess, edit.cooked_value())
+
+    def _op_copy(self, edit: PatchEdit, sess: EditSession) -> None:
+        value = sess.peek(edit.point)
+        if value is None:
+            raise NonexistentInstance(str(edit.point), "copy source")
+        self._add_value(edit, sess, value)
+
+    def _op_move(self, edit: PatchEdit, sess: EditSession) -> None:
+        value = sess.peek(edit.point)
+        if value is None:
+            raise NonexistentInstance(str(edit.point), "move source")
+        sess.delete(edit.point)
+        self._add_value(edit, sess, value)
+
+    def _op_remove(self, edit: PatchEdit, sess: EditSession) -> None:
+        sess.delete(edit.target)
+
+    def _op_replace(self, edit: PatchEdit, sess: EditSession) -> None:
+        if not self._exists(edit, sess):
+            raise NonexistentInstance(str(edit.target), "replace target")
+        sess.put(edit.target, edit.cooked_value())
+
+    def _op_test(self, edit: PatchEdit, sess: EditSession) -> None:
+        if sess.peek(edit.target) != edit.cooked_value():
+            raise InstanceValueError(str(edit.target), "test failed")
@@ -0,0 +1,187 @@
+# Copyright © 2016-2019 CZ.NIC, z. s. p. o.
+#
+# This file is part of Yangson.
+#
+# Yangson is free software: you can redistribute it and/or modify it under the
+# terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# Yangson is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with Yangson.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Profiling of validation.
+
+This module implements the following class:
+
+* ValidationProfiler: Recorder of time spent in validation checks.
+"""
+
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Tuple
+from .typealiases import DataPath
+
+if False:                       # fake import for type aliases
+    from .schemanode import SchemaNode
+
+__all__ = ["ValidationProfiler"]
+
+_active_profiler = ContextVar("_active_profiler", default=None)
+"""Profiler recording validations in the current context."""
+
+Frame = Tuple[str, ...]
+"""Stack of frame names."""
+
+
+class ValidationProfiler:
+    """Recorder of time spent in validation checks."""
+
+    def __init__(self):
+        """Initialize the class instance."""
+        self.nodes = {}  # type: Dict[DataPath, List[Any]]
+        """Count, cumulative time and self time of schema nodes."""
+        self.checks = {}  # type: Dict[Tuple[DataPath, str], List[Any]]
+        """Count and cumulative time of individual checks."""
+        self.stacks = {}  # type: Dict[Frame, float]
+        """Self time of stack frames."""
+        self._stack = []  # type: List[List[Any]]
+        self._token = None
+
+    def __enter__(self) -> "ValidationProfiler":
+        """Start recording validations in the current context."""
+        self._token = _active_profiler.set(self)
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Stop recording validations."""
+        _active_profiler.reset(self._token)
+        self._token = None
+
+    def clear(self) -> None:
+        """Discard all recorded data."""
+        self.nodes.clear()
+        self.checks.clear()
+        self.stacks.clear()
+
+    def to_raw(self) -> Dict[str, Any]:
+        """Return recorded data as a raw value ready for JSON encoding.
+
+        Times are in seconds.
+        """
+        res = {}
+        for path, (cnt, tm, stm) in self.nodes.items():
+            res[path] = {"count": cnt, "time": tm, "self-time": stm,
+                         "checks": {}}
+        for (path, check), (cnt, tm) in self.checks.items():
+            node = res.setdefault(
+                path, {"count": 0, "time": 0.0, "self-time": 0.0,
+                       "checks": {}})
+            node["checks"][check] = {"count": cnt, "time": tm}
+        return {"nodes": res}
+
+    def to_json(self, indent: int = None) -> str:
+        """Return recorded data in JSON format.
+
+        Args:
+            indent: Indentation of the JSON text (``None`` means compact
+                output).
+        """
+        return json.dumps(self.to_raw(), indent=indent)
+
+    def collapsed_stacks(self) -> str:
+        """Return recorded data as collapsed stacks.
+
+        Every line contains semicolon-separated frames and self time of
+        the last frame in microseconds. This format is accepted by
+        flame graph generators.
+        """
+        return "".join(
+            [";".join([f.replace(";", ",") for f in st]) +
+             f" {round(tm * 1e6)}\n" for st, tm in self.stacks.items()])
+
+    def hot_checks(self, limit: int = 10) -> List[
+            Tuple[DataPath, str, int, float]]:
+        """Return checks with the highest cumulative time.
+
+        Args:
+            limit: Maximum number of checks.
+
+        Returns:
+            List of tuples containing data path of the schema node, check,
+            count and cumulative time in seconds.
+        """
+        res = [(path, check, cnt, tm) for (path, check), (cnt, tm)
+               in self.checks.items()]
+        res.sort(key=lambda x: x[3], reverse=True)
+        return res[:limit]
+
+    @contextmanager
+    def _node(self, sn: "SchemaNode") -> Iterator[None]:
+        """Record validation of an instance of `sn`.
+
+        Nested validation of entries of the same list or leaf-list is
+        recorded as a part of the enclosing frame.
+        """
+        if self._stack and self._stack[-1][0] is sn and self._stack[-1][1]:
+            yield
+            return
+        path = self._path(sn)
+        frame = self._push(sn, True, self._node_stack(path))
+        try:
+            yield
+        finally:
+            tm, stm = self._pop(frame)
+            rec = self.nodes.setdefault(path, [0, 0.0, 0.0])
+            rec[0] += 1
+            rec[1] += tm
+            rec[2] += stm
+
+    @contextmanager
+    def _check(self, sn: "SchemaNode", check: str) -> Iterator[None]:
+        """Record a check of an instance of `sn`."""
+        path = self._path(sn)
+        top = self._stack[-1] if self._stack else None
+        parent = (top[2] if top and top[0] is sn else
+                  self._node_stack(path))
+        frame = self._push(sn, False, parent + (check,))
+        try:
+            yield
+        finally:
+            tm = self._pop(frame)[0]
+            rec = self.checks.setdefault((path, check), [0, 0.0])
+            rec[0] += 1
+            rec[1] += tm
+
+    @staticmethod
+    def _path(sn: "SchemaNode") -> DataPath:
+        """Return data path of `sn`."""
+        return "/" if sn.parent is None else sn.data_path()
+
+    @staticmethod
+    def _node_stack(path: DataPath) -> Frame:
+        """Return frame names of a schema node with data path `path`."""
+        return ("/",) + tuple([c for c in path.split("/") if c])
+
+    def _push(self, sn: "SchemaNode", node: bool,
+              stack: Frame) -> List[Any]:
+        frame = [sn, node, stack, perf_counter(), 0.0]
+        self._stack.append(frame)
+        return frame
+
+    def _pop(self, frame: List[Any]) -> Tuple[float, float]:
+        """Remove `frame` and return its cumulative and self time."""
+        self._stack.pop()
+        tm = perf_counter() - frame[3]
+        stm = tm - frame[4]
+        if self._stack:
+            self._stack[-1][4] += tm
+        self.stacks[frame[2]] = self.stacks.get(frame[2], 0.0) + stm
+        return (tm, stm)
@@ -41,22 +41,31 @@ This module implements the following classes:
 * AnyxmlNode: YANG anyxml node.
 """
 
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Set, Tuple
+from functools import partial
+from itertools import product
+import json
+from typing import (Any, Callable, ContextManager, Dict, Iterator, List,
+                    Optional, Set, Tuple)
 from .constraint import Must
-from .datatype import (DataType, LeafrefType, LinkType,
-                       RawScalar, IdentityrefType)
+from .datatype import (BitsType, DataType, LeafrefType, LinkType,
+                       InstanceIdentifierType, RawScalar, IdentityrefType,
+                       UnionType)
 from .enumerations import Axis, ContentType, DefaultDeny, ValidationScope
 from .exceptions import (
     AnnotationTypeError, InvalidLeafrefPath, InvalidArgument,
-    MissingAnnotationTarget, MissingAugmentTarget, RawMemberError,
-    RawTypeError, SchemaError, SemanticError, UndefinedAnnotation,
-    YangsonException, YangTypeError)
+    MissingAnnotationTarget, MissingAugmentTarget, NonexistentSchemaNode,
+    RawMemberError, RawTypeError, SchemaError, SemanticError,
+    UndefinedAnnotation, ValidationError, YangsonException, YangTypeError)
+from .jsonstream import JSONEvent, JSONStreamReader
+from .profiler import _active_profiler
 from .instvalue import (
-    ArrayValue, EntryValue, MetadataObject, ObjectValue, Value)
+    ArrayValue, EntryValue, LazyObjectValue, LazyValue, MetadataObject,
+    ObjectValue, StructuredValue, Timestamp, Value, next_timestamp)
 from .schemadata import IdentityAdjacency, SchemaContext
 from .schpattern import (ChoicePattern, ConditionalPattern, Empty, Member,
-                         NotAllowed, Pair, SchemaPattern)
+                         Pair, PatternAutomaton, SchemaPattern)
 from .statement import Statement
 from .typealiases import (DataPath, InstanceName, JSONPointer, QualName,
                           RawEntry, RawList, RawObject, RawValue,
@@ -64,6 +73,69 @@ from .typealiases import (DataPath, InstanceName, JSONPointer, QualName,
                           YangIdentifier)
 from .xpathparser import XPathParser
 
+# Type aliases
+Validator = Tuple[Optional[Callable[[Value], bool]],
+                  Callable[["InstanceNode"], None]]
+"""Compiled validation functions for instances of a schema node.
+
+The first function tests an instance value. It is ``None`` if instance
+nodes are needed for validation, e.g. for evaluating XPath expressions.
+The second function validates an instance node.
+"""
+
+RawRoute = Optional[Tuple["RawRoute", Any]]
+"""Route to a raw value: route to the parent and member name or index."""
+
+RawValidator = Optional[Callable[[RawValue, RawRoute, Any], bool]]
+"""Compiled syntax test of raw instance values of a schema node.
+
+The function gets a raw value, route to its parent, and its member name
+or entry index. It returns ``True`` if the value can be cooked and the
+result is valid in the syntax scope, otherwise ``False``. It is ``None``
+if the test is not possible without cooking the value.
+"""
+
+
+class _ErrorLimitReached(Exception):
+    """The maximum number of collected validation errors was reached."""
+    pass
+
+
+class _ErrorCollector:
+    """Validation errors collected during a validation run."""
+
+    def __init__(self, limit: Optional[int]):
+        """Initialize the class instance.
+
+        Args:
+            limit: Maximum number of errors (``None`` means no limit).
+        """
+        self.errors = []  # type: List[ValidationError]
+        self.limit = limit
+
+    def add(self, exc: ValidationError) -> None:
+        """Record an error.
+
+        Raises:
+            _ErrorLimitReached: If the limit was reached.
+        """
+        self.errors.append(exc)
+        if self.limit is not None and len(self.errors) >= self.limit:
+            raise _ErrorLimitReached
+
+    def check(self, method: Callable, *args: Any) -> bool:
+        """Run a check method and record its error, if any.
+
+        Returns:
+            ``True`` if the check passed.
+        """
+        try:
+            method(*args)
+        except ValidationError as e:
+            self.add(e)
+            return False
+        return True
+
 
 class Annotation:
     """Class for metadata annotations [RFC 7952]."""
@@ -94,6 +166,8 @@ class SchemaNode:
         self.val_count = 0
         self._ctype = None
         """Content type of the receiver."""
+        self._validators = {}  # type: Dict[Tuple, Validator]
+        self._raw_validators = {}  # type: Dict[ContentType, RawValidator]
 
     @property
     def qual_name(self) -> QualName:
@@ -144,12 +218,15 @@ class SchemaNode:
         """Return a list of data paths to descendant state data roots."""
         return [r.data_path() for r in self._state_roots()]
 
-    def from_raw(self, rval: RawValue, jptr: JSONPointer = "") -> Value:
+    def from_raw(self, rval: RawValue, jptr: JSONPointer = "",
+                 ts: Timestamp = None) -> Value:
         """Return instance value transformed from a raw value using receiver.
 
         Args:
             rval: Raw value.
             jptr: JSON pointer of the current instance node.
+            ts: Timestamp of the structured values (current date and time
+                if not specified).
 
         Raises:
             RawMemberError: If a member inside `rval` is not defined in the
@@ -158,10 +235,72 @@ class SchemaNode:
         """
         raise NotImplementedError
 
+    def lazy_from_raw(self, rval: RawValue, jptr: JSONPointer = "",
+                      ts: Timestamp = None) -> Value:
+        """Return instance value whose structured parts are cooked lazily.
+
+        Structured member values are transformed only when they are first
+        accessed, so errors in them are also reported at that time.
+
+        Args:
+            rval: Raw value.
+            jptr: JSON pointer of the current instance node.
+            ts: Timestamp of the structured values.
+
+        Raises:
+            The same exceptions as :meth:`from_raw`.
+        """
+        return self.from_raw(rval, jptr, ts)
+
+    def from_events(self, reader: JSONStreamReader, event: JSONEvent,
+                    jptr: JSONPointer = "", ts: Timestamp = None) -> Value:
+        """Return instance value cooked directly from JSON parsing events.
+
+        Args:
+            reader: JSON stream reader positioned inside the value.
+            event: First event of the value (that has already been read).
+            jptr: JSON pointer of the current instance node.
+            ts: Timestamp of the structured values.
+
+        Raises:
+            The same exceptions as :meth:`from_raw`.
+        """
+        return self.from_raw(reader.read_value(event), jptr, ts)
+
+    def _json_parts(self, val: Value) -> Iterator[str]:
+        """Generate parts of the JSON text representing a cooked value."""
+        yield json.dumps(val, separators=(",", ":"))
+
     def clear_val_counters(self) -> None:
         """Clear receiver's validation counter."""
         self.val_count = 0
 
+    def _count_validation(self) -> None:
+        """Increment receiver's validation counter.
+
+        During a validation run, the count is kept in the context of the
+        run and added to the counter when the run ends.
+        """
+        ctx = _validation_context.get()
+        if ctx is None:
+            self.val_count += 1
+        else:
+            ctx.val_counts[self] += 1
+
+    def _profile(self, check: str,
+                 expr: "Expr" = None) -> ContextManager[None]:
+        """Return a context manager recording a check in the active profiler.
+
+        Args:
+            check: Kind of the check.
+            expr: Expression of a "must" or "when" check.
+        """
+        prof = _active_profiler.get()
+        if prof is None:
+            return nullcontext()
+        return prof._check(self, check if expr is None else
+                           f"{check} {expr.text}")
+
     def _get_description(self, stmt: Statement):
         dst = stmt.find1("description")
         if dst is not None:
@@ -196,7 +335,281 @@ class SchemaNode:
             SemanticError: If `inst` violates a semantic rule.
             YangTypeError: If `inst` is a scalar of incorrect type.
         """
-        self.val_count += 1
+        self._count_validation()
+
+    def _validation_errors(self, inst: "InstanceNode",
+                           scope: ValidationScope, ctype: ContentType,
+                           limit: Optional[int]) -> List[ValidationError]:
+        """Validate instance and return all errors found.
+
+        Args:
+            inst: Instance node to be validated.
+            scope: Scope of the validation (syntax, semantics or all)
+            ctype: Content type of the instance.
+            limit: Maximum number of errors (``None`` means no limit).
+        """
+        if limit is not None and limit < 1:
+            return []
+        errors = _ErrorCollector(limit)
+        try:
+            self._collect_errors(inst, scope, ctype, errors)
+        except _ErrorLimitReached:
+            pass
+        return errors.errors
+
+    def _collect_errors(self, inst: "InstanceNode", scope: ValidationScope,
+                        ctype: ContentType, errors: _ErrorCollector) -> None:
+        """Validate instance and record all errors in `errors`.
+
+        The compiled validator is tried first, and only if it fails,
+        constraints of the instance and its children are checked one by
+        one with :meth:`_diagnose`.
+        """
+        prof = _active_profiler.get()
+        if prof is not None:
+            with prof._node(self):
+                self._diagnose(inst, scope, ctype, errors)
+            return
+        try:
+            self._validator(scope, ctype)[1](inst)
+        except ValidationError:
+            self._diagnose(inst, scope, ctype, errors)
+
+    def _diagnose(self, inst: "InstanceNode", scope: ValidationScope,
+                  ctype: ContentType, errors: _ErrorCollector) -> None:
+        """Check the same constraints as :meth:`_validate` but record errors.
+
+        Args:
+            inst: Instance node to be validated.
+            scope: Scope of the validation (syntax, semantics or all)
+            ctype: Content type of the instance.
+            errors: Collector of validation errors.
+        """
+        self._count_validation()
+
+    def _validator(self, scope: ValidationScope,
+                   ctype: ContentType) -> Validator:
+        """Return compiled validation functions for receiver's instances.
+
+        The functions are compiled when they are first needed and then
+        kept with the receiver.
+
+        Args:
+            scope: Scope of the validation (syntax, semantics or all)
+            ctype: Content type of the instances.
+        """
+        key = (scope, ctype)
+        res = self._validators.get(key)
+        if res is None:
+            res = self._validators[key] = self._compile_validator(scope, ctype)
+        return res
+
+    def _compile_validator(self, scope: ValidationScope,
+                           ctype: ContentType) -> Validator:
+        """Compile validation functions for receiver's instances.
+
+        The compiled functions perform the same checks as :meth:`_validate`
+        but decisions that depend only on the schema are made in advance.
+        If a value test fails, the instance is validated again with
+        :meth:`_validate` so as to raise the appropriate exception.
+
+        Args:
+            scope: Scope of the validation (syntax, semantics or all)
+            ctype: Content type of the instances.
+        """
+        if self.must and scope.value & ValidationScope.semantics.value:
+            def check_inst(inst: "InstanceNode") -> None:
+                self._check_must(inst)
+                self._count_validation()
+            return (None, check_inst)
+
+        def check_value(val: Value) -> bool:
+            self._count_validation()
+            return True
+        return (check_value, self._check_instance(check_value, scope, ctype))
+
+    def _check_instance(self, check_value: Callable[[Value], bool],
+                        scope: ValidationScope,
+                        ctype: ContentType) -> Callable[["InstanceNode"], None]:
+        """Return instance validation function based on a value test."""
+        def check_inst(inst: "InstanceNode") -> None:
+            if not check_value(inst.value):
+                self._validate(inst, scope, ctype)
+        return check_inst
+
+    def _raw_validator(self, ctype: ContentType) -> RawValidator:
+        """Return compiled syntax test of receiver's raw instance values.
+
+        The function is compiled when it is first needed and then kept
+        with the receiver.
+
+        Args:
+            ctype: Content type of the instances.
+        """
+        try:
+            return self._raw_validators[ctype]
+        except KeyError:
+            res = self._raw_validators[ctype] = (
+                self._compile_raw_validator(ctype))
+            return res
+
+    def _compile_raw_validator(self, ctype: ContentType) -> RawValidator:
+        """Compile syntax test of receiver's raw instance values.
+
+        The test performs the same checks as :meth:`from_raw` followed by
+        validation in the syntax scope, but neither cooked structured
+        values nor instance nodes are created.
+
+        Args:
+            ctype: Content type of the instances.
+        """
+        return None
+
+    def _raw_instance(self, route: RawRoute) -> "InstanceNode":
+        """Return instance node of a raw value being validated.
+
+        The instance is obtained from the data tree passed to
+        :meth:`.DataModel.validate_raw`, which is cooked lazily when it
+        is first needed.
+
+        Args:
+            route: Route to the raw value.
+        """
+        ctx = _validation_context.get()
+        if ctx.raw_root is None:
+            sroot = self.schema_root()
+            val = sroot.lazy_from_raw(ctx.raw_data)
+            ctx.raw_root = RootNode(val, sroot, val.timestamp)
+        keys = []
+        while route[0] is not None:
+            keys.append(route[1])
+            route = route[0]
+        res = ctx.raw_root
+        for k in reversed(keys):
+            res = res[k]
+        return res
+
+    def _revalidate(self, inst: "InstanceNode", old: Value,
+                    scope: ValidationScope, ctype: ContentType,
+                    changes: Set["SchemaNode"]) -> None:
+        """Validate instance whose previous value is known to be valid.
+
+        Only the parts of the instance that differ from `old` are
+        validated.
+
+        Args:
+            inst: Instance node to be validated.
+            old: Previous value of the instance.
+            scope: Scope of the validation (syntax, semantics or all)
+            ctype: Content type of the instance.
+            changes: Set to which schema nodes of added, removed and
+                modified instances are added.
+
+        Raises:
+            The same exceptions as :meth:`_validate`.
+        """
+        self._validate(inst, scope, ctype)
+        changes.add(self)
+
+    def _check_must(self, inst: "InstanceNode") -> None:
+        for m in self.must:
+            with self._profile("must", m.expression):
+                if not m.expression.evaluate(inst):
+                    raise SemanticError(inst.json_pointer(), m.error_tag,
+                                        m.error_message)
+
+    def _data_instances(self, root: "RootNode") -> List["InstanceNode"]:
+        """Return all instances of the receiver in a data tree.
+
+        Instances of list and leaf-list nodes are their entries.
+
+        Args:
+            root: Root node of the data tree.
+        """
+        if self is root.schema_node:
+            return [root]
+        dp = self.data_parent()
+        iname = self.iname()
+        res = []
+        for pinst in (dp._data_instances(root) if dp else [root]):
+            if isinstance(pinst.value, ObjectValue) and iname in pinst.value:
+                inst = pinst._member(iname)
+                if isinstance(inst.value, ArrayValue):
+                    res.extend(inst)
+                else:
+                    res.append(inst)
+        return res
+
+    def _own_constraint_dependencies(
+            self, anchor: "SchemaNode" = None
+    ) -> List[Tuple[str, "XPathDependencies"]]:
+        """Return receiver's constraints that depend on data outside a subtree.
+
+        Each item of the list is a tuple consisting of the kind of the
+        constraint ("must", "pattern" or "reference") and its dependencies.
+
+        Args:
+            anchor: Schema node whose instance subtree is considered
+                local (default: the context node of each expression).
+        """
+        res = []
+        deps = XPathDependencies()
+        if isinstance(self, DataNode):
+            for m in self.must:
+                deps.add(m.expression, self, anchor)
+        if deps:
+            res.append(("must", deps))
+        if isinstance(self, InternalNode):
+            deps = XPathDependencies()
+            for ex, cn in self._pattern_whens():
+                deps.add(ex, cn, anchor)
+            if deps:
+                res.append(("pattern", deps))
+        elif (isinstance(self, TerminalNode) and
+              isinstance(self.type, LinkType) and self.type.require_instance):
+            deps = XPathDependencies()
+            if isinstance(self.type, LeafrefType):
+                deps.add(self.type.path, self, anchor)
+            else:
+                deps.add_all(self)
+            res.append(("reference", deps))
+        return res
+
+    def _xpath_axis(self, axis: Axis,
+                    qname: Optional[QualName]) -> List["SchemaNode"]:
+        """Return schema nodes of instances selected by an XPath step.
+
+        Args:
+            axis: Axis of the step.
+            qname: Name test of the step (``None`` means any name).
+        """
+        res = [self] if axis in (Axis.ancestor_or_self, Axis.self,
+                                 Axis.descendant_or_self) else []
+        if axis in (Axis.ancestor, Axis.ancestor_or_self, Axis.parent):
+            sn = self._xpath_parent()
+            while sn:
+                res.append(sn)
+                sn = None if axis == Axis.parent else sn._xpath_parent()
+        elif axis in (Axis.child, Axis.descendant, Axis.descendant_or_self):
+            todo = [self]
+            while todo:
+                sn = todo.pop()
+                if isinstance(sn, InternalNode):
+                    for c in sn.data_children():
+                        res.append(c)
+                        if axis != Axis.child:
+                            todo.append(c)
+        elif axis in (Axis.following_sibling, Axis.preceding_sibling):
+            par = self._xpath_parent()
+            if par:
+                res = par.data_children()
+        return [n for n in res if n.qual_name == qname] if qname else res
+
+    def _xpath_parent(self) -> Optional["InternalNode"]:
+        """Return schema node of the XPath parent of receiver's instances."""
+        if self.parent is None:
+            return None
+        return self.data_parent() or self.schema_root()
 
     def _iname2qname(self, iname: InstanceName) -> QualName:
         """Translate instance name to qualified name in the receiver's context.
@@ -342,6 +755,7 @@ class InternalNode(SchemaNode):
         super().__init__()
         self.children = []  # type: List[SchemaNode]
         self._mandatory_children = set()  # type: MutableSet[SchemaNode]
+        self._automata = {}  # type: Dict[ContentType, PatternAutomaton]
 
     @property
     def mandatory(self) -> bool:
@@ -422,11 +836,88 @@ class InternalNode(SchemaNode):
                 res.extend(child.data_children())
         return res
 
-    def from_raw(self, rval: RawObject, jptr: JSONPointer = "") -> ObjectValue:
+    def from_raw(self, rval: RawObject, jptr: JSONPointer = "",
+                 ts: Timestamp = None) -> ObjectValue:
         """Override the superclass method."""
+        return self._object_from_raw(rval, jptr, ObjectValue(ts=ts))
+
+    def lazy_from_raw(self, rval: RawObject, jptr: JSONPointer = "",
+                      ts: Timestamp = None) -> ObjectValue:
+        """Override the superclass method."""
+        return self._object_from_raw(rval, jptr, LazyObjectValue(ts=ts), True)
+
+    def from_events(self, reader: JSONStreamReader, event: JSONEvent,
+                    jptr: JSONPointer = "",
+                    ts: Timestamp = None) -> ObjectValue:
+        """Override the superclass method."""
+        if event[0] != "start_map":
+            raise RawTypeError(jptr, "object")
+        res = ObjectValue(ts=ts)
+        ts = res.timestamp
+        names = set()
+        annots = []
+        for ev in reader:
+            if ev[0] == "end_map":
+                break
+            qn = ev[1]
+            names.add(qn)
+            if qn.startswith("@"):
+                rmo = reader.read_value(next(reader))
+                if qn == "@":
+                    mptr = jptr
+                else:
+                    annots.append(qn[1:])
+                    mptr = jptr + "/" + qn[1:]
+                res[qn] = self._process_metadata(rmo, mptr)
+            else:
+                ch = self.get_data_child(*self._iname2qname(qn))
+                npath = jptr + "/" + qn
+                if ch is None:
+                    raise RawMemberError(npath)
+                res[ch.iname()] = ch.from_events(reader, next(reader), npath,
+                                                 ts)
+        for tgt in annots:
+            if tgt not in names:
+                raise MissingAnnotationTarget(jptr, tgt)
+        res.timestamp = ts
+        return res
+
+    def _json_parts(self, val: ObjectValue) -> Iterator[str]:
+        """Override the superclass method."""
+        yield "{"
+        sep = ""
+        for m in val:
+            name = sep + json.dumps(m) + ":"
+            sep = ","
+            if m.startswith("@"):
+                yield name + json.dumps(self._metadata_to_raw(val[m]),
+                                        separators=(",", ":"))
+                continue
+            qn = self._iname2qname(m)
+            cn = self.get_data_child(*qn)
+            if cn is None:
+                raise NonexistentSchemaNode(self.qual_name, *qn)
+            if isinstance(cn, LeafNode):
+                yield name + json.dumps(cn.type.to_raw(val[m]))
+            else:
+                yield name
+                yield from cn._json_parts(val[m])
+        yield "}"
+
+    def _metadata_to_raw(self, mo: MetadataObject) -> RawMetadataObject:
+        """Transform a cooked metadata object to the raw form."""
+        ans = self.schema_root().annotations
+        return {m: ans[self._iname2qname(m)].type.to_raw(mo[m]) for m in mo}
+
+    def _object_from_raw(self, rval: RawObject, jptr: JSONPointer,
+                         res: ObjectValue, lazy: bool = False) -> ObjectValue:
+        """Cook members of a raw object and add them to `res`.
+
+        Cooked structured values get the same timestamp as `res`.
+        """
         if not isinstance(rval, dict):
             raise RawTypeError(jptr, "object")
-        res = ObjectValue()
+        ts = res.timestamp
         for qn in rval:
             if qn.startswith("@"):
                 if qn != "@":
@@ -441,7 +932,12 @@ class InternalNode(SchemaNode):
                 npath = jptr + "/" + qn
                 if ch is None:
                     raise RawMemberError(npath)
-                res[ch.iname()] = ch.from_raw(rval[qn], npath)
+                rv = rval[qn]
+                res[ch.iname()] = (
+                    LazyValue(partial(ch.lazy_from_raw, rv, npath, ts))
+                    if lazy and isinstance(rv, (dict, list))
+                    else ch.from_raw(rv, npath, ts))
+        res.timestamp = ts
         return res
 
     def _process_metadata(self, rmo: RawMetadataObject, jptr: JSONPointer) -> MetadataObject:
@@ -477,6 +973,135 @@ class InternalNode(SchemaNode):
             inst._member(m).validate(scope, ctype)
         super()._validate(inst, scope, ctype)
 
+    def _diagnose(self, inst: "InstanceNode", scope: ValidationScope,
+                  ctype: ContentType, errors: _ErrorCollector) -> None:
+        """Extend the superclass method."""
+        syntax = scope.value & ValidationScope.syntax.value
+        if syntax:
+            with self._profile("schema"):
+                for err in self._schema_pattern_errors(inst, ctype):
+                    errors.add(err)
+        for m in inst:
+            try:
+                mem = inst._member(m)
+            except NonexistentSchemaNode:
+                if syntax:          # already reported as not allowed
+                    continue
+                raise
+            mem.schema_node._collect_errors(mem, scope, ctype, errors)
+        super()._diagnose(inst, scope, ctype, errors)
+
+    def _revalidate(self, inst: "InstanceNode", old: Value,
+                    scope: ValidationScope, ctype: ContentType,
+                    changes: Set[SchemaNode]) -> None:
+        """Override the superclass method."""
+        if not isinstance(old, ObjectValue):
+            super()._revalidate(inst, old, scope, ctype, changes)
+            return
+        if scope.value & ValidationScope.syntax.value:
+            self._check_schema_pattern(inst, ctype)
+        val = inst.value
+        for m in inst:
+            if m not in old:
+                mem = inst._member(m)
+                mem.validate(scope, ctype)
+                changes.add(mem.schema_node)
+                continue
+            new = val[m]
+            prev = old[m]
+            if new is prev or (type(new) is type(prev) and
+                               not isinstance(new, StructuredValue) and
+                               new == prev):
+                continue
+            mem = inst._member(m)
+            mem.schema_node._revalidate(mem, prev, scope, ctype, changes)
+        for m in old:
+            if m not in val and not m.startswith("@"):
+                sn = self.get_data_child(*self._iname2qname(m))
+                if sn:
+                    changes.add(sn)
+        if (isinstance(self, DataNode) and
+                scope.value & ValidationScope.semantics.value):
+            self._check_must(inst)
+        self._count_validation()
+
+    def _compile_validator(self, scope: ValidationScope,
+                           ctype: ContentType) -> Validator:
+        """Override the superclass method."""
+        syntax = scope.value & ValidationScope.syntax.value
+        must = (isinstance(self, DataNode) and self.must and
+                scope.value & ValidationScope.semantics.value)
+        members = {c.iname(): c for c in self.data_children()}
+        checks = {m: members[m]._validator(scope, ctype) for m in members}
+        if not (must or syntax and self._pattern_whens() or
+                None in [ch[0] for ch in checks.values()]):
+            start = self._pattern_automaton(ctype).start() if syntax else None
+            vchecks = {m: checks[m][0] for m in checks}
+
+            def check_value(val: Value) -> bool:
+                if not isinstance(val, ObjectValue):
+                    return False
+                st = start
+                for m in val:
+                    if m.startswith("@"):
+                        continue
+                    ch = vchecks.get(m)
+                    if ch is None or not ch(val[m]):
+                        return False
+                    if syntax:
+                        st = st.step(m)
+                        if st is None:
+                            return False
+                self._count_validation()
+                return not syntax or st.nullable
+            return (check_value,
+                    self._check_instance(check_value, scope, ctype))
+
+        def check_inst(inst: "InstanceNode") -> None:
+            val = inst.value
+            if not isinstance(val, ObjectValue):
+                self._validate(inst, scope, ctype)
+                return
+            if must:
+                self._check_must(inst)
+            if syntax:
+                self._check_schema_pattern(inst, ctype)
+            for m in val:
+                if m.startswith("@"):
+                    continue
+                try:
+                    ch = checks[m]
+                except KeyError:
+                    inst._member(m).validate(scope, ctype)
+                    continue
+                if ch[0] is None:
+                    ch[1](ObjectMember(m, val, val[m], inst, members[m],
+                                       val.timestamp))
+                elif not ch[0](val[m]):
+                    members[m]._validate(inst._member(m), scope, ctype)
+            self._count_validation()
+        return (None, check_inst)
+
+    def _pattern_whens(self) -> List[Tuple["Expr", SchemaNode]]:
+        """Return "when" expressions evaluated in receiver's schema pattern.
+
+        Each expression is accompanied by the schema node of its context
+        node.
+        """
+        res = [(self.when, self)] if self.when else []
+        todo = list(self.children)
+        while todo:
+            c = todo.pop()
+            if isinstance(c, DataNode):
+                if c.when:
+                    res.append((c.when, c))
+            elif (isinstance(c, InternalNode) and
+                  not isinstance(c, SchemaTreeNode)):
+                if c.when:
+                    res.append((c.when, self))
+                todo.extend(c.children)
+        return res
+
     def _add_child(self, node: SchemaNode) -> None:
         node.parent = self
         self.children.append(node)
@@ -485,27 +1110,107 @@ class InternalNode(SchemaNode):
         """Return the set of instance names under the receiver."""
         return frozenset([c.iname() for c in self.data_children()])
 
+    def _compile_raw_validator(self, ctype: ContentType) -> RawValidator:
+        """Override the superclass method.
+
+        If a raw value contains a member that is guarded by a "when"
+        expression in the receiver's schema pattern, the guards are
+        evaluated on the lazily cooked data tree. Otherwise, all guards
+        are assumed to be true, which cannot make an invalid value pass.
+        """
+        checks = {}  # type: Dict[InstanceName, Tuple[InstanceName, Callable]]
+        for c in self.data_children():
+            ch = c._raw_validator(ctype)
+            if ch is None:
+                return None
+            checks[c.iname()] = checks[c.ns + ":" + c.name] = (c.iname(), ch)
+        aut = self._pattern_automaton(ctype)
+        guarded = frozenset([qn for qn in checks
+                             if checks[qn][0] in aut.guarded_names])
+        start = aut.start((True,) * len(aut.conditionals))
+
+        def check_raw(rval: RawValue, route: RawRoute, key: Any) -> bool:
+            if not isinstance(rval, dict):
+                return False
+            here = (route, key)
+            st = start
+            if not guarded.isdisjoint(rval):
+                st = aut.start(aut.guards(self._raw_instance(here)))
+            for qn in rval:
+                if qn.startswith("@"):
+                    if qn != "@" and qn[1:] not in rval:
+                        return False
+                    self._process_metadata(rval[qn], "")
+                    continue
+                try:
+                    m, ch = checks[qn]
+                except KeyError:
+                    return False
+                if not ch(rval[qn], here, m):
+                    return False
+                st = st.step(m)
+                if st is None:
+                    return False
+            self._count_validation()
+            return st.nullable
+        return check_raw
+
     def _check_schema_pattern(self, inst: "InstanceNode",
                               ctype: ContentType) -> None:
-        p = self.schema_pattern
-        p._eval_when(inst)
+        with self._profile("schema"):
+            for err in self._schema_pattern_errors(inst, ctype):
+                raise err
+
+    def _schema_pattern_errors(self, inst: "InstanceNode",
+                               ctype: ContentType) -> Iterator[SchemaError]:
+        """Generate violations of the receiver's schema pattern.
+
+        Members that are not allowed are reported and then skipped.
+        """
+        aut = self._pattern_automaton(ctype)
+        st = aut.start(self._pattern_guards(aut, inst))
         for m in inst:
-            newp = p.deriv(m, ctype)
-            if isinstance(newp, NotAllowed):
-                raise SchemaError(
+            nst = st.step(m)
+            if nst is None:
+                yield SchemaError(
                     inst.json_pointer(),
                     ("" if ctype == ContentType.all else ctype.name + " ") +
                     "member-not-allowed", m)
-            p = newp
-        if not p.nullable(ctype):
-            mms = p._mandatory_members(ctype)
+                continue
+            st = nst
+        if not st.nullable:
+            mms = st.mandatory_members()
             msg = "one of " if len(mms) > 1 else ""
-            raise SchemaError(inst.json_pointer(), "missing-data",
+            yield SchemaError(inst.json_pointer(), "missing-data",
                               "expected " + msg + ", ".join([repr(m) for m in mms]))
 
+    def _pattern_guards(self, aut: PatternAutomaton,
+                        inst: "InstanceNode") -> Tuple[bool, ...]:
+        """Evaluate guards of a pattern automaton, profiling them if needed."""
+        if _active_profiler.get() is None:
+            return aut.guards(inst)
+        res = []
+        for c in aut.conditionals:
+            with self._profile("when", c.when):
+                res.append(c._when_value(inst))
+        return tuple(res)
+
+    def _pattern_automaton(self, ctype: ContentType) -> PatternAutomaton:
+        """Return the automaton of the receiver's schema pattern.
+
+        Args:
+            ctype: Content type of instances.
+        """
+        res = self._automata.get(ctype)
+        if res is None:
+            res = PatternAutomaton(self.schema_pattern, ctype)
+            self._automata[ctype] = res
+        return res
+
     def _make_schema_patterns(self) -> None:
         """Build schema pattern for the receiver and its data descendants."""
         self.schema_pattern = self._schema_pattern()
+        self._automata = {}
         for dc in self.data_children():
             if isinstance(dc, InternalNode):
                 dc._make_schema_patterns()
@@ -707,11 +1412,68 @@ class SchemaTreeNode(GroupNode):
         """Initialize the class instance."""
         super().__init__()
         self.annotations = {}  # type: Dict[QualName, Annotation]
+        self._dependent_constraints = None  # type: Optional[List[Tuple]]
 
     def data_parent(self) -> InternalNode:
         """Override the superclass method."""
         return self.parent
 
+    def _revalidate_tree(self, inst: "RootNode", old: Value,
+                         scope: ValidationScope, ctype: ContentType) -> None:
+        """Validate a data tree whose previous version is known to be valid.
+
+        Changed parts of the data tree are validated first, and then
+        constraints elsewhere in the tree that may depend on the changes
+        are checked again.
+
+        Args:
+            inst: Root node of the data tree.
+            old: Value of the previous version of the data tree.
+            scope: Scope of the validation (syntax, semantics or all)
+            ctype: Content type of the data tree.
+        """
+        changes = set()
+        self._revalidate(inst, old, scope, ctype, changes)
+        if not changes:
+            return
+        for sn, kind, deps in self._constraint_dependencies():
+            if kind == "pattern":
+                if not scope.value & ValidationScope.syntax.value:
+                    continue
+            elif not scope.value & ValidationScope.semantics.value:
+                continue
+            if not deps.affected_by(changes):
+                continue
+            for di in sn._data_instances(inst):
+                if kind == "pattern":
+                    sn._check_schema_pattern(di, ctype)
+                elif kind == "must":
+                    sn._check_must(di)
+                else:
+                    sn._check_reference(di)
+
+    def _constraint_dependencies(
+            self) -> List[Tuple[SchemaNode, str, "XPathDependencies"]]:
+        """Return constraints that depend on data outside their subtrees.
+
+        Each item of the list is a tuple consisting of the schema node
+        to whose instances the constraint applies, kind of the constraint
+        ("must", "pattern" or "reference"), and its dependencies. The
+        list is computed when it is first needed.
+        """
+        if self._dependent_constraints is not None:
+            return self._dependent_constraints
+        res = []
+        todo = [self]
+        while todo:
+            sn = todo.pop()
+            res.extend([(sn, kind, deps)
+                        for kind, deps in sn._own_constraint_dependencies()])
+            if isinstance(sn, InternalNode):
+                todo.extend(sn.data_children())
+        self._dependent_constraints = res
+        return res
+
     def _annotation_stmt(self, stmt: Statement, sctx: SchemaContext) -> None:
         """Handle annotation statement."""
         if not sctx.schema_data.if_features(stmt, sctx.text_mid):
@@ -782,6 +1544,13 @@ class DataNode(SchemaNode):
             self._check_must(inst)        # must expressions
         super()._validate(inst, scope, ctype)
 
+    def _diagnose(self, inst: "InstanceNode", scope: ValidationScope,
+                  ctype: ContentType, errors: _ErrorCollector) -> None:
+        """Extend the superclass method."""
+        if scope.value & ValidationScope.semantics.value:
+            errors.check(self._check_must, inst)
+        super()._diagnose(inst, scope, ctype, errors)
+
     def _default_instance(self, pnode: "InstanceNode", ctype: ContentType,
                           lazy: bool = False) -> "InstanceNode":
         iname = self.iname()
@@ -794,12 +1563,6 @@ class DataNode(SchemaNode):
                 return wd.up()
         return pnode
 
-    def _check_must(self, inst: "InstanceNode") -> None:
-        for m in self.must:
-            if not m.expression.evaluate(inst):
-                raise SemanticError(inst.json_pointer(), m.error_tag,
-                                    m.error_message)
-
     def _pattern_entry(self) -> SchemaPattern:
         m = Member(self.iname(), self.content_type(), self.when)
         return m if self.mandatory else SchemaPattern.optional(m)
@@ -825,13 +1588,18 @@ class TerminalNode(SchemaNode):
         return (ContentType.config if self.parent.config else
                 ContentType.nonconfig)
 
-    def from_raw(self, rval: RawScalar, jptr: JSONPointer = "") -> ScalarValue:
+    def from_raw(self, rval: RawScalar, jptr: JSONPointer = "",
+                 ts: Timestamp = None) -> ScalarValue:
         """Override the superclass method."""
         res = self.type.from_raw(rval)
         if res is None:
             raise RawTypeError(jptr, self.type.yang_type() + " value")
         return res
 
+    def _json_parts(self, val: ScalarValue) -> Iterator[str]:
+        """Override the superclass method."""
+        yield json.dumps(self.type.to_raw(val))
+
     def _node_digest(self) -> Dict[str, Any]:
         res = super()._node_digest()
         res["type"] = self.type._type_digest(self.config)
@@ -843,20 +1611,82 @@ class TerminalNode(SchemaNode):
     def _validate(self, inst: "InstanceNode", scope: ValidationScope,
                   ctype: ContentType) -> None:
         """Extend the superclass method."""
-        if (scope.value & ValidationScope.syntax.value and
-                inst.value not in self.type):
-            raise YangTypeError(inst.json_pointer(), self.type.error_tag,
-                                self.type.error_message)
-        if (isinstance(self.type, LinkType) and        # referential integrity
-                scope.value & ValidationScope.semantics.value and
-                self.type.require_instance):
-            try:
-                tgt = inst._deref()
-            except YangsonException:
-                tgt = []
+        if scope.value & ValidationScope.syntax.value:
+            self._check_type(inst)
+        if scope.value & ValidationScope.semantics.value:
+            self._check_reference(inst)
+        super()._validate(inst, scope, ctype)
+
+    def _diagnose(self, inst: "InstanceNode", scope: ValidationScope,
+                  ctype: ContentType, errors: _ErrorCollector) -> None:
+        """Extend the superclass method."""
+        if scope.value & ValidationScope.syntax.value:
+            errors.check(self._check_type, inst)
+        if scope.value & ValidationScope.semantics.value:
+            errors.check(self._check_reference, inst)
+        super()._diagnose(inst, scope, ctype, errors)
+
+    def _check_type(self, inst: "InstanceNode") -> None:
+        """Check that the value of `inst` belongs to the receiver's type."""
+        with self._profile("type"):
+            if inst.value not in self.type:
+                raise YangTypeError(inst.json_pointer(), self.type.error_tag,
+                                    self.type.error_message)
+
+    def _compile_validator(self, scope: ValidationScope,
+                           ctype: ContentType) -> Validator:
+        """Override the superclass method."""
+        typ = self.type
+        syntax = scope.value & ValidationScope.syntax.value
+        if scope.value & ValidationScope.semantics.value:
+            must = self.must
+            ref = isinstance(typ, LinkType) and typ.require_instance
+        else:
+            must = ref = False
+        in_type = typ._compile() if syntax else None
+        if must or ref:
+            def check_inst(inst: "InstanceNode") -> None:
+                if must:
+                    self._check_must(inst)
+                val = inst.value
+                if in_type and not in_type(val) and val not in typ:
+                    raise YangTypeError(inst.json_pointer(), typ.error_tag,
+                                        typ.error_message)
+                if ref:
+                    self._check_reference(inst)
+                self._count_validation()
+            return (None, check_inst)
+        if in_type is None:
+            return super()._compile_validator(scope, ctype)
+
+        def check_value(val: ScalarValue) -> bool:
+            self._count_validation()
+            return in_type(val)
+        return (check_value, self._check_instance(check_value, scope, ctype))
+
+    def _compile_raw_validator(self, ctype: ContentType) -> RawValidator:
+        """Override the superclass method."""
+        typ = self.type
+        in_type = typ._compile()
+
+        def check_raw(rval: RawValue, route: RawRoute, key: Any) -> bool:
+            val = typ.from_raw(rval)
+            if val is None or not in_type(val):
+                return False
+            self._count_validation()
+            return True
+        return check_raw
+
+    def _check_reference(self, inst: "InstanceNode") -> None:
+        """Check referential integrity of a leafref or instance-identifier."""
+        if (isinstance(self.type, LinkType) and self.type.require_instance):
+            with self._profile("reference"):
+                try:
+                    tgt = inst._deref()
+                except YangsonException:
+                    tgt = []
             if not tgt:
                 raise SemanticError(inst.json_pointer(), "instance-required")
-        super()._validate(inst, scope, ctype)
 
     def _default_value(self, inst: "InstanceNode", ctype: ContentType,
                        lazy: bool) -> "InstanceNode":
@@ -916,13 +1746,14 @@ class ContainerNode(DataNode, InternalNode):
 
     def _default_value(self, inst: "InstanceNode", ctype: ContentType,
                        lazy: bool) -> Optional["InstanceNode"]:
-        inst.value = ObjectValue()
+        inst.value = ObjectValue(ts=next_timestamp(inst.timestamp))
         return inst if lazy else self._add_defaults(inst, ctype)
 
     def _default_nodes(self, inst: "InstanceNode") -> List["InstanceNode"]:
         if self.presence:
             return []
-        res = inst.put_member(self.iname(), ObjectValue())
+        res = inst.put_member(self.iname(),
+                              ObjectValue(ts=next_timestamp(inst.timestamp)))
         if self.when is None or self.when.evaluate(res):
             return [res]
         return []
@@ -962,6 +1793,149 @@ class SequenceNode(DataNode):
             for e in inst:
                 super()._validate(e, scope, ctype)
 
+    def _diagnose(self, inst: "InstanceNode", scope: ValidationScope,
+                  ctype: ContentType, errors: _ErrorCollector) -> None:
+        """Extend the superclass method."""
+        if isinstance(inst, ArrayEntry):
+            super()._diagnose(inst, scope, ctype, errors)
+            return
+        if scope.value & ValidationScope.semantics.value:
+            with self._profile("unique"):
+                for err in self._list_props_errors(inst):
+                    errors.add(err)
+            errors.check(self._check_cardinality, inst)
+        for e in inst:
+            self._collect_errors(e, scope, ctype, errors)
+
+    def _check_list_props(self, inst: "InstanceNode") -> None:
+        """Check uniqueness of entries, if applicable."""
+        with self._profile("unique"):
+            for err in self._list_props_errors(inst):
+                raise err
+
+    def _list_props_errors(
+            self, inst: "InstanceNode") -> Iterator[ValidationError]:
+        """Generate violations of uniqueness of entries."""
+        return iter(())
+
+    def _revalidate(self, inst: "InstanceNode", old: Value,
+                    scope: ValidationScope, ctype: ContentType,
+                    changes: Set[SchemaNode]) -> None:
+        """Extend the superclass method."""
+        if isinstance(inst, ArrayEntry):
+            super()._revalidate(inst, old, scope, ctype, changes)
+            return
+        if not isinstance(old, ArrayValue):
+            self._validate(inst, scope, ctype)
+            changes.add(self)
+            return
+        if scope.value & ValidationScope.semantics.value:
+            self._check_list_props(inst)
+            self._check_cardinality(inst)
+        val = inst.value
+        changed = len(val) != len(old)
+        ids = None
+        for i in range(len(val)):
+            en = val[i]
+            if i < len(old) and en is old[i]:
+                continue
+            if ids is None:
+                ids = {id(e) for e in old}
+            if id(en) in ids:               # entry was moved
+                changed = True
+                continue
+            prev = self._matching_entry(old, en)
+            if prev is None:
+                super()._validate(inst._entry(i), scope, ctype)
+                changed = True
+            else:
+                super()._revalidate(inst._entry(i), prev, scope, ctype,
+                                    changes)
+        if changed:
+            changes.add(self)
+
+    def _matching_entry(self, val: ArrayValue,
+                        entry: EntryValue) -> Optional[EntryValue]:
+        """Return the entry of `val` that corresponds to `entry`, if any."""
+        return None
+
+    def _compile_validator(self, scope: ValidationScope,
+                           ctype: ContentType) -> Validator:
+        """Extend the superclass method.
+
+        The returned functions validate the whole sequence, and instance
+        nodes of its entries.
+        """
+        check_entry, check_entry_inst = super()._compile_validator(
+            scope, ctype)
+        semantics = scope.value & ValidationScope.semantics.value
+        props = self._compile_list_props() if semantics else None
+        if check_entry and (props or not semantics):
+            lo, hi = self.min_elements, self.max_elements
+
+            def check_value(val: Value) -> bool:
+                if not isinstance(val, ArrayValue):
+                    return False
+                if semantics and (len(val) < lo or
+                                  hi is not None and len(val) > hi or
+                                  not props(val)):
+                    return False
+                for en in val:
+                    if not check_entry(en):
+                        return False
+                return True
+        else:
+            check_value = None
+
+        def check_inst(inst: "InstanceNode") -> None:
+            if isinstance(inst, ArrayEntry):
+                check_entry_inst(inst)
+                return
+            val = inst.value
+            if check_value:
+                if not check_value(val):
+                    self._validate(inst, scope, ctype)
+                return
+            if not isinstance(val, ArrayValue):
+                self._validate(inst, scope, ctype)
+                return
+            if semantics:
+                self._check_list_props(inst)
+                self._check_cardinality(inst)
+            if check_entry is None:
+                for e in inst:
+                    check_entry_inst(e)
+                return
+            for i in range(len(val)):
+                if not check_entry(val[i]):
+                    self._validate(inst._entry(i), scope, ctype)
+        return (check_value, check_inst)
+
+    def _compile_raw_validator(self, ctype: ContentType) -> RawValidator:
+        """Extend the superclass method.
+
+        The returned function tests the whole sequence.
+        """
+        check_entry = super()._compile_raw_validator(ctype)
+        if check_entry is None:
+            return None
+
+        def check_raw(rval: RawValue, route: RawRoute, key: Any) -> bool:
+            if not isinstance(rval, list):
+                return False
+            here = (route, key)
+            for i in range(len(rval)):
+                if not check_entry(rval[i], here, i):
+                    return False
+            return True
+        return check_raw
+
+    def _compile_list_props(self) -> Optional[Callable[[ArrayValue], bool]]:
+        """Return a function testing the properties checked by
+        :meth:`_check_list_props`, or ``None`` if instance nodes are needed.
+        """
+        return lambda val: True
+
     def _check_cardinality(self, inst: "InstanceNode") -> None:
         if len(inst.value) < self.min_elements:
             raise SemanticError(inst.json_pointer(), "too-few-elements")
@@ -991,30 +1965,47 @@ class SequenceNode(DataNode):
         """Extend the superclass method."""
         return super()._tree_line() + "*"
 
-    def from_raw(self, rval: RawList, jptr: JSONPointer = "") -> ArrayValue:
+    def from_raw(self, rval: RawList, jptr: JSONPointer = "",
+                 ts: Timestamp = None) -> ArrayValue:
         """Override the superclass method."""
         if not isinstance(rval, list):
             raise RawTypeError(jptr, "array")
-        res = ArrayValue()
+        res = ArrayValue(ts=ts)
         i = 0
         for en in rval:
             i += 1
-            res.append(self.entry_from_raw(en, f"{jptr}/{i}"))
+            res.append(self.entry_from_raw(en, f"{jptr}/{i}", res.timestamp))
         return res
 
-    def entry_from_raw(self, rval: RawEntry, jptr: JSONPointer = "") -> EntryValue:
+    def entry_from_raw(self, rval: RawEntry, jptr: JSONPointer = "",
+                       ts: Timestamp = None) -> EntryValue:
         """Transform a raw (leaf-)list entry into the cooked form.
 
         Args:
             rval: raw entry (scalar or object)
             jptr: JSON pointer of the entry
+            ts: timestamp of the cooked entry
 
         Raises:
             NonexistentSchemaNode: If a member inside `rval` is not defined
                 in the schema.
             RawTypeError: If a scalar value inside `rval` is of incorrect type.
         """
-        return super().from_raw(rval, jptr)
+        return super().from_raw(rval, jptr, ts)
+
+    def _json_parts(self, val: ArrayValue) -> Iterator[str]:
+        """Override the superclass method."""
+        yield "["
+        sep = ""
+        for en in val:
+            yield sep
+            sep = ","
+            yield from self._entry_json_parts(en)
+        yield "]"
+
+    def _entry_json_parts(self, val: EntryValue) -> Iterator[str]:
+        """Generate parts of the JSON text representing a list entry."""
+        return super()._json_parts(val)
 
 
 class ListNode(SequenceNode, InternalNode):
@@ -1026,44 +2017,267 @@ class ListNode(SequenceNode, InternalNode):
         self.keys = []  # type: List[QualName]
         self._key_members = []
         self.unique = []  # type: List[List[SchemaRoute]]
+        self._unique_ex = None
 
     def _node_digest(self) -> Dict[str, Any]:
         res = super()._node_digest()
         res["keys"] = self._key_members
         return res
 
-    def _check_list_props(self, inst: "InstanceNode") -> None:
-        """Check uniqueness of keys and "unique" properties, if applicable."""
-        if self.keys:
-            self._check_keys(inst)
-        for u in self.unique:
-            self._check_unique(u, inst)
+    def lazy_from_raw(self, rval: RawList, jptr: JSONPointer = "",
+                      ts: Timestamp = None) -> ArrayValue:
+        """Override the superclass method."""
+        if not isinstance(rval, list):
+            raise RawTypeError(jptr, "array")
+        res = ArrayValue(ts=ts)
+        i = 0
+        for en in rval:
+            i += 1
+            res.append(super().lazy_from_raw(en, f"{jptr}/{i}", res.timestamp))
+        return res
 
-    def _check_keys(self, inst: "InstanceNode") -> None:
+    def from_events(self, reader: JSONStreamReader, event: JSONEvent,
+                    jptr: JSONPointer = "",
+                    ts: Timestamp = None) -> ArrayValue:
+        """Override the superclass method."""
+        if event[0] != "start_array":
+            raise RawTypeError(jptr, "array")
+        res = ArrayValue(ts=ts)
+        i = 0
+        for ev in reader:
+            if ev[0] == "end_array":
+                break
+            i += 1
+            res.append(super().from_events(reader, ev, f"{jptr}/{i}",
+                                           res.timestamp))
+        return res
+
+    def _list_props_errors(
+            self, inst: "InstanceNode") -> Iterator[ValidationError]:
+        """Override the superclass method.
+
+        Uniqueness of keys and "unique" properties is checked. All
+        properties are extracted from the entries in a single pass.
+        """
+        val = inst.value
+        km = self._key_members
+        keys_ok = not self.keys or len(val.key_index(km)) == len(val)
+        if keys_ok and not self.unique:
+            return
+        kerrs = []
         ukeys = set()
-        for i in range(len(inst.value)):
-            en = inst.value[i]
+        extractors = self._unique_extractors()
+        useen = [set() for ex in extractors]
+        uerrs = [False for ex in extractors]
+        for i in range(len(val)):
+            en = val[i]
+            if not keys_ok:
+                try:
+                    kval = tuple([en[k] for k in km])
+                except KeyError as e:
+                    kerrs.append(SchemaError(inst._entry(i).json_pointer(),
+                                             "list-key-missing", e.args[0]))
+                else:
+                    if kval in ukeys:
+                        kerrs.append(SemanticError(
+                            inst.json_pointer(), "non-unique-key",
+                            repr(kval[0] if len(kval) < 2 else kval)))
+                    ukeys.add(kval)
+            for j in range(len(extractors)):
+                if uerrs[j]:
+                    continue
+                ex = extractors[j]
+                if ex is None:
+                    den = inst._entry(i).add_defaults()
+                    uval = tuple([den._peek_schema_route(sr)
+                                  for sr in self.unique[j]])
+                else:
+                    uval = ex(en)
+                if None not in uval:
+                    if uval in useen[j]:
+                        uerrs[j] = True
+                    useen[j].add(uval)
+        yield from kerrs
+        for err in uerrs:
+            if err:
+                yield SemanticError(inst.json_pointer(), "data-not-unique")
+
+    def _compile_list_props(self) -> Optional[Callable[[ArrayValue], bool]]:
+        """Override the superclass method."""
+        extractors = self._unique_extractors()
+        if None in extractors:
+            return None
+        if not (self.keys or extractors):
+            return super()._compile_list_props()
+        km = tuple(self._key_members)
+
+        def check(val: ArrayValue) -> bool:
+            if km and len(val.key_index(km)) != len(val):
+                return False
+            useen = [set() for ex in extractors]
+            for en in val:
+                for ex, seen in zip(extractors, useen):
+                    uval = ex(en)
+                    if None not in uval:
+                        if uval in seen:
+                            return False
+                        seen.add(uval)
+            return True
+        return check
+
+    def _unique_extractors(self) -> List[Optional[
+            Callable[[EntryValue], Tuple[Optional[ScalarValue], ...]]]]:
+        """Return functions extracting "unique" properties from entries.
+
+        The list contains a function for each "unique" statement. The
+        function returns the tuple of values of leaves specified in the
+        statement, taking defaults into account. ``None`` instead of a
+        function means that the default values depend on conditions that
+        can only be evaluated in instance nodes.
+        """
+        if self._unique_ex is None:
+            self._unique_ex = []
+            for spec in self.unique:
+                fs = [self._route_extractor(sr) for sr in spec]
+                self._unique_ex.append(
+                    None if None in fs else
+                    lambda en, fs=fs: tuple([f(en) for f in fs]))
+        return self._unique_ex
+
+    def _route_extractor(self, route: SchemaRoute) -> Optional[
+            Callable[[EntryValue], Optional[ScalarValue]]]:
+        """Return a function extracting a descendant leaf value from entries.
+
+        If the leaf or any of its ancestors is missing, the function
+        returns the leaf's default value, provided that
+        :meth:`~.InstanceNode.add_defaults` would add it.
+
+        Args:
+            route: Schema route of the leaf relative to the receiver.
+
+        Returns:
+            ``None`` if defaults cannot be determined from the schema
+            alone, i.e. if the route passes through a choice, or if a
+            node on the route has a "when" condition.
+        """
+        steps = []
+        sn = self
+        for qn in route:
+            cn = sn.get_child(*qn)
+            if not (isinstance(cn, DataNode) and cn.parent is sn) or cn.when:
+                return None
+            steps.append(cn)
+            sn = cn
+        if not isinstance(sn, LeafNode):
+            return None
+        path = []
+        dflt = sn.default
+        for cn in reversed(steps):
+            if (not cn.content_type().value & cn.parent.content_type().value
+                    or isinstance(cn, ContainerNode) and cn.presence):
+                dflt = None
+            path.append((cn.iname(), dflt))
+        path.reverse()
+
+        def extract(val: EntryValue) -> Optional[ScalarValue]:
+            for iname, dflt in path:
+                try:
+                    val = val[iname]
+                except KeyError:
+                    return dflt
+                except (IndexError, TypeError):
+                    return None
+            return val
+        return extract
+
+    def _entry_positions(self, val: ArrayValue, keys: List[QualName],
+                         strings: List[List[str]]) -> Optional[List[int]]:
+        """Return positions of entries whose keys have given string values.
+
+        The key index of `val` is used, so the result is only available
+        if all entries have unique keys.
+
+        Args:
+            val: Array of list entries.
+            keys: Qualified names of all list keys.
+            strings: Acceptable canonical strings for each key in `keys`.
+
+        Returns:
+            Sorted positions of matching entries, or ``None`` if the key
+            index cannot be used.
+        """
+        if sorted(keys) != sorted(self.keys):
+            return None
+        cands = {}
+        for k, strs in zip(keys, strings):
+            typ = self.get_data_child(*k).type
+            while isinstance(typ, LeafrefType):
+                typ = typ.ref_type
+            if isinstance(typ, (BitsType, InstanceIdentifierType, UnionType)):
+                return None
+            cands[k] = vals = set()
+            for s in strs:
+                try:
+                    v = typ.parse_value(s)
+                except ValueError:
+                    continue
+                if v is not None and typ.canonical_string(v) == s:
+                    vals.add(v)
+        try:
+            ki = val.key_index(self._key_members)
+        except TypeError:
+            return None
+        if len(ki) != len(val):
+            return None
+        combs = product(*[cands[q] for q in self.keys])
+        return sorted(set([ki[k] for k in combs if k in ki]))
+
+    def _entry_position(self, val: ArrayValue,
+                        keys: Dict[InstanceName, ScalarValue]) -> Optional[int]:
+        """Return the position of the entry with matching keys.
+
+        The key index of `val` is used if `keys` contains exactly the
+        list keys, otherwise all entries are searched.
+
+        Args:
+            val: Array of list entries.
+            keys: Dictionary of member names and values to match.
+
+        Returns:
+            Position of the first matching entry, or ``None`` if no entry
+            matches.
+        """
+        if sorted(keys) == sorted(self._key_members):
+            ki = val.key_index(self._key_members)
+            pos = ki.get(tuple([keys[k] for k in self._key_members]))
+            if pos is not None or len(ki) == len(val):
+                return pos
+        for i in range(len(val)):
+            en = val[i]
             try:
-                kval = tuple([en[k] for k in self._key_members])
-            except KeyError as e:
-                raise SchemaError(inst._entry(i).json_pointer(),
-                                  "list-key-missing", e.args[0]) from None
-            if kval in ukeys:
-                raise SemanticError(inst.json_pointer(), "non-unique-key", repr(
-                    kval[0] if len(kval) < 2 else kval))
-            ukeys.add(kval)
-
-    def _check_unique(self, unique: List[SchemaRoute],
-                      inst: "InstanceNode") -> None:
-        uvals = set()
-        for en in inst:
-            den = en.add_defaults()
-            uval = tuple([den._peek_schema_route(sr) for sr in unique])
-            if None not in uval:
-                if uval in uvals:
-                    raise SemanticError(inst.json_pointer(), "data-not-unique")
+                for k in keys:
+                    if en[k] != keys[k]:
+                        break
                 else:
-                    uvals.add(uval)
+                    return i
+            except KeyError:
+                continue
+        return None
+
+    def _matching_entry(self, val: ArrayValue,
+                        entry: EntryValue) -> Optional[EntryValue]:
+        """Override the superclass method.
+
+        Entries with the same keys correspond to each other.
+        """
+        if not self.keys:
+            return None
+        try:
+            pos = self._entry_position(
+                val, {k: entry[k] for k in self._key_members})
+        except (KeyError, TypeError):
+            return None
+        return None if pos is None else val[pos]
 
     def _default_instance(self, pnode: "InstanceNode", ctype: ContentType,
                           lazy: bool = False) -> "InstanceNode":
@@ -1257,10 +2471,18 @@ class LeafListNode(SequenceNode, TerminalNode):
     def _yang_class(self) -> str:
         return "leaf-list"
 
-    def _check_list_props(self, inst: "InstanceNode") -> None:
+    def _list_props_errors(
+            self, inst: "InstanceNode") -> Iterator[ValidationError]:
+        """Override the superclass method."""
         if (self.content_type() == ContentType.config and
                 len(set(inst.value)) < len(inst.value)):
-            raise SemanticError(inst.json_pointer(), "repeated-leaf-list-value")
+            yield SemanticError(inst.json_pointer(), "repeated-leaf-list-value")
+
+    def _compile_list_props(self) -> Optional[Callable[[ArrayValue], bool]]:
+        """Override the superclass method."""
+        if self.content_type() != ContentType.config:
+            return super()._compile_list_props()
+        return lambda val: len(set(val)) == len(val)
 
     def _default_stmt(self, stmt: Statement, sctx: SchemaContext) -> None:
         if self._default is None:
@@ -1296,13 +2518,21 @@ class AnyContentNode(DataNode):
         """Is the receiver a mandatory node?"""
         return self._mandatory
 
-    def from_raw(self, rval: RawValue, jptr: JSONPointer = "") -> Value:
+    def _compile_raw_validator(self, ctype: ContentType) -> RawValidator:
+        """Override the superclass method."""
+        def check_raw(rval: RawValue, route: RawRoute, key: Any) -> bool:
+            self._count_validation()
+            return True
+        return check_raw
+
+    def from_raw(self, rval: RawValue, jptr: JSONPointer = "",
+                 ts: Timestamp = None) -> Value:
         """Override the superclass method."""
         def convert(val):
             if isinstance(val, list):
-                res = ArrayValue([convert(x) for x in val])
+                res = ArrayValue([convert(x) for x in val], ts)
             elif isinstance(val, dict):
-                res = ObjectValue({x: convert(val[x]) for x in val})
+                res = ObjectValue({x: convert(val[x]) for x in val}, ts)
             else:
                 res = val
             return res
@@ -1412,6 +2642,8 @@ class NotificationNode(SchemaTreeNode):
         return super()._tree_line_prefix() + "-n"
 
 
-from .xpathast import Expr, LocationPath, Step, Root        # NOQA
+from .xpathast import (Expr, LocationPath, Step, Root,      # NOQA
+                       XPathDependencies)
 from .instance import (ArrayEntry, EmptyList, InstanceNode,  # NOQA
-                       InstanceRoute, MemberName, ObjectMember)
+                       InstanceRoute, MemberName, ObjectMember, RootNode,
+                       _validation_context)
@@ -17,8 +17,11 @@
 
 """This module defines classes for schema patterns."""
 
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import (Dict, FrozenSet, Hashable, Iterator, List, Optional,
+                    Tuple)
 from .enumerations import ContentType
+from .instance import _validation_context, _validation_run
 from .typealiases import InstanceName, _Singleton, YangIdentifier
 from .xpathast import Expr
 if False:                       # fake import for type aliases
@@ -45,12 +48,21 @@ class SchemaPattern:
         """Return ``True`` the receiver is active in the current context."""
         return True
 
-    def _eval_when(self, cnode: "InstanceNode") -> None:
-        return
-
     def _mandatory_members(self, ctype: ContentType) -> List[InstanceName]:
         return []
 
+    def _conditionals(self) -> List["Conditional"]:
+        """Return conditional subpatterns that have a "when" expression."""
+        return []
+
+    def _names(self) -> FrozenSet[InstanceName]:
+        """Return names of all members in the receiver."""
+        return frozenset()
+
+    def _key(self) -> Hashable:
+        """Return a key that is equal for structurally equal patterns."""
+        return self
+
 
 class Empty(SchemaPattern, metaclass=_Singleton):
     """Singleton class representing the empty pattern."""
@@ -93,21 +105,32 @@ class Conditional(SchemaPattern):
     def __init__(self, when: Expr):
         """Initialize the class instance."""
         self.when = when
-        self._val_when = None  # type: bool
 
     def empty(self) -> bool:
         """Override the superclass method."""
-        return self.when and not self._val_when
+        return self.when and not self._val_when()
 
     def check_when(self) -> bool:
-        return not self.when or self._val_when
+        return not self.when or self._val_when()
 
-    def _eval_when(self, cnode: "InstanceNode") -> None:
-        self._val_when = bool(self.when.evaluate(cnode))
+    def _val_when(self) -> Optional[bool]:
+        """Return the value of the receiver's "when" expression.
+
+        The value is taken from the context of the current validation run.
+        """
+        ctx = _validation_context.get()
+        return None if ctx is None else ctx.when_values.get(self)
+
+    def _when_value(self, cnode: "InstanceNode") -> bool:
+        """Evaluate the receiver's "when" expression."""
+        return bool(self.when.evaluate(cnode))
 
     def _active(self, ctype: ContentType) -> bool:
         return super()._active(ctype) and self.check_when()
 
+    def _conditionals(self) -> List["Conditional"]:
+        return [self] if self.when else []
+
 
 class Typeable(SchemaPattern):
     """Multiple content types and their combinations."""
@@ -131,9 +154,11 @@ class ConditionalPattern(Conditional):
         super().__init__(when)
         self.pattern = p
 
-    def _eval_when(self, cnode: "InstanceNode") -> None:
-        super()._eval_when(cnode)
-        self.pattern._eval_when(cnode)
+    def _conditionals(self) -> List[Conditional]:
+        return super()._conditionals() + self.pattern._conditionals()
+
+    def _names(self) -> FrozenSet[InstanceName]:
+        return self.pattern._names()
 
     def nullable(self, ctype: ContentType) -> bool:
         """Override the superclass method."""
@@ -163,10 +188,25 @@ class Member(Typeable, Conditional):
         Conditional.__init__(self, when)
         self.name = name
 
-    def _eval_when(self, cnode: "InstanceNode") -> None:
-        if self.when:
-            dummy = cnode.put_member(self.name, (None,))
-            super()._eval_when(dummy)
+    def _when_value(self, cnode: "InstanceNode") -> bool:
+        """Override the superclass method.
+
+        The expression is evaluated with a dummy instance of the member
+        as the context node. Absolute subexpressions are evaluated in
+        the data tree of `cnode`, so that their values can be cached.
+        """
+        dummy = cnode.put_member(self.name, (None,))
+        ctx = _validation_context.get()
+        if ctx is None or ctx.xpath_root is not None:
+            return super()._when_value(dummy)
+        ctx.xpath_root = cnode.top()
+        try:
+            return super()._when_value(dummy)
+        finally:
+            ctx.xpath_root = None
+
+    def _names(self) -> FrozenSet[InstanceName]:
+        return frozenset([self.name])
 
     def nullable(self, ctype: ContentType) -> bool:
         """Override the superclass method."""
@@ -202,10 +242,14 @@ class Alternative(SchemaPattern):
         self.left = p
         self.right = q
 
-    def _eval_when(self, cnode: "InstanceNode") -> None:
-        super()._eval_when(cnode)
-        self.left._eval_when(cnode)
-        self.right._eval_when(cnode)
+    def _conditionals(self) -> List[Conditional]:
+        return self.left._conditionals() + self.right._conditionals()
+
+    def _names(self) -> FrozenSet[InstanceName]:
+        return self.left._names() | self.right._names()
+
+    def _key(self) -> Hashable:
+        return ("Alternative", self.left._key(), self.right._key())
 
     def nullable(self, ctype: ContentType) -> bool:
         """Override the superclass method."""
@@ -253,6 +297,9 @@ class ChoicePattern(Alternative, Typeable):
     def _members(self, ctype: ContentType) -> List[InstanceName]:
         return super()._members(ctype) if self._active(ctype) else []
 
+    def _key(self) -> Hashable:
+        return self
+
 
 class Pair(SchemaPattern):
 
@@ -283,9 +330,14 @@ class Pair(SchemaPattern):
             Pair.combine(self.left.deriv(x, ctype), self.right),
             Pair.combine(self.right.deriv(x, ctype), self.left))
 
-    def _eval_when(self, cnode: "InstanceNode") -> None:
-        self.left._eval_when(cnode)
-        self.right._eval_when(cnode)
+    def _conditionals(self) -> List[Conditional]:
+        return self.left._conditionals() + self.right._conditionals()
+
+    def _names(self) -> FrozenSet[InstanceName]:
+        return self.left._names() | self.right._names()
+
+    def _key(self) -> Hashable:
+        return ("Pair", self.left._key(), self.right._key())
 
     def tree(self, indent: int = 0):
         return (" " * indent + "Pair\n" +
@@ -297,3 +349,112 @@ class Pair(SchemaPattern):
 
     def _mandatory_members(self, ctype: ContentType) -> List[InstanceName]:
         return self.left._mandatory_members(ctype) + self.right._mandatory_members(ctype)
+
+
+class PatternAutomaton:
+    """Deterministic automaton over member names of a schema pattern.
+
+    States of the automaton are derivatives of the pattern. They are
+    created, together with transitions between them, when they are first
+    needed. Values of "when" expressions in the pattern act as guards:
+    every combination of their values has its own set of states.
+    """
+
+    def __init__(self, pattern: SchemaPattern, ctype: ContentType):
+        """Initialize the class instance.
+
+        Args:
+            pattern: Schema pattern.
+            ctype: Content type.
+        """
+        self.pattern = pattern
+        self.ctype = ctype
+        self.conditionals = pattern._conditionals()
+        """Conditional subpatterns providing the guards."""
+        self.guarded_names = frozenset().union(
+            *[c._names() for c in self.conditionals])
+        """Names of members inside the conditional subpatterns."""
+        self._states = {}  # type: Dict[Hashable, PatternState]
+
+    def guards(self, cnode: "InstanceNode") -> Tuple[bool, ...]:
+        """Evaluate the guards.
+
+        Args:
+            cnode: Context node for "when" expressions.
+        """
+        return tuple([c._when_value(cnode) for c in self.conditionals])
+
+    def start(self, guards: Tuple[bool, ...] = ()) -> "PatternState":
+        """Return the initial state.
+
+        Args:
+            guards: Values of the guards.
+        """
+        return self._state(self.pattern, guards)
+
+    def _state(self, pattern: SchemaPattern,
+               guards: Tuple[bool, ...]) -> Optional["PatternState"]:
+        """Return the state for `pattern`, or ``None`` if it is not allowed."""
+        if isinstance(pattern, NotAllowed):
+            return None
+        key = (guards, pattern._key())
+        res = self._states.get(key)
+        if res is None:
+            with self._guarded(guards):
+                res = PatternState(self, pattern, guards)
+            self._states[key] = res
+        return res
+
+    @contextmanager
+    def _guarded(self, guards: Tuple[bool, ...]) -> Iterator[None]:
+        """Make `guards` the values of "when" expressions inside the block.
+
+        The values are recorded in the context of the current validation
+        run, so that the shared patterns are not modified.
+        """
+        if not self.conditionals:
+            yield
+            return
+        with _validation_run() as ctx:
+            saved = ctx.when_values
+            ctx.when_values = dict(zip(self.conditionals, guards))
+            try:
+                yield
+            finally:
+                ctx.when_values = saved
+
+
+class PatternState:
+    """State of a pattern automaton."""
+
+    def __init__(self, automaton: PatternAutomaton, pattern: SchemaPattern,
+                 guards: Tuple[bool, ...]):
+        """Initialize the class instance."""
+        self.automaton = automaton
+        self.pattern = pattern
+        self.guards = guards
+        self.nullable = pattern.nullable(automaton.ctype)
+        """Flag indicating that the state is accepting."""
+        self.next = {}  # type: Dict[InstanceName, Optional[PatternState]]
+        """Transitions that have already been computed."""
+
+    def step(self, name: InstanceName) -> Optional["PatternState"]:
+        """Return the state after a member, or ``None`` if it is not allowed.
+
+        Args:
+            name: Instance name of the member.
+        """
+        try:
+            return self.next[name]
+        except KeyError:
+            aut = self.automaton
+            with aut._guarded(self.guards):
+                res = aut._state(self.pattern.deriv(name, aut.ctype),
+                                 self.guards)
+            self.next[name] = res
+            return res
+
+    def mandatory_members(self) -> List[InstanceName]:
+        """Return names of members that are missing in the state."""
+        with self.automaton._guarded(self.guards):
+            return self.pattern._mandatory_members(self.automaton.ctype)
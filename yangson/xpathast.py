@@ -19,35 +19,195 @@
 
 This module defines a number of classes that mostly correspond to
 variables (non-terminals) of the XPath 1.0 grammar. Only the following
-class is intended to be public:
+classes are intended to be public:
 
 * Expr: XPath 1.0 expression with YANG 1.1 extensions.
+* XPathDependencies: Schema nodes on which XPath expressions depend.
 """
 
 import decimal
 from math import ceil, copysign, floor
+import operator
 from pyxb.utils.xmlre import XMLToPython, RegularExpressionError
 import re
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from .schemadata import SchemaContext
 from .enumerations import Axis, MultiplicativeOp
 from .exceptions import InvalidArgument, XPathTypeError
-from .instance import InstanceNode
+from .instance import InstanceNode, _validation_context
 from .nodeset import NodeExpr, NodeSet, XPathValue
-from .typealiases import QualName
+from .typealiases import QualName, YangIdentifier
 
+if False:                       # fake import for type aliases
+    from .schemanode import SchemaNode
 
-class XPathContext:
+# Type aliases
+SchemaNodes = Tuple[List["SchemaNode"], bool]
+"""Schema nodes selected by an expression and the locality flag.
 
-    def __init__(self, cnode: InstanceNode, origin: InstanceNode,
-                 position: int, size: int):
-        self.cnode = cnode
+The flag is ``True`` if all selected nodes are inside the subtree of
+the anchor node.
+"""
+
+XPathFunction = Callable[[InstanceNode, InstanceNode, int, int], XPathValue]
+"""Compiled XPath expression.
+
+The arguments are the context node, initial context node, context
+position and context size.
+"""
+
+_downward_axes = frozenset([Axis.child, Axis.descendant,
+                            Axis.descendant_or_self, Axis.self])
+"""Axes that don't leave the subtree of the context node."""
+
+_sibling_axes = frozenset([Axis.parent, Axis.following_sibling,
+                           Axis.preceding_sibling])
+"""Axes that don't leave the subtree of the context node's parent."""
+
+_distinct_axes = frozenset([Axis.child, Axis.self])
+"""Axes that never select the same node for different context nodes."""
+
+
+class XPathDependencies:
+    """Schema nodes on which values of XPath expressions depend.
+
+    Only dependencies outside the subtree of the anchor node are
+    recorded. The anchor is the initial context node or its ancestor.
+    """
+
+    def __init__(self):
+        """Initialize the class instance."""
+        self.nodes = set()  # type: Set[SchemaNode]
+        """Schema nodes whose instances are used as intermediate steps."""
+        self.values = set()  # type: Set[SchemaNode]
+        """Schema nodes whose instances (including contents) are used."""
+        self.origin = None  # type: Optional[SchemaNode]
+        """Schema node of the initial context node."""
+        self.anchor = None  # type: Optional[SchemaNode]
+        """Schema node of the anchor node."""
+
+    def __bool__(self) -> bool:
+        """Return ``True`` if there are any dependencies."""
+        return bool(self.nodes or self.values)
+
+    def add(self, expr: "Expr", origin: "SchemaNode",
+            anchor: "SchemaNode" = None) -> None:
+        """Add dependencies of an expression.
+
+        Args:
+            expr: XPath expression.
+            origin: Schema node of the initial context node.
+            anchor: Schema node of the anchor node (default: `origin`).
+        """
         self.origin = origin
-        self.position = position
-        self.size = size
+        self.anchor = anchor if anchor else origin
+        self._read(*expr._dependencies([origin], True, self))
+
+    def add_all(self, sn: "SchemaNode") -> None:
+        """Make the receiver depend on the entire data tree.
+
+        Args:
+            sn: Any node of the schema tree.
+        """
+        self.values.add(sn.schema_root())
+
+    def affected_by(self, changes: Set["SchemaNode"]) -> bool:
+        """Return ``True`` if the dependencies may be affected by changes.
+
+        Args:
+            changes: Schema nodes whose instances have been added,
+                removed or modified.
+        """
+        for x in changes:
+            xanc = x._xpath_axis(Axis.ancestor_or_self, None)
+            for v in self.values:
+                if v in xanc or x in v._xpath_axis(Axis.ancestor_or_self,
+                                                   None):
+                    return True
+            for n in self.nodes:
+                if x in n._xpath_axis(Axis.ancestor_or_self, None):
+                    return True
+        return False
+
+    def _read(self, nodes: List["SchemaNode"], local: bool) -> None:
+        """Record that instances of `nodes` are used."""
+        if not local:
+            self.values.update(nodes)
+
 
-    def update_cnode(self, new_cnode: InstanceNode) -> "XPathContext":
-        return self.__class__(new_cnode, self.origin, self.position, self.size)
+def _to_float(val: XPathValue) -> float:
+    """Convert an XPath value to a number."""
+    try:
+        return float(val)
+    except ValueError:
+        return float('nan')
+
+
+def _to_string(val: XPathValue) -> str:
+    """Convert an XPath value to a string."""
+    if isinstance(val, float):
+        try:
+            if int(val) == val:
+                return str(int(val))
+        except OverflowError:
+            return "Infinity" if val > 0 else "-Infinity"
+        except ValueError:
+            return "NaN"
+    if isinstance(val, bool):
+        return str(val).lower()
+    return str(val)
+
+
+def _fold(func: XPathFunction) -> XPathFunction:
+    """Return a function returning the constant value of `func`.
+
+    If the evaluation fails, `func` is returned so that the error is
+    raised when the expression is evaluated.
+    """
+    try:
+        val = func(None, None, 1, 1)
+    except Exception:
+        return func
+    return lambda node, origin, pos, size: val
+
+
+def _memoize(expr: "Expr", nsp: YangIdentifier,
+             func: XPathFunction) -> XPathFunction:
+    """Return a function caching values of `func` in validation runs.
+
+    The values are kept in the context of the validation run, and they
+    are keyed by `expr`, `nsp` and the identity of the root value of
+    the data tree. A modified data tree has a different root value, so
+    values computed for other versions of the tree are never used.
+
+    Values are computed and cached only for data trees that are not
+    modified by the zipper of the context node, because the root of a
+    modified tree is a new value each time it is zipped up. If a dummy
+    instance is used as the context node, the unmodified tree is taken
+    from the validation context.
+    """
+    def evaluate(node, origin, pos, size):
+        ctx = _validation_context.get()
+        if ctx is None:
+            return func(node, origin, pos, size)
+        top = ctx.xpath_root
+        if top is None:
+            top = node.top()
+            base = node
+            while base.parinst:
+                base = base.parinst
+            if base.value is not top.value:
+                return func(node, origin, pos, size)
+        root = top.value
+        key = (expr, nsp, id(root))
+        try:
+            return ctx.xpath_values[key][1]
+        except KeyError:
+            pass
+        val = func(top, top, 1, 1)
+        ctx.xpath_values[key] = (root, val)
+        return val
+    return evaluate
 
 
 class Expr:
@@ -55,6 +215,14 @@ class Expr:
 
     indent = 2
 
+    text = None  # type: Optional[str]
+    """Source text of the expression, if it was parsed."""
+
+    _pure = False
+    """Flag indicating that the value depends only on the operands."""
+
+    _functions = None  # type: Optional[Dict[YangIdentifier, XPathFunction]]
+
     def __str__(self) -> str:
         """Return a string representation of the receiver's AST."""
         return self._tree()
@@ -62,6 +230,9 @@ class Expr:
     def evaluate(self, node: InstanceNode) -> XPathValue:
         """Evaluate the receiver and return the result.
 
+        The receiver is compiled into a function when it is first
+        evaluated with a context node from a given namespace.
+
         Args:
             node: Context node for XPath evaluation.
 
@@ -69,28 +240,87 @@ class Expr:
             XPathTypeError: If a subexpression of the receiver is of a wrong
                 type.
         """
-        return self._eval(XPathContext(node, node, 1, 1))
+        nsp = node.namespace
+        if self._functions is None:
+            self._functions = {}
+        func = self._functions.get(nsp)
+        if func is None:
+            func = self._functions[nsp] = self._compile(nsp)
+        return func(node, node, 1, 1)
 
-    def _eval_float(self, xctx: XPathContext) -> float:
-        val = self._eval(xctx)
-        try:
-            return float(val)
-        except ValueError:
-            return float('nan')
+    def _compile(self, nsp: YangIdentifier) -> XPathFunction:
+        """Compile the receiver into a function.
 
-    def _eval_string(self, xctx: XPathContext) -> str:
-        val = self._eval(xctx)
-        if isinstance(val, float):
-            try:
-                if int(val) == val:
-                    return str(int(val))
-            except OverflowError:
-                return "Infinity" if val > 0 else "-Infinity"
-            except ValueError:
-                return "NaN"
-        if isinstance(val, bool):
-            return str(val).lower()
-        return str(val)
+        Constant values are computed at compile time, and values of
+        absolute expressions are cached during validation runs.
+
+        Args:
+            nsp: Namespace of unprefixed names.
+        """
+        func = self._compile_memo(nsp)
+        return _fold(func) if self._constant() else func
+
+    def _compile_memo(self, nsp: YangIdentifier) -> XPathFunction:
+        """Return function evaluating the receiver, memoized if possible.
+
+        Args:
+            nsp: Namespace of unprefixed names.
+        """
+        func = self._compile_expr(nsp)
+        if self._absolute() and not self._constant():
+            return _memoize(self, nsp, func)
+        return func
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        """Return function evaluating the receiver.
+
+        Args:
+            nsp: Namespace of unprefixed names.
+        """
+        raise NotImplementedError
+
+    def _compile_float(self, nsp: YangIdentifier) -> XPathFunction:
+        """Compile the receiver into a function returning a number."""
+        func = self._compile_memo(nsp)
+
+        def evaluate(node, origin, pos, size):
+            return _to_float(func(node, origin, pos, size))
+        return _fold(evaluate) if self._constant() else evaluate
+
+    def _compile_string(self, nsp: YangIdentifier) -> XPathFunction:
+        """Compile the receiver into a function returning a string."""
+        func = self._compile_memo(nsp)
+
+        def evaluate(node, origin, pos, size):
+            return _to_string(func(node, origin, pos, size))
+        return _fold(evaluate) if self._constant() else evaluate
+
+    def _constant(self) -> bool:
+        """Return ``True`` if the receiver's value doesn't depend on the
+        context.
+        """
+        return self._pure and all([ex._constant() for ex in self._operands()])
+
+    def _absolute(self) -> bool:
+        """Return ``True`` if the receiver's value depends only on the
+        data tree.
+
+        Such a value is the same for all context nodes and initial
+        context nodes in a data tree.
+        """
+        return self._pure and all([ex._absolute() for ex in self._operands()])
+
+    def _origin_only(self) -> bool:
+        """Return ``True`` if the receiver's value depends only on the
+        initial context node.
+
+        Such a value is the same for all context nodes in a data tree.
+        """
+        return self._absolute()
+
+    def _uses_current(self) -> bool:
+        """Return ``True`` if the receiver contains ``current()``."""
+        return any([ex._uses_current() for ex in self._operands()])
 
     def _tree(self, indent: int = 0) -> str:
         node_name = self.__class__.__name__
@@ -105,6 +335,27 @@ class Expr:
     def _children_str(self, indent) -> str:
         return ""
 
+    def _operands(self) -> List["Expr"]:
+        """Return the list of receiver's subexpressions."""
+        return []
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        """Record dependencies of the receiver in `deps`.
+
+        Args:
+            snodes: Schema nodes of possible context nodes.
+            local: Flag indicating that all context nodes are inside the
+                subtree of the anchor node.
+            deps: Dependencies being collected.
+
+        Returns:
+            Schema nodes that may be selected by the receiver.
+        """
+        for ex in self._operands():
+            deps._read(*ex._dependencies(snodes, local, deps))
+        return ([], True)
+
     def _predicates_str(self, indent) -> str:
         if not self.predicates:
             return ""
@@ -114,23 +365,36 @@ class Expr:
             res += p._tree(newi)
         return res
 
-    def _apply_predicates(self, ns: XPathValue,
-                          xctx: XPathContext) -> XPathValue:
-        for p in self.predicates:
-            res = NodeSet([])
-            size = len(ns)
-            for i in range(size):
-                pval = p._eval(XPathContext(ns[i], xctx.origin, i + 1, size))
-                try:
-                    if isinstance(pval, float) and pval > 0:
-                        res.append(ns[int(pval) - 1])
-                        break
-                except IndexError:
-                    return res
-                if pval:
-                    res.append(ns[i])
-            ns = res
-        return ns
+    def _compile_predicates(self, nsp: YangIdentifier,
+                            start: int = 0) -> Callable[
+                                [NodeSet, InstanceNode], NodeSet]:
+        """Return function filtering a node-set with receiver's predicates.
+
+        The function gets the node-set and the initial context node.
+
+        Args:
+            nsp: Namespace of unprefixed names.
+            start: Index of the first predicate to apply.
+        """
+        preds = [p._compile(nsp) for p in self.predicates[start:]]
+
+        def apply(ns, origin):
+            for pred in preds:
+                res = NodeSet([])
+                size = len(ns)
+                for i in range(size):
+                    pval = pred(ns[i], origin, i + 1, size)
+                    try:
+                        if isinstance(pval, float) and pval > 0:
+                            res.append(ns[int(pval) - 1])
+                            break
+                    except IndexError:
+                        return res
+                    if pval:
+                        res.append(ns[i])
+                ns = res
+            return ns
+        return apply
 
 
 class UnaryExpr(Expr):
@@ -142,6 +406,21 @@ class UnaryExpr(Expr):
     def _children_str(self, indent: int) -> str:
         return self.expr._tree(indent) if self.expr else ""
 
+    def _operands(self) -> List[Expr]:
+        return [self.expr] if self.expr else []
+
+    def _constant(self) -> bool:
+        return self.expr is not None and super()._constant()
+
+    def _absolute(self) -> bool:
+        return self.expr is not None and super()._absolute()
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        if self.expr is None:               # context node is used
+            deps._read(snodes, local)
+        return super()._dependencies(snodes, local, deps)
+
 
 class BinaryExpr(Expr):
     """Abstract superclass of binary expressions."""
@@ -153,32 +432,47 @@ class BinaryExpr(Expr):
     def _children_str(self, indent: int) -> str:
         return self.left._tree(indent) + self.right._tree(indent)
 
-    def _eval_ops(self, xctx: XPathContext) -> Tuple[XPathValue, XPathValue]:
-        return (self.left._eval(xctx), self.right._eval(xctx))
+    def _operands(self) -> List[Expr]:
+        return [self.left, self.right]
+
+    def _compile_ops(self, nsp: YangIdentifier) -> Tuple[
+            XPathFunction, XPathFunction]:
+        return (self.left._compile(nsp), self.right._compile(nsp))
 
-    def _eval_ops_float(self, xctx: XPathContext) -> Tuple[float, float]:
-        return (self.left._eval_float(xctx), self.right._eval_float(xctx))
+    def _compile_ops_float(self, nsp: YangIdentifier) -> Tuple[
+            XPathFunction, XPathFunction]:
+        return (self.left._compile_float(nsp), self.right._compile_float(nsp))
 
-    def _eval_ops_string(self, xctx: XPathContext) -> Tuple[str, str]:
-        return (self.left._eval_string(xctx), self.right._eval_string(xctx))
+    def _compile_ops_string(self, nsp: YangIdentifier) -> Tuple[
+            XPathFunction, XPathFunction]:
+        return (self.left._compile_string(nsp),
+                self.right._compile_string(nsp))
 
 
 class OrExpr(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops(xctx)
-        return lres or rres
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops(nsp)
+        return lambda node, origin, pos, size: (
+            left(node, origin, pos, size) or right(node, origin, pos, size))
 
 
 class AndExpr(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops(xctx)
-        return lres and rres
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops(nsp)
+        return lambda node, origin, pos, size: (
+            left(node, origin, pos, size) and right(node, origin, pos, size))
 
 
 class EqualityExpr(BinaryExpr):
 
+    _pure = True
+
     def __init__(self, left: Expr, right: Expr, negate: bool):
         super().__init__(left, right)
         self.negate = negate
@@ -186,13 +480,17 @@ class EqualityExpr(BinaryExpr):
     def _properties_str(self) -> str:
         return "!=" if self.negate else "="
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops(xctx)
-        return lres != rres if self.negate else lres == rres
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops(nsp)
+        op = operator.ne if self.negate else operator.eq
+        return lambda node, origin, pos, size: op(
+            left(node, origin, pos, size), right(node, origin, pos, size))
 
 
 class RelationalExpr(BinaryExpr):
 
+    _pure = True
+
     def __init__(self, left: Expr, right: Expr, less: bool,
                  equal: bool):
         super().__init__(left, right)
@@ -205,15 +503,20 @@ class RelationalExpr(BinaryExpr):
             res += "="
         return res
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops(xctx)
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops(nsp)
         if self.less:
-            return lres <= rres if self.equal else lres < rres
-        return lres >= rres if self.equal else lres > rres
+            op = operator.le if self.equal else operator.lt
+        else:
+            op = operator.ge if self.equal else operator.gt
+        return lambda node, origin, pos, size: op(
+            left(node, origin, pos, size), right(node, origin, pos, size))
 
 
 class AdditiveExpr(BinaryExpr):
 
+    _pure = True
+
     def __init__(self, left: Expr, right: Expr, plus: bool):
         super().__init__(left, right)
         self.plus = plus
@@ -221,13 +524,17 @@ class AdditiveExpr(BinaryExpr):
     def _properties_str(self) -> str:
         return "+" if self.plus else "-"
 
-    def _eval(self, xctx: XPathContext) -> float:
-        lres, rres = self._eval_ops_float(xctx)
-        return lres + rres if self.plus else lres - rres
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops_float(nsp)
+        op = operator.add if self.plus else operator.sub
+        return lambda node, origin, pos, size: op(
+            left(node, origin, pos, size), right(node, origin, pos, size))
 
 
 class MultiplicativeExpr(BinaryExpr):
 
+    _pure = True
+
     def __init__(self, left: Expr, right: Expr,
                  operator: MultiplicativeOp):
         super().__init__(left, right)
@@ -241,24 +548,34 @@ class MultiplicativeExpr(BinaryExpr):
         if self.operator == MultiplicativeOp.modulo:
             return "mod"
 
-    def _eval(self, xctx: XPathContext) -> float:
-        lres, rres = self._eval_ops_float(xctx)
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops_float(nsp)
         if self.operator == MultiplicativeOp.multiply:
-            return lres * rres
+            return lambda node, origin, pos, size: (
+                left(node, origin, pos, size) * right(node, origin, pos, size))
         if self.operator == MultiplicativeOp.divide:
+            def divide(node, origin, pos, size):
+                lres = left(node, origin, pos, size)
+                try:
+                    return lres / right(node, origin, pos, size)
+                except ZeroDivisionError:
+                    return (float("nan") if lres == 0.0
+                            else copysign(float('inf'), lres))
+            return divide
+
+        def modulo(node, origin, pos, size):
+            lres = left(node, origin, pos, size)
             try:
-                return lres / rres
+                return copysign(lres % right(node, origin, pos, size), lres)
             except ZeroDivisionError:
-                return (float("nan") if lres == 0.0
-                        else copysign(float('inf'), lres))
-        try:
-            return copysign(lres % rres, lres)
-        except ZeroDivisionError:
-            return float('nan')
+                return float('nan')
+        return modulo
 
 
 class UnaryMinusExpr(UnaryExpr):
 
+    _pure = True
+
     def __init__(self, expr: Expr, negate: bool):
         super().__init__(expr)
         self.negate = negate
@@ -266,52 +583,83 @@ class UnaryMinusExpr(UnaryExpr):
     def _properties_str(self) -> str:
         return "-" if self.negate else "+"
 
-    def _eval(self, xctx: XPathContext) -> float:
-        res = self.expr._eval_float(xctx)
-        return -res if self.negate else res
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile_float(nsp)
+        if self.negate:
+            return lambda node, origin, pos, size: -expr(
+                node, origin, pos, size)
+        return expr
 
 
 class UnionExpr(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> NodeSet:
-        lres, rres = self._eval_ops(xctx)
-        return lres.union(rres)
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops(nsp)
+        return lambda node, origin, pos, size: left(
+            node, origin, pos, size).union(right(node, origin, pos, size))
+
+    def _absolute(self) -> bool:
+        return self.left._absolute() and self.right._absolute()
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        lns, lloc = self.left._dependencies(snodes, local, deps)
+        rns, rloc = self.right._dependencies(snodes, local, deps)
+        return (lns + rns, lloc and rloc)
 
 
 class Literal(Expr):
 
+    _pure = True
+
     def __init__(self, value: str):
         self.value = value
 
     def _properties_str(self) -> str:
         return self.value
 
-    def _eval(self, xctx: XPathContext) -> str:
-        return self.value
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        value = self.value
+        return lambda node, origin, pos, size: value
 
 
 class Number(Expr):
 
+    _pure = True
+
     def __init__(self, value: float):
         self.value = value
 
     def _properties_str(self) -> str:
         return str(self.value)
 
-    def _eval(self, xctx: XPathContext) -> float:
-        return float(self.value)
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        value = float(self.value)
+        return lambda node, origin, pos, size: value
 
 
 class PathExpr(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> XPathValue:
-        ns = self.left._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        res = NodeSet([])
-        for n in ns:
-            res = res.union(self.right._eval(xctx.update_cnode(n)))
-        return res
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops(nsp)
+
+        def evaluate(node, origin, pos, size):
+            ns = left(node, origin, pos, size)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            return NodeSet.merge([right(n, origin, pos, size) for n in ns])
+        return evaluate
+
+    def _absolute(self) -> bool:
+        return self.left._absolute() and not self.right._uses_current()
+
+    def _origin_only(self) -> bool:
+        return self.left._origin_only()
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        return self.right._dependencies(
+            *self.left._dependencies(snodes, local, deps), deps)
 
 
 class FilterExpr(Expr):
@@ -323,23 +671,86 @@ class FilterExpr(Expr):
     def _children_str(self, indent) -> str:
         return self.primary._tree(indent) + self._predicates_str(indent)
 
-    def _eval(self, xctx: XPathContext) -> XPathValue:
-        res = self.primary._eval(xctx)
-        return self._apply_predicates(res, xctx)
+    def _constant(self) -> bool:
+        return not self.predicates and self.primary._constant()
+
+    def _absolute(self) -> bool:
+        return self.primary._absolute() and not any(
+            [p._uses_current() for p in self.predicates])
+
+    def _origin_only(self) -> bool:
+        return self.primary._origin_only()
+
+    def _uses_current(self) -> bool:
+        return self.primary._uses_current() or any(
+            [p._uses_current() for p in self.predicates])
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        primary = self.primary._compile(nsp)
+        if not self.predicates:
+            return primary
+        apply = self._compile_predicates(nsp)
+        return lambda node, origin, pos, size: apply(
+            primary(node, origin, pos, size), origin)
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        res = self.primary._dependencies(snodes, local, deps)
+        for p in self.predicates:
+            deps._read(*p._dependencies(*res, deps))
+        return res
 
 
 class LocationPath(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> XPathValue:
-        lres = self.left._eval(xctx)
-        ns = lres.bind(self.right._node_trans(xctx))
-        return self.right._apply_predicates(ns, xctx)
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left = self.left._compile(nsp)
+        distinct = self.right.axis in _distinct_axes
+        select, start = self.right._compile_selection(nsp)
+        if start == 0:
+            trans = self.right._node_trans(nsp)
+            if not self.right.predicates:
+                return lambda node, origin, pos, size: left(
+                    node, origin, pos, size).bind(trans, distinct)
+            apply = self.right._compile_predicates(nsp)
+            return lambda node, origin, pos, size: apply(
+                left(node, origin, pos, size).bind(trans, distinct), origin)
+
+        def evaluate(node, origin, pos, size):
+            return left(node, origin, pos, size).bind(
+                lambda n: select(n, origin), distinct)
+        if start == len(self.right.predicates):
+            return evaluate
+        apply = self.right._compile_predicates(nsp, start)
+        return lambda node, origin, pos, size: apply(
+            evaluate(node, origin, pos, size), origin)
+
+    def _absolute(self) -> bool:
+        return self.left._absolute() and not self.right._uses_current()
+
+    def _origin_only(self) -> bool:
+        return self.left._origin_only()
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        return self.right._dependencies(
+            *self.left._dependencies(snodes, local, deps), deps)
 
 
 class Root(Expr):
 
-    def _eval(self, xctx: XPathContext) -> NodeSet:
-        return NodeSet([xctx.cnode.top()])
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        return lambda node, origin, pos, size: NodeSet([node.top()])
+
+    def _absolute(self) -> bool:
+        return True
+
+    def _compile_memo(self, nsp: YangIdentifier) -> XPathFunction:
+        return self._compile_expr(nsp)
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        return ([deps.origin.schema_root()], False)
 
 
 class Step(Expr):
@@ -356,8 +767,16 @@ class Step(Expr):
     def _children_str(self, indent) -> str:
         return self._predicates_str(indent)
 
-    def _node_trans(self, xctx) -> NodeExpr:
-        qname = ((self.qname[0], xctx.origin.namespace) if
+    def _uses_current(self) -> bool:
+        return any([p._uses_current() for p in self.predicates])
+
+    def _node_trans(self, nsp: YangIdentifier) -> NodeExpr:
+        """Return function selecting nodes along the receiver's axis.
+
+        Args:
+            nsp: Namespace of unprefixed names.
+        """
+        qname = ((self.qname[0], nsp) if
                  self.qname and self.qname[1] is None else self.qname)
         return {
             Axis.ancestor: lambda n, qn=qname: n._ancestors(qn),
@@ -378,76 +797,211 @@ class Step(Expr):
                 lambda n, qn=qname: [] if qn and qn != n.qual_name else [n],
         }[self.axis]
 
-    def _eval(self, xctx: XPathContext) -> XPathValue:
-        ns = NodeSet(self._node_trans(xctx)(xctx.cnode))
-        return self._apply_predicates(ns, xctx)
+    def _key_predicates(self) -> List[Tuple[QualName, Expr]]:
+        """Return receiver's leading predicates that compare a child
+        with a value.
+
+        Only predicates of the form ``child = expr`` or ``expr = child``
+        are recognized where `expr` depends only on the initial context
+        node. Their values don't depend on the context position, so
+        they can be answered from a key index.
+
+        Returns:
+            List of pairs of the child's qualified name (possibly
+            without a module) and `expr`.
+        """
+        res = []
+        if self.axis != Axis.child or not self.qname:
+            return res
+        for p in self.predicates:
+            if not isinstance(p, EqualityExpr) or p.negate:
+                break
+            for step, val in ((p.left, p.right), (p.right, p.left)):
+                if (isinstance(step, Step) and step.axis == Axis.child and
+                        step.qname and not step.predicates and
+                        val._origin_only()):
+                    res.append((step.qname, val))
+                    break
+            else:
+                break
+        return res
+
+    def _compile_selection(self, nsp: YangIdentifier) -> Tuple[
+            Callable[[InstanceNode, InstanceNode], List[InstanceNode]], int]:
+        """Return function selecting nodes with leading key predicates.
+
+        If the receiver selects entries of a list and its leading
+        predicates compare the list keys with values, the entries are
+        looked up in the key index of the list instead of applying
+        the predicates to every entry.
+
+        Args:
+            nsp: Namespace of unprefixed names.
+
+        Returns:
+            The function, which gets the context node and the initial
+            context node, and the number of predicates it applies.
+        """
+        trans = self._node_trans(nsp)
+        kpreds = self._key_predicates()
+        if not kpreds:
+            return (lambda node, origin: trans(node), 0)
+        qname = ((self.qname[0], nsp) if self.qname[1] is None
+                 else self.qname)
+        keys = [(q[0], nsp) if q[1] is None else q for q, ex in kpreds]
+        vals = [ex._compile(nsp) for q, ex in kpreds]
+        tests = [p._compile(nsp) for p in self.predicates[:len(kpreds)]]
+
+        def select(node, origin):
+            def strings(i):
+                val = vals[i](origin, origin, 1, 1)
+                if isinstance(val, NodeSet):
+                    return val._strings()
+                return [val] if isinstance(val, str) else None
+            res = node._keyed_children(qname, keys, strings)
+            start, ns = (0, trans(node)) if res is None else res
+            for test in tests[start:]:
+                ns = [n for n in ns if test(n, origin, 1, 1)]
+            return ns
+        return (select, len(kpreds))
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        select, start = self._compile_selection(nsp)
+        if start == len(self.predicates):
+            return lambda node, origin, pos, size: NodeSet(
+                select(node, origin))
+        apply = self._compile_predicates(nsp, start)
+        return lambda node, origin, pos, size: apply(
+            NodeSet(select(node, origin)), origin)
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        qname = ((self.qname[0], deps.origin.ns) if
+                 self.qname and self.qname[1] is None else self.qname)
+        res = []
+        for sn in snodes:
+            for n in sn._xpath_axis(self.axis, qname):
+                if n not in res:
+                    res.append(n)
+        local = local and (self.axis in _downward_axes or
+                           self.axis in _sibling_axes and
+                           deps.anchor not in snodes)
+        if not local:
+            deps.nodes.update(res)
+        for p in self.predicates:
+            deps._read(*p._dependencies(res, local, deps))
+        return (res, local)
 
 
 class FuncBitIsSet(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        ns = self.left._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        bit = self.right._eval_string(xctx)
-        try:
-            return bit in ns[0].value
-        except (IndexError, TypeError):
-            return False
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left = self.left._compile(nsp)
+        right = self.right._compile_string(nsp)
+
+        def evaluate(node, origin, pos, size):
+            ns = left(node, origin, pos, size)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            bit = right(node, origin, pos, size)
+            try:
+                return bit in ns[0].value
+            except (IndexError, TypeError):
+                return False
+        return evaluate
 
 
 class FuncBoolean(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        return bool(self.expr._eval(xctx))
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile(nsp)
+        return lambda node, origin, pos, size: bool(
+            expr(node, origin, pos, size))
 
 
 class FuncCeiling(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        return float(ceil(self.expr._eval_float(xctx)))
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile_float(nsp)
+        return lambda node, origin, pos, size: float(
+            ceil(expr(node, origin, pos, size)))
 
 
 class FuncConcat(Expr):
 
+    _pure = True
+
     def __init__(self, parts: List[Expr]):
         self.parts = parts
 
     def _children_str(self, indent: int) -> str:
         return "".join([ex._tree(indent) for ex in self.parts])
 
-    def _eval(self, xctx: XPathContext) -> str:
-        return "".join([ex._eval_string(xctx) for ex in self.parts])
+    def _operands(self) -> List[Expr]:
+        return self.parts
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        parts = [ex._compile_string(nsp) for ex in self.parts]
+        return lambda node, origin, pos, size: "".join(
+            [p(node, origin, pos, size) for p in parts])
 
 
 class FuncContains(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops_string(xctx)
-        return lres.find(rres) >= 0
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops_string(nsp)
+        return lambda node, origin, pos, size: left(
+            node, origin, pos, size).find(right(node, origin, pos, size)) >= 0
 
 
 class FuncCount(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> int:
-        ns = self.expr._eval(xctx)
-        return float(len(ns))
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile(nsp)
+        return lambda node, origin, pos, size: float(
+            len(expr(node, origin, pos, size)))
 
 
 class FuncCurrent(Expr):
 
-    def _eval(self, xctx: XPathContext) -> NodeSet:
-        return NodeSet([xctx.origin])
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        return lambda node, origin, pos, size: NodeSet([origin])
+
+    def _origin_only(self) -> bool:
+        return True
+
+    def _uses_current(self) -> bool:
+        return True
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        return ([deps.origin], True)
 
 
 class FuncDeref(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> NodeSet:
-        ns = self.expr._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        ref = ns[0]
-        return NodeSet(ref._deref())
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile(nsp)
+
+        def evaluate(node, origin, pos, size):
+            ns = expr(node, origin, pos, size)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            ref = ns[0]
+            return NodeSet(ref._deref())
+        return evaluate
+
+    def _dependencies(self, snodes: List["SchemaNode"], local: bool,
+                      deps: XPathDependencies) -> SchemaNodes:
+        super()._dependencies(snodes, local, deps)
+        deps.add_all(deps.origin)
+        return ([], False)
 
 
 class FuncDerivedFrom(BinaryExpr):
@@ -462,51 +1016,73 @@ class FuncDerivedFrom(BinaryExpr):
         return ("OR-SELF, " if self.or_self
                 else "") + self.sctx.schema_data.namespace(self.mid)
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        ns = self.left._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        i = self.sctx.schema_data.translate_pname(
-            self.right._eval_string(xctx), self.sctx.text_mid)
-        for n in ns:
-            if not n.schema_node._is_identityref():
-                return False
-            if self.or_self and n.value == i:
-                return True
-            if self.sctx.schema_data.is_derived_from(n.value, i):
-                return True
-        return False
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left = self.left._compile(nsp)
+        right = self.right._compile_string(nsp)
+        sdata = self.sctx.schema_data
+        mid = self.sctx.text_mid
+        or_self = self.or_self
+
+        def identity(node, origin, pos, size):
+            return sdata.translate_pname(right(node, origin, pos, size), mid)
+        if self.right._constant():
+            identity = _fold(identity)
+
+        def evaluate(node, origin, pos, size):
+            ns = left(node, origin, pos, size)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            i = identity(node, origin, pos, size)
+            for n in ns:
+                if not n.schema_node._is_identityref():
+                    return False
+                if or_self and n.value == i:
+                    return True
+                if sdata.is_derived_from(n.value, i):
+                    return True
+            return False
+        return evaluate
 
 
 class FuncEnumValue(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        ns = self.expr._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        try:
-            node = ns[0]
-            return float(node.schema_node.type.enum[node.value])
-        except (AttributeError, IndexError, KeyError):
-            return float('nan')
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile(nsp)
+
+        def evaluate(node, origin, pos, size):
+            ns = expr(node, origin, pos, size)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            try:
+                node = ns[0]
+                return float(node.schema_node.type.enum[node.value])
+            except (AttributeError, IndexError, KeyError):
+                return float('nan')
+        return evaluate
 
 
 class FuncFalse(Expr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        return False
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        return lambda node, origin, pos, size: False
 
 
 class FuncFloor(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        return float(floor(self.expr._eval_float(xctx)))
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile_float(nsp)
+        return lambda node, origin, pos, size: float(
+            floor(expr(node, origin, pos, size)))
 
 
 class FuncLast(Expr):
 
-    def _eval(self, xctx: XPathContext) -> int:
-        return float(xctx.size)
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        return lambda node, origin, pos, size: float(size)
 
 
 class FuncName(UnaryExpr):
@@ -518,100 +1094,153 @@ class FuncName(UnaryExpr):
     def _properties_str(self) -> str:
         return "LOCAL" if self.local else ""
 
-    def _eval(self, xctx: XPathContext) -> str:
-        if self.expr is None:
-            node = xctx.cnode
-        else:
-            ns = self.expr._eval(xctx)
-            try:
-                node = ns[0]
-            except TypeError:
-                raise XPathTypeError(str(ns))
-            except IndexError:
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = None if self.expr is None else self.expr._compile(nsp)
+        local = self.local
+
+        def evaluate(node, origin, pos, size):
+            if expr is not None:
+                ns = expr(node, origin, pos, size)
+                try:
+                    node = ns[0]
+                except TypeError:
+                    raise XPathTypeError(str(ns))
+                except IndexError:
+                    return ""
+            if node.path == ():
                 return ""
-        if node.path is ():
-            return ""
-        if self.local:
-            p, s, loc = node.name.partition(":")
-            return loc if s else p
-        return node.name
+            if local:
+                p, s, loc = node.name.partition(":")
+                return loc if s else p
+            return node.name
+        return evaluate
 
 
 class FuncNormalizeSpace(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
-        string = self.expr._eval_string(xctx) if self.expr else str(xctx.cnode)
-        return " ".join(string.strip().split())
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        if self.expr is None:
+            return lambda node, origin, pos, size: " ".join(
+                str(node).strip().split())
+        expr = self.expr._compile_string(nsp)
+        return lambda node, origin, pos, size: " ".join(
+            expr(node, origin, pos, size).strip().split())
 
 
 class FuncNot(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        return not(self.expr._eval(xctx))
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile(nsp)
+        return lambda node, origin, pos, size: not expr(
+            node, origin, pos, size)
 
 
 class FuncNumber(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
         if self.expr is None:
-            try:
-                return float(xctx.cnode.value)
-            except ValueError:
-                return float('nan')
-        return self.expr._eval_float(xctx)
+            def evaluate(node, origin, pos, size):
+                try:
+                    return float(node.value)
+                except ValueError:
+                    return float('nan')
+            return evaluate
+        return self.expr._compile_float(nsp)
 
 
 class FuncPosition(Expr):
 
-    def _eval(self, xctx: XPathContext) -> int:
-        return xctx.position
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        return lambda node, origin, pos, size: pos
 
 
 class FuncReMatch(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops_string(xctx)
-        try:
-            return re.match(XMLToPython(rres), lres) is not None
-        except RegularExpressionError:
-            raise InvalidArgument(rres) from None
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops_string(nsp)
+        if self.right._constant():
+            pattern = right(None, None, 1, 1)
+            try:
+                regex = re.compile(XMLToPython(pattern))
+            except RegularExpressionError:
+                pass
+            else:
+                return lambda node, origin, pos, size: regex.match(
+                    left(node, origin, pos, size)) is not None
+
+        def evaluate(node, origin, pos, size):
+            lres = left(node, origin, pos, size)
+            rres = right(node, origin, pos, size)
+            try:
+                return re.match(XMLToPython(rres), lres) is not None
+            except RegularExpressionError:
+                raise InvalidArgument(rres) from None
+        return evaluate
 
 
 class FuncRound(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        dec = decimal.Decimal(self.expr._eval_float(xctx))
-        try:
-            return float(dec.to_integral_value(
-                decimal.ROUND_HALF_UP if dec > 0 else decimal.ROUND_HALF_DOWN))
-        except decimal.InvalidOperation:
-            return float('nan')
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile_float(nsp)
+
+        def evaluate(node, origin, pos, size):
+            dec = decimal.Decimal(expr(node, origin, pos, size))
+            try:
+                return float(dec.to_integral_value(
+                    decimal.ROUND_HALF_UP if dec > 0
+                    else decimal.ROUND_HALF_DOWN))
+            except decimal.InvalidOperation:
+                return float('nan')
+        return evaluate
 
 
 class FuncStartsWith(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        lres, rres = self._eval_ops_string(xctx)
-        return lres.startswith(rres)
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops_string(nsp)
+        return lambda node, origin, pos, size: left(
+            node, origin, pos, size).startswith(
+                right(node, origin, pos, size))
 
 
 class FuncString(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
         if self.expr is None:
-            return str(xctx.cnode)
-        return self.expr._eval_string(xctx)
+            return lambda node, origin, pos, size: str(node)
+        return self.expr._compile_string(nsp)
 
 
 class FuncStringLength(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
-        string = self.expr._eval_string(xctx) if self.expr else str(xctx.cnode)
-        return float(len(string))
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        if self.expr is None:
+            return lambda node, origin, pos, size: float(len(str(node)))
+        expr = self.expr._compile_string(nsp)
+        return lambda node, origin, pos, size: float(
+            len(expr(node, origin, pos, size)))
 
 
 class FuncSubstring(BinaryExpr):
 
+    _pure = True
+
     def __init__(self, string: Expr, start: Expr,
                  length: Optional[Expr]):
         super().__init__(string, start)
@@ -620,53 +1249,82 @@ class FuncSubstring(BinaryExpr):
     def _children_str(self, indent: int) -> str:
         return super()._children_str(indent) + self.length._tree(indent)
 
-    def _eval(self, xctx: XPathContext) -> str:
-        string = self.left._eval_string(xctx)
-        rres = self.right._eval_float(xctx)
-        try:
-            start = round(rres) - 1
-        except (ValueError, OverflowError):
-            return "" if self.length or rres != float("-inf") else string
-        if self.length is None:
-            return string[max(start, 0):]
-        length = self.length._eval_float(xctx)
-        try:
-            end = start + round(length)
-        except (ValueError, OverflowError):
-            return string[max(start, 0):] if length == float('inf') else ""
-        return string[max(start, 0):end]
+    def _operands(self) -> List[Expr]:
+        return super()._operands() + ([self.length] if self.length else [])
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left = self.left._compile_string(nsp)
+        right = self.right._compile_float(nsp)
+        length = (None if self.length is None else
+                  self.length._compile_float(nsp))
+
+        def evaluate(node, origin, pos, size):
+            string = left(node, origin, pos, size)
+            rres = right(node, origin, pos, size)
+            try:
+                start = round(rres) - 1
+            except (ValueError, OverflowError):
+                return "" if length or rres != float("-inf") else string
+            if length is None:
+                return string[max(start, 0):]
+            lres = length(node, origin, pos, size)
+            try:
+                end = start + round(lres)
+            except (ValueError, OverflowError):
+                return string[max(start, 0):] if lres == float('inf') else ""
+            return string[max(start, 0):end]
+        return evaluate
 
 
 class FuncSubstringAfter(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
-        lres, rres = self._eval_ops_string(xctx)
-        ind = lres.find(rres)
-        return lres[ind + len(rres):] if ind >= 0 else ""
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops_string(nsp)
+
+        def evaluate(node, origin, pos, size):
+            lres = left(node, origin, pos, size)
+            rres = right(node, origin, pos, size)
+            ind = lres.find(rres)
+            return lres[ind + len(rres):] if ind >= 0 else ""
+        return evaluate
 
 
 class FuncSubstringBefore(BinaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> str:
-        lres, rres = self._eval_ops_string(xctx)
-        ind = lres.find(rres)
-        return lres[:ind] if ind >= 0 else ""
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        left, right = self._compile_ops_string(nsp)
+
+        def evaluate(node, origin, pos, size):
+            lres = left(node, origin, pos, size)
+            ind = lres.find(right(node, origin, pos, size))
+            return lres[:ind] if ind >= 0 else ""
+        return evaluate
 
 
 class FuncSum(UnaryExpr):
 
-    def _eval(self, xctx: XPathContext) -> float:
-        ns = self.expr._eval(xctx)
-        if not isinstance(ns, NodeSet):
-            raise XPathTypeError(str(ns))
-        try:
-            return float(sum([n.value for n in ns]))
-        except TypeError:
-            return float('nan')
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        expr = self.expr._compile(nsp)
+
+        def evaluate(node, origin, pos, size):
+            ns = expr(node, origin, pos, size)
+            if not isinstance(ns, NodeSet):
+                raise XPathTypeError(str(ns))
+            try:
+                return float(sum([n.value for n in ns]))
+            except TypeError:
+                return float('nan')
+        return evaluate
 
 
 class FuncTranslate(BinaryExpr):
 
+    _pure = True
+
     def __init__(self, s1: Expr, s2: Expr, s3: Expr):
         super().__init__(s1, s2)
         self.nchars = s3
@@ -674,14 +1332,27 @@ class FuncTranslate(BinaryExpr):
     def _children_str(self, indent: int) -> str:
         return super()._children_str(indent) + self.nchars._tree(indent)
 
-    def _eval(self, xctx: XPathContext) -> str:
-        string, old = self._eval_ops_string(xctx)
-        new = self.nchars._eval_string(xctx)[:len(old)]
-        ttab = str.maketrans(old[:len(new)], new, old[len(new):])
-        return string.translate(ttab)
+    def _operands(self) -> List[Expr]:
+        return super()._operands() + [self.nchars]
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        string, old = self._compile_ops_string(nsp)
+        new = self.nchars._compile_string(nsp)
+
+        def table(node, origin, pos, size):
+            ochars = old(node, origin, pos, size)
+            nchars = new(node, origin, pos, size)[:len(ochars)]
+            return str.maketrans(ochars[:len(nchars)], nchars,
+                                 ochars[len(nchars):])
+        if self.right._constant() and self.nchars._constant():
+            table = _fold(table)
+        return lambda node, origin, pos, size: string(
+            node, origin, pos, size).translate(table(node, origin, pos, size))
 
 
 class FuncTrue(Expr):
 
-    def _eval(self, xctx: XPathContext) -> bool:
-        return True
+    _pure = True
+
+    def _compile_expr(self, nsp: YangIdentifier) -> XPathFunction:
+        return lambda node, origin, pos, size: True
@@ -66,7 +66,10 @@ class XPathParser(Parser):
                 that isn't supported by the implementation.
         """
         self.skip_ws()
-        return self._or_expr()
+        start = self.offset
+        res = self._or_expr()
+        res.text = self.input[start:self.offset].rstrip()
+        return res
 
     def _or_expr(self) -> Expr:
         op1 = self._and_expr()